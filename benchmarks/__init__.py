@@ -0,0 +1 @@
+"""框架开销基准"""
@@ -0,0 +1,347 @@
+"""框架自身开销基准
+
+职责：
+- 在 `SimDriver` 上重复执行页面查找/点击/输入、`wait_for_element`、冷启动、图像匹配、golden 哈希比对与日志调用，
+  设备延迟只推进虚拟时钟，测得的墙钟时间即框架本身的开销
+- 每个基准输出 p50/p95/p99 开销、每次操作的命令数、设备时间（命令延迟 + 休眠，虚拟时钟）与内存分配量
+- 与 `benchmarks/baseline.json` 对比：命令数或设备时间增加（多了往返或休眠）即判为回退；开销与分配量按容差比较
+
+用法：
+    python -m benchmarks.bench                  # 运行并与基线对比，回退时退出码为 1
+    python -m benchmarks.bench --update         # 以本次结果更新基线
+    python -m benchmarks.bench --only page.find --iterations 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, cast
+
+from benchmarks.sim import ACTIVITY, PACKAGE, SimClock, SimDriver, virtual_time
+from src.core.app_lifecycle import AppLauncher, LaunchMemory, LaunchStats
+from src.core.logger import setup_logger
+from src.core.tracing import percentile
+from src.core.waits import AdaptiveWaiter
+from src.page_objects.base_page import BasePage
+from src.page_objects.locators import LocatorCache
+
+if TYPE_CHECKING:
+    from appium.webdriver.webdriver import WebDriver
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+LATENCY = 0.05
+# 墙钟开销与分配量受机器影响，按倍数容差比较；命令数与设备时间是确定值，按 1% 比较
+TIME_TOLERANCE = 2.0
+ALLOC_TOLERANCE = 1.5
+EXACT_TOLERANCE = 1.01
+
+DATE = ("id", "com.ost.lunight:id/date")
+SEARCH = ("id", "com.ost.lunight:id/search")
+DATE_XPATH = ("xpath", '//android.widget.Button[@text="设置日期"]')
+MOON = ("id", "com.ost.lunight:id/moon")
+
+Operation = Callable[[], Any]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """单个基准：`setup(driver)` 返回每次迭代调用的操作；`iterations` 为默认迭代次数。"""
+
+    name: str
+    setup: Callable[[SimDriver], Operation]
+    iterations: int = 2000
+    warmup: int = 20
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    """一个基准的结果（均为每次操作的值）。"""
+
+    name: str
+    iterations: int
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    commands: float
+    device_ms: float
+    alloc_kb: float
+
+
+def _page(driver: SimDriver) -> BasePage:
+    # SimDriver 只实现 BasePage 用到的 WebDriver 接口
+    return BasePage(
+        cast("WebDriver", driver), timeout=5, locators=LocatorCache(stats_file=None, clock=driver.clock.time)
+    )
+
+
+def _waiter(driver: SimDriver) -> AdaptiveWaiter:
+    return AdaptiveWaiter(stats_file=None, sleep=driver.clock.sleep, clock=driver.clock.time)
+
+
+def _find(driver: SimDriver) -> Operation:
+    page = _page(driver)
+    return lambda: page.find(DATE)
+
+
+def _find_xpath(driver: SimDriver) -> Operation:
+    page = _page(driver)
+    return lambda: page.find(DATE_XPATH)
+
+
+def _click(driver: SimDriver) -> Operation:
+    page = _page(driver)
+    return lambda: page.click(DATE)
+
+
+def _type(driver: SimDriver) -> Operation:
+    page = _page(driver)
+    return lambda: page.type(SEARCH, "2024-04-08")
+
+
+def _wait_for_element(driver: SimDriver) -> Operation:
+    from tests.conftest import element_waiter  # pylint: disable=import-outside-toplevel
+
+    wait = element_waiter(driver, _waiter(driver), LocatorCache(stats_file=None, clock=driver.clock.time))
+    return lambda: wait(DATE)
+
+
+def _cold_launch(driver: SimDriver) -> Operation:
+    launcher = AppLauncher(
+        driver, PACKAGE, ACTIVITY, memory=LaunchMemory(), stats=LaunchStats(), clock=driver.clock.time
+    )
+    waiter = _waiter(driver)
+
+    def _launch() -> bool:
+        return launcher.wait_ready(launcher.cold_launch(), waiter=waiter)
+
+    return _launch
+
+
+def _image_match(driver: SimDriver) -> Operation:
+    # pylint: disable=import-outside-toplevel
+    from tests.unit.image_tools import test_element_image_match_cv
+    from tests.unit.screenshot import element_png
+    from tests.unit.template_store import DEFAULT_TEMPLATE_DIR, TemplateStore
+
+    store = TemplateStore()
+    png = (DEFAULT_TEMPLATE_DIR / "full moon.png").read_bytes()
+    driver.element_screenshot = base64.b64encode(png).decode("ascii")
+    element = _page(driver).find(MOON)
+    return lambda: test_element_image_match_cv(element_png(element), "full moon", store=store)
+
+
+def _golden(driver: SimDriver) -> Operation:
+    # pylint: disable=import-outside-toplevel
+    from tests.unit.golden_index import GoldenIndex, assert_golden_match
+    from tests.unit.screenshot import element_png
+    from tests.unit.template_store import DEFAULT_TEMPLATE_DIR
+
+    index = GoldenIndex(index_file=None)
+    png = (DEFAULT_TEMPLATE_DIR / "first quarter.png").read_bytes()
+    driver.element_screenshot = base64.b64encode(png).decode("ascii")
+    element = _page(driver).find(MOON)
+    return lambda: assert_golden_match(element_png(element), "first quarter", index=index)
+
+
+_LOG_DIR: Optional[Path] = None
+
+
+def _log_dir() -> Path:
+    """基准日志写入临时目录，不污染仓库的 `logs/`。"""
+    global _LOG_DIR  # pylint: disable=global-statement
+    if _LOG_DIR is None:
+        _LOG_DIR = Path(tempfile.mkdtemp(prefix="bench-logs-"))
+    return _LOG_DIR
+
+
+def _log(mode: str) -> Callable[[SimDriver], Operation]:
+    """单条 INFO 日志在调用线程上的开销（同步直接写文件；异步只入队，由后台线程写出）。"""
+
+    def _setup(driver: SimDriver) -> Operation:
+        logger = setup_logger(f"bench-log-{mode}", mode=mode, console=False, logs_dir=_log_dir())
+        # 只测本模块处理链路，排除向根 logger 的传播
+        logger.propagate = False
+        return lambda: logger.info("轮询 %s 第 %d 次", "id=button1", driver.total)
+
+    return _setup
+
+
+BENCHMARKS: Sequence[Benchmark] = (
+    Benchmark("page.find", _find),
+    Benchmark("page.find_xpath", _find_xpath),
+    Benchmark("page.click", _click),
+    Benchmark("page.type", _type),
+    Benchmark("wait_for_element", _wait_for_element),
+    Benchmark("app.cold_launch", _cold_launch),
+    Benchmark("image.match", _image_match, iterations=200, warmup=5),
+    Benchmark("image.golden", _golden, iterations=500, warmup=5),
+    Benchmark("log.sync", _log("sync")),
+    Benchmark("log.async", _log("async")),
+)
+
+
+@contextmanager
+def _quiet(enabled: bool) -> Iterator[None]:
+    """基准期间默认只保留 WARNING 及以上日志，避免上千行 INFO 输出淹没结果。"""
+    # 先完成 handler 配置，否则被测代码首次调用 setup_logger 时会把级别重置为 INFO
+    logger = setup_logger("tests")
+    previous = logger.level
+    if enabled:
+        logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+def run_benchmark(
+    bench: Benchmark, iterations: Optional[int] = None, latency: float = LATENCY, quiet: bool = True
+) -> BenchResult:
+    """运行单个基准：先计时与计数，再以较少次数在 tracemalloc 下统计分配量。"""
+    iterations = iterations or bench.iterations
+    clock = SimClock()
+    driver = SimDriver(clock=clock, latency=latency)
+    with _quiet(quiet), virtual_time(clock):
+        op = bench.setup(driver)
+        for _ in range(bench.warmup):
+            op()
+        durations: List[int] = []
+        commands, started = driver.total, clock.now
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            op()
+            durations.append(time.perf_counter_ns() - start)
+        commands, device = driver.total - commands, clock.now - started
+
+        samples = max(1, min(iterations, 200))
+        allocated = 0
+        tracemalloc.start()
+        try:
+            for _ in range(samples):
+                current = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                op()
+                allocated += tracemalloc.get_traced_memory()[1] - current
+        finally:
+            tracemalloc.stop()
+    micros = [d / 1000 for d in durations]
+    return BenchResult(
+        name=bench.name,
+        iterations=iterations,
+        p50_us=round(percentile(micros, 50), 1),
+        p95_us=round(percentile(micros, 95), 1),
+        p99_us=round(percentile(micros, 99), 1),
+        commands=round(commands / iterations, 3),
+        device_ms=round(device / iterations * 1000, 3),
+        alloc_kb=round(allocated / samples / 1024, 2),
+    )
+
+
+def run_all(
+    only: Optional[Sequence[str]] = None,
+    iterations: Optional[int] = None,
+    latency: float = LATENCY,
+    quiet: bool = True,
+) -> List[BenchResult]:
+    selected = [b for b in BENCHMARKS if not only or b.name in only]
+    unknown = set(only or ()) - {b.name for b in BENCHMARKS}
+    if unknown:
+        raise ValueError(f"未知基准: {', '.join(sorted(unknown))}")
+    return [
+        run_benchmark(b, None if iterations is None else min(iterations, b.iterations), latency, quiet)
+        for b in selected
+    ]
+
+
+def load_baseline(path: Path = BASELINE_FILE) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    results: Dict[str, Dict[str, Any]] = json.loads(path.read_text(encoding="utf-8")).get("results", {})
+    return results
+
+
+def save_baseline(results: Sequence[BenchResult], latency: float, path: Path = BASELINE_FILE) -> None:
+    # 只运行部分基准（--only）时保留其余基准的基线
+    merged = load_baseline(path)
+    merged.update({r.name: {k: v for k, v in asdict(r).items() if k != "name"} for r in results})
+    payload = {"latency": latency, "results": merged}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare(
+    results: Sequence[BenchResult],
+    baseline: Dict[str, Dict[str, Any]],
+    time_tolerance: Optional[float] = TIME_TOLERANCE,
+) -> List[str]:
+    """返回回退说明；`time_tolerance=None` 时只比较确定值（命令数、设备时间）。"""
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if result.commands > base["commands"] * EXACT_TOLERANCE + 1e-9:
+            regressions.append(f"{result.name}: 命令数 {base['commands']} -> {result.commands}/次")
+        if result.device_ms > base["device_ms"] * EXACT_TOLERANCE + 1e-6:
+            regressions.append(
+                f"{result.name}: 设备时间 {base['device_ms']} -> {result.device_ms} ms/次（新增往返或休眠）"
+            )
+        if time_tolerance is None:
+            continue
+        # 加 20us 绝对余量，避免极短操作因计时抖动误报
+        if result.p50_us > base["p50_us"] * time_tolerance + 20:
+            regressions.append(f"{result.name}: p50 开销 {base['p50_us']} -> {result.p50_us} us")
+        if result.alloc_kb > base["alloc_kb"] * ALLOC_TOLERANCE + 2:
+            regressions.append(f"{result.name}: 分配 {base['alloc_kb']} -> {result.alloc_kb} KB/次")
+    return regressions
+
+
+def report_lines(results: Sequence[BenchResult], baseline: Dict[str, Dict[str, Any]]) -> List[str]:
+    header = ("p50(us)", "p95(us)", "p99(us)", "命令/次", "设备ms/次", "分配KB/次", "基线p50")
+    lines = [" ".join(f"{h:>9}" for h in header) + "  基准"]
+    for r in results:
+        base = baseline.get(r.name, {}).get("p50_us")
+        base_text = f"{base:9.1f}" if base is not None else f"{'-':>9}"
+        lines.append(
+            f"{r.p50_us:9.1f} {r.p95_us:9.1f} {r.p99_us:9.1f} {r.commands:9.2f} {r.device_ms:9.1f} "
+            f"{r.alloc_kb:9.2f} {base_text}  {r.name}"
+        )
+    return lines
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="框架自身开销基准（模拟设备）")
+    parser.add_argument("--only", nargs="*", help="只运行指定基准")
+    parser.add_argument("--iterations", type=int, help="每个基准的迭代次数上限")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="每条命令的模拟延迟（秒，虚拟时钟）")
+    parser.add_argument("--update", action="store_true", help="以本次结果更新基线")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE, help="p50 开销相对基线的容差倍数")
+    parser.add_argument("--no-time", action="store_true", help="只比较命令数与设备时间（跨机器 CI 使用）")
+    parser.add_argument("--with-logging", action="store_true", help="保留 INFO 日志（计入开销）")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.only, args.iterations, args.latency, quiet=not args.with_logging)
+    baseline = load_baseline()
+    for line in report_lines(results, baseline):
+        print(line)
+    if args.update:
+        save_baseline(results, args.latency)
+        print(f"基线已更新: {BASELINE_FILE}")
+        return 0
+    regressions = compare(results, baseline, None if args.no_time else args.time_tolerance)
+    for line in regressions:
+        print(f"回退: {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
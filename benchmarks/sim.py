@@ -0,0 +1,205 @@
+"""模拟设备
+
+职责：
+- `SimClock`：虚拟时钟，命令延迟与等待休眠只推进虚拟时间，基准测试跑几千次也不真正等待
+- `SimDriver`：进程内的假 Appium 驱动，控件树来自脚本化的 page_source XML（经 `PageSnapshot` 求值定位器），
+  点击可按 resource-id 切换页面；每条命令计数并推进 `latency` 秒虚拟时间
+- `virtual_time()`：基准期间将 `time.sleep` 替换为虚拟休眠，框架中任何新增的固定休眠都会计入设备时间
+"""
+
+from __future__ import annotations
+
+import base64
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException, WebDriverException
+
+from src.page_objects.snapshot import PageSnapshot, SnapshotNode, UnsupportedLocator
+
+PACKAGE = "com.ost.lunight"
+ACTIVITY = "io.dcloud.PandoraEntry"
+
+HOME = (
+    '<hierarchy rotation="0" width="1080" height="2340">'
+    '<android.widget.FrameLayout resource-id="android:id/content" bounds="[0,0][1080,2340]">'
+    '<android.widget.EditText resource-id="com.ost.lunight:id/search" text="" bounds="[40,200][1040,320]"/>'
+    '<android.widget.TextView resource-id="com.ost.lunight:id/title" text="月相" bounds="[40,400][1040,520]"/>'
+    '<android.widget.Button resource-id="com.ost.lunight:id/date" text="设置日期" content-desc="设置日期" '
+    'bounds="[40,1000][1040,1160]"/>'
+    '<android.view.View resource-id="com.ost.lunight:id/moon" bounds="[240,1300][840,1900]"/>'
+    "</android.widget.FrameLayout>"
+    "</hierarchy>"
+)
+
+
+class SimClock:
+    """虚拟时钟：`time()` 返回虚拟秒数，`sleep()` 只推进时间并累计休眠量。"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += max(0.0, seconds)
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += max(0.0, seconds)
+        self.advance(seconds)
+
+
+@contextmanager
+def virtual_time(clock: SimClock) -> Iterator[SimClock]:
+    """在上下文内以虚拟休眠替换 `time.sleep`（WebDriverWait 等未注入时钟的等待同样计入）。"""
+    original = time.sleep
+    time.sleep = clock.sleep  # type: ignore[assignment]
+    try:
+        yield clock
+    finally:
+        time.sleep = original
+
+
+class SimElement:
+    """快照节点对应的元素，接口与 WebElement 的常用部分一致；每次读取都是一条命令。"""
+
+    def __init__(self, driver: "SimDriver", node: SnapshotNode) -> None:
+        self.driver = driver
+        self.node = node
+        self.id = f"node-{node.order}"
+
+    @property
+    def rect(self) -> Dict[str, int]:
+        self.driver.command("getElementRect")
+        return self.node.rect
+
+    @property
+    def location(self) -> Dict[str, int]:
+        self.driver.command("getElementLocation")
+        return self.node.location
+
+    @property
+    def text(self) -> str:
+        self.driver.command("getElementText")
+        return self.node.text
+
+    @property
+    def screenshot_as_base64(self) -> str:
+        self.driver.command("elementScreenshot")
+        return self.driver.element_screenshot
+
+    def is_displayed(self) -> bool:
+        self.driver.command("isElementDisplayed")
+        return self.node.displayed
+
+    def is_enabled(self) -> bool:
+        self.driver.command("isElementEnabled")
+        return self.node.enabled
+
+    def click(self) -> None:
+        self.driver.command("clickElement")
+        target = self.driver.transitions.get(self.node.resource_id)
+        if target is not None:
+            self.driver.show(target)
+
+    def clear(self) -> None:
+        self.driver.command("clearElement")
+        self.node.attrs["text"] = ""
+
+    def send_keys(self, text: str) -> None:
+        self.driver.command("sendKeysToElement")
+        self.node.attrs["text"] = self.node.attrs.get("text", "") + text
+
+
+class SimDriver:
+    """脚本化控件树上的假驱动。
+
+    - `latency`：每条命令推进的虚拟秒数
+    - `transitions`：{resource-id: page_source}，点击该控件后切换到新页面
+    - `commands`：按命令名计数，`total` 为累计命令数，基准用其计算每次操作的往返数
+    """
+
+    def __init__(
+        self,
+        source: str = HOME,
+        clock: Optional[SimClock] = None,
+        latency: float = 0.05,
+        transitions: Optional[Dict[str, str]] = None,
+        element_screenshot: bytes = b"",
+    ) -> None:
+        self.clock = clock or SimClock()
+        self.latency = latency
+        self.transitions = transitions or {}
+        self.element_screenshot = base64.b64encode(element_screenshot).decode("ascii")
+        self.capabilities = {"udid": "sim-0", "platformName": "Android"}
+        self.current_context = "NATIVE_APP"
+        self.commands: Counter = Counter()
+        self.total = 0
+        self.activity = ACTIVITY
+        self._source = source
+        self._snapshot = PageSnapshot.parse(source, clock=self.clock.time)
+
+    def command(self, name: str) -> None:
+        self.commands[name] += 1
+        self.total += 1
+        self.clock.advance(self.latency)
+
+    def show(self, source: str) -> None:
+        self._source = source
+        self._snapshot = PageSnapshot.parse(source, clock=self.clock.time)
+
+    def find_element(self, by: str, value: str) -> SimElement:
+        self.command("findElement")
+        try:
+            node = self._snapshot.find((by, value))
+        except UnsupportedLocator as exc:
+            raise InvalidSelectorException(str(exc)) from exc
+        if node is None:
+            raise NoSuchElementException(f"{by}={value}")
+        return SimElement(self, node)
+
+    @property
+    def page_source(self) -> str:
+        self.command("getPageSource")
+        return self._source
+
+    @property
+    def current_activity(self) -> str:
+        self.command("getCurrentActivity")
+        return self.activity
+
+    def get_window_size(self) -> Dict[str, int]:
+        self.command("getWindowSize")
+        return self._snapshot.window_size
+
+    def get_display_density(self) -> int:
+        self.command("getDisplayDensity")
+        return 440
+
+    @property
+    def orientation(self) -> str:
+        self.command("getOrientation")
+        return "PORTRAIT"
+
+    def hide_keyboard(self) -> None:
+        self.command("hideKeyboard")
+        raise WebDriverException("软键盘未显示")
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        self.command(script)
+        params = args[0] if args else {}
+        if script == "mobile: shell" and str(params.get("command", "")).startswith("am start"):
+            # am start -S -W 的典型输出：启动完成并报告 TotalTime
+            return f"Starting: Intent\nStatus: ok\nActivity: {PACKAGE}/{ACTIVITY}\nTotalTime: 612\nComplete\n"
+        return None
+
+    def terminate_app(self, package: str) -> bool:
+        self.command("terminateApp")
+        return True
+
+    def activate_app(self, package: str) -> None:
+        self.command("activateApp")
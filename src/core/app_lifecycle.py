@@ -0,0 +1,297 @@
+"""应用生命周期模块
+
+职责：
+- 抽象“冷启动被测应用”为多个策略：单条 `am start -S -W`（强杀 + 启动 + 计时一次往返）、
+  `terminate_app` + `mobile: startActivity`、`terminate_app` + `activate_app`
+- 按成本从低到高尝试，选中的策略按设备记忆；失败的策略在 `retry_after` 秒内不再重试，之后重新探测一次
+- 记录每次冷启动耗时（优先取 `am start -W` 报告的 TotalTime，否则为命令往返耗时），输出 p50/p95 作为应用自身的性能指标
+- 以亚秒级间隔轮询前台 Activity 判定就绪；`am start -W` 已报告启动完成时不再轮询
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from src.core.date_control import device_key, shell
+from src.core.logger import setup_logger
+from src.core.tracing import percentile, span
+from src.core.waits import AdaptiveWaiter
+
+# FLAG_ACTIVITY_NEW_TASK | FLAG_ACTIVITY_CLEAR_TASK
+LAUNCH_FLAGS = 0x10000000 | 0x00008000
+READY_POLL = 0.2
+
+_TOTAL_TIME = re.compile(r"TotalTime:\s*(\d+)")
+_LAUNCHED_ACTIVITY = re.compile(r"Activity:\s*(\S+)")
+
+
+class AppLaunchError(RuntimeError):
+    """所有启动策略均失败，或启动输出报告错误。"""
+
+
+@dataclass(frozen=True)
+class LaunchResult:
+    """一次冷启动的结果。
+
+    - `total_ms`：`am start -W` 报告的 TotalTime；策略无法取得时为 None
+    - `elapsed`：启动命令（含强杀）的往返耗时（秒）
+    - `activity`：启动输出中确认已显示的 Activity；为空时需轮询判定就绪
+    """
+
+    strategy: str
+    elapsed: float
+    total_ms: Optional[int] = None
+    activity: str = ""
+
+    @property
+    def launch_ms(self) -> float:
+        return float(self.total_ms) if self.total_ms is not None else self.elapsed * 1000
+
+
+def parse_am_start(out: str) -> Dict[str, Any]:
+    """解析 `am start -W` 输出中的 TotalTime 与已启动的 Activity；输出包含 Error 时抛出 AppLaunchError。"""
+    if "Error" in out or "Exception" in out:
+        raise AppLaunchError(f"am start 失败: {out.strip()[-200:]}")
+    total, activity = _TOTAL_TIME.search(out), _LAUNCHED_ACTIVITY.search(out)
+    return {
+        "total_ms": int(total.group(1)) if total else None,
+        "activity": activity.group(1) if activity and "Status: ok" in out else "",
+    }
+
+
+class LaunchStrategy(ABC):
+    """启动策略基类。`cost` 为单次启动的预估命令数，用于排序；未实现 `launch` 的策略在构造时即报错。"""
+
+    name = "base"
+    cost = 0
+    # 失败后是否仍允许后续用例立即重试（兜底策略应为 True）
+    retry_after_failure = False
+
+    @abstractmethod
+    def launch(self, driver: Any, package: str, activity: str) -> Dict[str, Any]:
+        """强杀并冷启动应用，返回 `parse_am_start` 格式的信息（可为空）。"""
+
+
+class AmStartShellStrategy(LaunchStrategy):
+    """`am start -S -W`：一条 shell 命令完成强杀、启动并等待首帧，输出 TotalTime（需开启 `adb_shell`）。"""
+
+    name = "am-start-shell"
+    cost = 1
+
+    def launch(self, driver: Any, package: str, activity: str) -> Dict[str, Any]:
+        return parse_am_start(shell(driver, f"am start -S -W -n {package}/{activity}"))
+
+
+class StartActivityStrategy(LaunchStrategy):
+    """`terminate_app` + `mobile: startActivity`（UiAutomator2 内部同样走 `am start -W`，新版本会返回其输出）。"""
+
+    name = "start-activity"
+    cost = 2
+
+    def launch(self, driver: Any, package: str, activity: str) -> Dict[str, Any]:
+        driver.terminate_app(package)
+        out = driver.execute_script(
+            "mobile: startActivity",
+            {
+                "component": f"{package}/{activity}",
+                "intentAction": "android.intent.action.MAIN",
+                "intentCategory": "android.intent.category.LAUNCHER",
+                "intentFlags": LAUNCH_FLAGS,
+                "wait": True,
+            },
+        )
+        return parse_am_start(out) if isinstance(out, str) else {}
+
+
+class ActivateAppStrategy(LaunchStrategy):
+    """`terminate_app` + `activate_app`：所有驱动都支持，但拿不到 TotalTime。"""
+
+    name = "activate-app"
+    cost = 3
+    retry_after_failure = True
+
+    def launch(self, driver: Any, package: str, activity: str) -> Dict[str, Any]:
+        driver.terminate_app(package)
+        driver.activate_app(package)
+        return {}
+
+
+def default_strategies() -> List[LaunchStrategy]:
+    return [AmStartShellStrategy(), StartActivityStrategy(), ActivateAppStrategy()]
+
+
+class LaunchMemory:
+    """按设备记录已选中与已失败的策略，跨用例共享，避免重复尝试失败的策略。
+
+    `failed` 记录各策略最近一次失败的时刻；超过 `retry_after` 秒后重新探测一次，偶发错误不会永久放弃更快的策略。
+    """
+
+    def __init__(self, retry_after: float = 300.0) -> None:
+        self.retry_after = retry_after
+        self.selected: Dict[str, str] = {}
+        self.failed: Dict[str, Dict[str, float]] = {}
+        self.lock = threading.Lock()
+
+    def blocked(self, key: str, now: float) -> List[str]:
+        """仍处于失败冷却期的策略名。"""
+        with self.lock:
+            failed = self.failed.get(key, {})
+            return [name for name, at in failed.items() if now - at < self.retry_after]
+
+
+_MEMORY = LaunchMemory()
+
+
+class LaunchStats:
+    """按包名汇总冷启动耗时（毫秒）。"""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.sources: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, package: str, result: LaunchResult) -> None:
+        with self._lock:
+            self.samples.setdefault(package, []).append(result.launch_ms)
+            self.sources.setdefault(package, set()).add("TotalTime" if result.total_ms is not None else "往返")
+
+    def report_lines(self) -> List[str]:
+        with self._lock:
+            rows = sorted(self.samples.items())
+            sources = {package: "/".join(sorted(names)) for package, names in self.sources.items()}
+        lines = []
+        for package, values in rows:
+            lines.append(
+                f"{percentile(values, 50):8.0f} {percentile(values, 95):8.0f} {len(values):6d}  "
+                f"{package}（{sources[package]}，ms）"
+            )
+        return lines
+
+
+_DEFAULT_STATS: Optional[LaunchStats] = None
+
+
+def get_launch_stats() -> LaunchStats:
+    """获取进程内共享的冷启动耗时统计。"""
+    global _DEFAULT_STATS  # pylint: disable=global-statement
+    if _DEFAULT_STATS is None:
+        _DEFAULT_STATS = LaunchStats()
+    return _DEFAULT_STATS
+
+
+def activity_matches(current: str, package: str, activity: str) -> bool:
+    """前台 Activity 是否为目标；兼容 `.Main`、`pkg/.Main` 与完整类名等写法。"""
+    current = current.split("/", 1)[-1]
+    full = f"{package}{activity}" if activity.startswith(".") else activity
+    if current.startswith("."):
+        current = f"{package}{current}"
+    return current == full
+
+
+class AppLauncher:
+    """选择最快可用策略冷启动应用，失败时回退，并记录启动耗时。
+
+    选中的策略按设备记忆（默认进程级），后续用例直接使用。
+    """
+
+    def __init__(
+        self,
+        driver: Any,
+        package: str,
+        activity: str,
+        strategies: Optional[Sequence[LaunchStrategy]] = None,
+        memory: Optional[LaunchMemory] = None,
+        stats: Optional[LaunchStats] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.driver = driver
+        self.package = package
+        self.activity = activity
+        self.strategies: List[LaunchStrategy] = sorted(strategies or default_strategies(), key=lambda s: s.cost)
+        if not self.strategies:
+            raise ValueError("至少需要一个启动策略")
+        self.memory = memory or _MEMORY
+        self.stats = stats or get_launch_stats()
+        self._clock = clock
+        self._key = device_key(driver)
+        self._logger = setup_logger("tests")
+
+    @property
+    def selected(self) -> Optional[str]:
+        return self.memory.selected.get(self._key)
+
+    def cold_launch(self) -> LaunchResult:
+        """强杀并冷启动应用，返回实际使用的策略与耗时。"""
+        with span("app.cold_launch", package=self.package):
+            return self._cold_launch()
+
+    def _cold_launch(self) -> LaunchResult:
+        errors: List[str] = []
+        for strategy in self._candidates():
+            start = self._clock()
+            try:
+                with span(f"launch.{strategy.name}"):
+                    info = strategy.launch(self.driver, self.package, self.activity)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(f"{strategy.name}: {exc}")
+                self._logger.warning(f"启动策略 {strategy.name} 失败，回退下一个: {exc}")
+                self._mark_failed(strategy)
+                continue
+            result = LaunchResult(strategy.name, self._clock() - start, info.get("total_ms"), info.get("activity", ""))
+            with self.memory.lock:
+                self.memory.selected[self._key] = strategy.name
+                self.memory.failed.get(self._key, {}).pop(strategy.name, None)
+            self.stats.record(self.package, result)
+            self._logger.info(f"应用已冷启动 {self.package}（策略 {strategy.name}，{result.launch_ms:.0f} ms）")
+            return result
+        raise AppLaunchError(f"所有启动策略均失败: {'; '.join(errors)}")
+
+    def wait_ready(
+        self,
+        result: Optional[LaunchResult] = None,
+        waiter: Optional[AdaptiveWaiter] = None,
+        timeout: float = 10.0,
+        poll: float = READY_POLL,
+        observe: Optional[Callable[[str], None]] = None,
+    ) -> bool:
+        """等待目标 Activity 位于前台；`observe` 接收每次读到的 Activity。
+
+        `result` 已确认目标 Activity 显示时直接返回，不发请求。
+        """
+        if result is not None and result.activity and activity_matches(result.activity, self.package, self.activity):
+            return True
+        waiter = waiter or AdaptiveWaiter(stats_file=None)
+
+        def _ready() -> bool:
+            current = self.driver.current_activity
+            if observe is not None:
+                observe(current)
+            return activity_matches(current or "", self.package, self.activity)
+
+        return bool(
+            waiter.until(
+                _ready,
+                key=f"activity:{self.activity}",
+                timeout=timeout,
+                ignored=(Exception,),
+                default=False,
+                max_interval=poll,
+            )
+        )
+
+    def _candidates(self) -> List[LaunchStrategy]:
+        # 按成本排序并跳过冷却期内的策略：比已选策略更便宜的只可能是冷却已过、需要重新探测的策略
+        blocked = self.memory.blocked(self._key, self._clock())
+        return [s for s in self.strategies if s.name not in blocked]
+
+    def _mark_failed(self, strategy: LaunchStrategy) -> None:
+        with self.memory.lock:
+            if not strategy.retry_after_failure:
+                self.memory.failed.setdefault(self._key, {})[strategy.name] = self._clock()
+            if self.memory.selected.get(self._key) == strategy.name:
+                self.memory.selected.pop(self._key, None)
@@ -0,0 +1,211 @@
+"""失败现场采集模块
+
+职责：
+- 用例失败时只在调用线程取一次截图（base64）与 page_source，压缩与落盘交给后台线程
+- 截图转存为无损 WebP（或最高压缩级别的 PNG），page_source 以 gzip 保存
+- 按内容哈希命名与去重：相同截图/页面源码只写一份，Allure 附件只记录指向去重后文件的链接
+- 目录总大小受预算约束，超出时按最近使用时间淘汰最旧的文件；本次会话返回过的附件（含去重命中）仍被报告引用，不淘汰
+"""
+
+from __future__ import annotations
+
+import binascii
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from src.core.lazy import lazy_import
+from src.core.logger import setup_logger
+from src.core.tracing import span
+from src.core.transport import pipeline
+from src.utils.path import project_root
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+command = lazy_import("selenium.webdriver.remote.command")
+
+DEFAULT_ARTIFACT_DIR = project_root() / "logs" / "artifacts"
+IMAGE_FORMATS = ("webp", "png")
+MB = 1024 * 1024
+
+
+def _encode_params(image_format: str) -> List[int]:
+    # WebP 质量 > 100 即无损
+    if image_format == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, 101]
+    return [cv2.IMWRITE_PNG_COMPRESSION, 9]
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """一份已登记的失败附件；`path` 在后台写完之前可能尚不存在。"""
+
+    kind: str
+    digest: str
+    path: Path
+    deduplicated: bool
+
+    @property
+    def uri(self) -> str:
+        return self.path.resolve().as_uri()
+
+
+class ArtifactCollector:
+    """失败附件的后台写入器。
+
+    - `capture(driver)`：取截图与 page_source 并登记，返回附件列表（写入在后台完成）
+    - `screenshot(b64)` / `page_source(xml)`：登记已取得的内容；内容哈希已存在时不再写入
+    - `flush()`：等待已登记的写入完成；`close()` 在此基础上关闭后台线程
+    - `budget_bytes`：目录总大小上限，写入后超出则淘汰最久未使用、且本实例未返回过的文件
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path] = DEFAULT_ARTIFACT_DIR,
+        budget_bytes: int = 200 * MB,
+        image_format: str = "webp",
+    ) -> None:
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"ARTIFACT_FORMAT 只支持 {'/'.join(IMAGE_FORMATS)}: {image_format}")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = budget_bytes
+        self.image_format = image_format
+        self._logger = setup_logger("tests")
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+        self._pending: List[Future] = []
+        self._known: Dict[str, Path] = {}
+        # 按最近使用时间排序的 {路径: 字节数}，用于预算淘汰
+        self._sizes: "OrderedDict[Path, int]" = OrderedDict()
+        # 本实例返回过的附件路径：Allure 报告链接指向这些文件，淘汰时跳过
+        self._referenced: Set[Path] = set()
+        self._over_budget_warned = False
+        for path in sorted(self.root.iterdir(), key=lambda p: p.stat().st_mtime):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                self._sizes[path] = path.stat().st_size
+                self._known[path.name.split(".", 1)[0]] = path
+        self.written = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self.bytes_written = 0
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def capture(self, driver: Any) -> List[Artifact]:
+        """取一次失败现场；两条只读命令在开启流水线时并发发出。"""
+        with span("artifact.capture"):
+            calls: List[Tuple[str, Dict[str, Any]]] = [
+                (command.Command.SCREENSHOT, {}),
+                (command.Command.GET_PAGE_SOURCE, {}),
+            ]
+            screenshot, source = pipeline(driver, calls)
+        return [self.screenshot(screenshot), self.page_source(source)]
+
+    def screenshot(self, b64: str) -> Artifact:
+        # base64 文本与 PNG 字节一一对应，直接对文本取哈希，调用线程不做解码
+        digest = hashlib.sha1(b64.encode("ascii")).hexdigest()
+        return self._submit("screenshot", digest, f".{self.image_format}", b64)
+
+    def page_source(self, xml: str) -> Artifact:
+        data = xml.encode("utf-8")
+        return self._submit("page_source", hashlib.sha1(data).hexdigest(), ".xml.gz", data)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait(pending, timeout=timeout)
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+    def report_lines(self) -> List[str]:
+        if not (self.written or self.deduplicated):
+            return []
+        return [
+            f"写入 {self.written} 份（{self.bytes_written / 1024:.0f} KB），去重 {self.deduplicated} 份，"
+            f"淘汰 {self.evicted} 份；目录 {self.root} 占用 {self.total_bytes / MB:.1f}/{self.budget_bytes / MB:.0f} MB"
+        ]
+
+    def _submit(self, kind: str, digest: str, suffix: str, content: Union[str, bytes]) -> Artifact:
+        with self._lock:
+            known = self._known.get(digest)
+            if known is None:
+                path = self.root / f"{digest}{suffix}"
+                self._known[digest] = path
+                self._pending.append(self._executor.submit(self._write, kind, path, content))
+            else:
+                path = known
+                self.deduplicated += 1
+                self._pending.append(self._executor.submit(self._touch, path))
+            self._referenced.add(path)
+        return Artifact(kind, digest, path, known is not None)
+
+    def _write(self, kind: str, path: Path, content: Union[str, bytes]) -> None:
+        try:
+            with span("artifact.write", kind=kind):
+                if kind == "screenshot":
+                    data = self._encode_image(content)
+                else:
+                    data = gzip.compress(content.encode("utf-8") if isinstance(content, str) else content, mtime=0)
+                tmp = path.with_name(path.name + ".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._logger.error(f"失败附件写入异常 {path.name}: {exc}")
+            with self._lock:
+                self._known.pop(path.name.split(".", 1)[0], None)
+            return
+        with self._lock:
+            self._sizes[path] = len(data)
+            self.written += 1
+            self.bytes_written += len(data)
+            self._evict()
+
+    def _encode_image(self, b64: Union[str, bytes]) -> bytes:
+        png = binascii.a2b_base64(b64)
+        image = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return png
+        ok, encoded = cv2.imencode(f".{self.image_format}", image, _encode_params(self.image_format))
+        # 重新编码反而更大时保留原始 PNG 字节（内容相同，扩展名不变即可查看）
+        return encoded.tobytes() if ok and len(encoded) < len(png) else png
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if path in self._sizes:
+                self._sizes.move_to_end(path)
+
+    def _evict(self) -> None:
+        """持锁调用：总大小超出预算时从最久未使用的文件开始删除，本实例返回过的文件保留。"""
+        total = sum(self._sizes.values())
+        for path, size in list(self._sizes.items()):
+            if total <= self.budget_bytes:
+                return
+            if path in self._referenced:
+                continue
+            del self._sizes[path]
+            self._known.pop(path.name.split(".", 1)[0], None)
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evicted += 1
+        if total > self.budget_bytes and not self._over_budget_warned:
+            self._over_budget_warned = True
+            self._logger.warning(
+                f"失败附件目录 {self.root} 占用 {total / MB:.1f} MB，超出预算 {self.budget_bytes / MB:.0f} MB；"
+                "本次运行引用的附件不淘汰"
+            )
@@ -0,0 +1,301 @@
+"""异步 Appium 驱动
+
+职责：
+- `AsyncConnection`：基于 asyncio 流的 HTTP/1.1 keep-alive 客户端（标准库实现），多个会话共用一个连接池
+- `AsyncDriver` / `AsyncElement`：覆盖用例常用命令（查找、点击、位置尺寸、execute_script、截图、page_source）的
+  协程接口，错误响应按 selenium 的映射抛出同名异常，调用方的异常处理与同步驱动一致
+- `open_sessions()`：在一个事件循环内并发创建多台设备的会话，便于并行设置日期、截图等编排
+- 可选接入 `CommandRecorder`，命令统计与同步连接（`InstrumentedConnection`）共用
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
+from urllib.parse import urlsplit
+
+from src.core.config import APPIUM_PREFIX
+from src.core.lazy import lazy_import
+from src.core.logger import setup_logger
+from src.core.transport import CommandRecorder
+
+errorhandler = lazy_import("selenium.webdriver.remote.errorhandler")
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+# W3C 标准能力，其余能力需带 `appium:` 前缀
+W3C_CAPABILITIES = frozenset(
+    {
+        "browserName",
+        "browserVersion",
+        "platformName",
+        "acceptInsecureCerts",
+        "pageLoadStrategy",
+        "proxy",
+        "setWindowRect",
+        "timeouts",
+        "unhandledPromptBehavior",
+        "strictFileInteractability",
+        "webSocketUrl",
+    }
+)
+
+Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+def w3c_capabilities(caps: Dict[str, Any]) -> Dict[str, Any]:
+    """新建会话的请求体；非标准能力补上 `appium:` 前缀（与 AppiumOptions 一致）。"""
+    always = {k if k in W3C_CAPABILITIES or ":" in k else APPIUM_PREFIX + k: v for k, v in caps.items()}
+    return {"capabilities": {"alwaysMatch": always, "firstMatch": [{}]}}
+
+
+class _StaleConnection(ConnectionError):
+    """复用的空闲连接已被服务端关闭，请求未送达。"""
+
+
+class AsyncConnection:
+    """到单个 Appium 服务器的异步 keep-alive 连接池。
+
+    - `max_connections`：同时在途的请求数上限（即并发连接数）
+    - `timeout`：单条命令的超时（秒）
+    - `recorder`：传入时记录每条命令的字节数与耗时
+    - 必须在同一个事件循环内使用；`close()` 关闭全部空闲连接
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        max_connections: int = 8,
+        timeout: float = 120.0,
+        recorder: Optional[CommandRecorder] = None,
+    ) -> None:
+        parts = urlsplit(server_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.base_path = parts.path.rstrip("/")
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.recorder = recorder
+        self.opened = 0
+        self._idle: List[Streams] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._logger = setup_logger("commands")
+
+    async def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, command: str = "") -> Any:
+        """发送一条命令并返回响应中的 `value`；错误响应抛出对应的 selenium 异常。"""
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        start = time.perf_counter()
+        async with self._slots:
+            status, data = await asyncio.wait_for(self._send(method, path, payload), self.timeout)
+        elapsed = time.perf_counter() - start
+        name = command or f"{method} {path}"
+        if self.recorder is not None:
+            self.recorder.record(name, len(payload), len(data), elapsed)
+            self._logger.info(f"{name} 发送 {len(payload)}B 接收 {len(data)}B 耗时 {elapsed * 1000:.1f}ms")
+        text = data.decode("utf-8")
+        if status >= 400:
+            errorhandler.ErrorHandler().check_response({"status": status, "value": text})
+        return json.loads(text).get("value") if text else None
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _send(self, method: str, path: str, payload: bytes) -> Tuple[int, bytes]:
+        while True:
+            reused = bool(self._idle)
+            streams = self._idle.pop() if reused else await self._open()
+            try:
+                status, headers, data = await self._roundtrip(streams, method, path, payload)
+            except _StaleConnection:
+                streams[1].close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                streams[1].close()
+                raise
+            if headers.get("connection", "").lower() == "close":
+                streams[1].close()
+            else:
+                self._idle.append(streams)
+            return status, data
+
+    async def _open(self) -> Streams:
+        streams = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        self.opened += 1
+        return streams
+
+    async def _roundtrip(
+        self, streams: Streams, method: str, path: str, payload: bytes
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        reader, writer = streams
+        head = (
+            f"{method} {self.base_path}{path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Accept: application/json\r\n"
+            "Content-Type: application/json;charset=UTF-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode("latin-1") + payload)
+            await writer.drain()
+            status_line = await reader.readline()
+        except (ConnectionResetError, BrokenPipeError) as exc:
+            raise _StaleConnection(str(exc)) from exc
+        if not status_line:
+            raise _StaleConnection("连接已被服务端关闭")
+        status = int(status_line.split()[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            data = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await reader.read()
+            headers["connection"] = "close"
+        return status, headers, data
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0], 16)
+            if size == 0:
+                # 丢弃 trailer 直到空行
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return bytes(chunks)
+            chunks += await reader.readexactly(size)
+            await reader.readexactly(2)
+
+
+class AsyncElement:
+    """会话内的元素引用；所有操作均为协程。"""
+
+    def __init__(self, driver: "AsyncDriver", element_id: str) -> None:
+        self.driver = driver
+        self.id = element_id
+
+    def __repr__(self) -> str:
+        return f"AsyncElement({self.id!r})"
+
+    async def click(self) -> None:
+        await self.driver.execute("clickElement", "POST", f"/element/{self.id}/click", {})
+
+    async def rect(self) -> Dict[str, int]:
+        return cast(Dict[str, int], await self.driver.execute("getElementRect", "GET", f"/element/{self.id}/rect"))
+
+    async def text(self) -> str:
+        return cast(str, await self.driver.execute("getElementText", "GET", f"/element/{self.id}/text"))
+
+    async def is_displayed(self) -> bool:
+        return bool(await self.driver.execute("isElementDisplayed", "GET", f"/element/{self.id}/displayed"))
+
+    async def is_enabled(self) -> bool:
+        return bool(await self.driver.execute("isElementEnabled", "GET", f"/element/{self.id}/enabled"))
+
+    async def clear(self) -> None:
+        await self.driver.execute("clearElement", "POST", f"/element/{self.id}/clear", {})
+
+    async def send_keys(self, text: str) -> None:
+        body = {"text": text, "value": list(text)}
+        await self.driver.execute("sendKeysToElement", "POST", f"/element/{self.id}/value", body)
+
+    async def screenshot(self) -> str:
+        """元素截图（base64 PNG 文本）。"""
+        return cast(str, await self.driver.execute("elementScreenshot", "GET", f"/element/{self.id}/screenshot"))
+
+
+class AsyncDriver:
+    """单个 Appium 会话的异步门面。
+
+    通过 `await AsyncDriver.create(...)` 或 `open_sessions()` 创建；`async with` 退出时删除会话。
+    命令名与 selenium `Command` 常量一致，便于与同步连接的统计合并查看。
+    """
+
+    def __init__(self, connection: AsyncConnection, session_id: str, capabilities: Dict[str, Any]) -> None:
+        self.connection = connection
+        self.session_id = session_id
+        self.capabilities = capabilities
+
+    @classmethod
+    async def create(
+        cls,
+        server_url: str,
+        capabilities: Dict[str, Any],
+        connection: Optional[AsyncConnection] = None,
+    ) -> "AsyncDriver":
+        connection = connection or AsyncConnection(server_url)
+        value = await connection.request("POST", "/session", w3c_capabilities(capabilities), "newSession")
+        return cls(connection, value["sessionId"], value.get("capabilities") or {})
+
+    async def __aenter__(self) -> "AsyncDriver":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.quit()
+
+    async def execute(self, command: str, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """发送会话内命令，`path` 相对于 `/session/{id}`。"""
+        return await self.connection.request(method, f"/session/{self.session_id}{path}", body, command)
+
+    async def find_element(self, by: str, value: str) -> AsyncElement:
+        found = await self.execute("findElement", "POST", "/element", {"using": by, "value": value})
+        return AsyncElement(self, found[ELEMENT_KEY])
+
+    async def find_elements(self, by: str, value: str) -> List[AsyncElement]:
+        found = await self.execute("findElements", "POST", "/elements", {"using": by, "value": value})
+        return [AsyncElement(self, item[ELEMENT_KEY]) for item in found or []]
+
+    async def execute_script(self, script: str, *args: Any) -> Any:
+        return await self.execute("w3cExecuteScript", "POST", "/execute/sync", {"script": script, "args": list(args)})
+
+    async def screenshot(self) -> str:
+        """整屏截图（base64 PNG 文本），可直接交给截图解码管线。"""
+        return cast(str, await self.execute("screenshot", "GET", "/screenshot"))
+
+    async def page_source(self) -> str:
+        return cast(str, await self.execute("getPageSource", "GET", "/source"))
+
+    async def window_rect(self) -> Dict[str, int]:
+        return cast(Dict[str, int], await self.execute("getWindowRect", "GET", "/window/rect"))
+
+    async def quit(self) -> None:
+        await self.connection.request("DELETE", f"/session/{self.session_id}", None, "quit")
+
+
+async def open_sessions(
+    server_url: str,
+    capabilities: Sequence[Dict[str, Any]],
+    connection: Optional[AsyncConnection] = None,
+) -> List[AsyncDriver]:
+    """并发创建多个会话（通常每台设备一份 capabilities），共用一个连接池。"""
+    connection = connection or AsyncConnection(server_url, max_connections=max(8, len(capabilities)))
+    results = await asyncio.gather(
+        *(AsyncDriver.create(server_url, caps, connection) for caps in capabilities), return_exceptions=True
+    )
+    drivers = [r for r in results if isinstance(r, AsyncDriver)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        # 部分设备失败时关闭已创建的会话，避免占用设备
+        await asyncio.gather(*(driver.quit() for driver in drivers), return_exceptions=True)
+        raise errors[0]
+    return drivers
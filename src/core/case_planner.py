@@ -0,0 +1,165 @@
+"""用例执行计划模块
+
+职责：
+- 将月相用例按期望月相分组，去掉重复行，并按日期顺序执行，使相邻用例间日期（年/月/日）的变更最少
+- 分层抽样：同一期望图片的用例只保留 K 个代表日期与 K 个边界日（前后一天月相不同的日期）
+- 按单步耗时模型估算计划相对“全部按原顺序执行”节省的设备时间
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import zip_longest
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from src.core.dataset import PHASES, LunarCase
+from src.core.lazy import lazy_import
+from src.core.tracing import percentile
+
+# 只有分层抽样用到天文推算，CASE_PLAN=all 时不加载 NumPy
+np = lazy_import("numpy")
+lunar_oracle = lazy_import("src.core.lunar_oracle")
+
+PLAN_MODES = ("all", "ordered", "stratified")
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """单个用例各步骤的预估耗时（秒）。
+
+    - `set_date`：日期变化时的固定开销；`date_field`：每变更一个年/月/日字段的额外开销（设置页 UI 后端逐项滚动）
+    - 相邻用例日期相同时跳过设置日期与冷启动，只计截图
+    """
+
+    set_date: float = 1.0
+    date_field: float = 0.0
+    launch: float = 5.0
+    capture: float = 1.5
+
+    @classmethod
+    def from_step_stats(cls, stats: Dict[str, List[float]], default: Optional["CostModel"] = None) -> "CostModel":
+        """用追踪器的步骤耗时（`Tracer.step_stats()`）的 p50 替换默认值。"""
+        base = default or cls()
+
+        def p50(prefix: str, fallback: float) -> float:
+            values = [v for name, series in stats.items() if name.startswith(prefix) for v in series]
+            return percentile(values, 50) if values else fallback
+
+        return cls(
+            set_date=p50("date.", base.set_date),
+            date_field=base.date_field,
+            launch=p50("app.cold_launch", base.launch),
+            capture=p50("app.screenshot", base.capture),
+        )
+
+    def case_cost(self, previous: Optional[LunarCase], case: LunarCase) -> float:
+        if previous is not None and previous.date == case.date:
+            return self.capture
+        return self.set_date + self.date_field * date_changes(previous, case) + self.launch + self.capture
+
+    def total(self, cases: Sequence[LunarCase]) -> float:
+        previous: Optional[LunarCase] = None
+        seconds = 0.0
+        for case in cases:
+            seconds += self.case_cost(previous, case)
+            previous = case
+        return seconds
+
+
+def date_changes(previous: Optional[LunarCase], case: LunarCase) -> int:
+    """相邻两个用例之间需要变更的日期字段数（年、月、日）。"""
+    if previous is None:
+        return 3
+    return sum(a != b for a, b in zip_longest(previous.date.split("-"), case.date.split("-")))
+
+
+@dataclass
+class CasePlan:
+    """执行计划：`cases` 为计划执行的顺序，`skipped` 为抽样剔除的用例。"""
+
+    mode: str
+    original: List[LunarCase]
+    cases: List[LunarCase]
+    skipped: List[LunarCase] = field(default_factory=list)
+
+    def state_changes(self, cases: Optional[Sequence[LunarCase]] = None) -> int:
+        ordered = self.cases if cases is None else cases
+        return sum(date_changes(ordered[i - 1] if i else None, case) for i, case in enumerate(ordered))
+
+    def saved_seconds(self, cost: Optional[CostModel] = None) -> float:
+        model = cost or CostModel()
+        return model.total(self.original) - model.total(self.cases)
+
+    def summary_lines(self, cost: Optional[CostModel] = None) -> List[str]:
+        model = cost or CostModel()
+        baseline, planned = model.total(self.original), model.total(self.cases)
+        ratio = (baseline - planned) / baseline if baseline else 0.0
+        lines = [
+            f"计划 {self.mode}: 执行 {len(self.cases)}/{len(self.original)} 个用例，"
+            f"日期字段变更 {self.state_changes(self.original)} -> {self.state_changes()}",
+            f"预估设备时间 {baseline:.0f}s -> {planned:.0f}s，节省 {baseline - planned:.0f}s（{ratio:.0%}）",
+        ]
+        per_phase: Dict[str, int] = {}
+        for case in self.cases:
+            per_phase[case.phase] = per_phase.get(case.phase, 0) + 1
+        lines.append("  " + ", ".join(f"{phase}: {per_phase[phase]}" for phase in PHASES if phase in per_phase))
+        return lines
+
+
+def boundary_dates(cases: Iterable[LunarCase]) -> Set[str]:
+    """前一天或后一天推算月相与当天不同的日期。"""
+    dates = sorted({case.date for case in cases})
+    if not dates:
+        return set()
+    days = np.array(dates, dtype="datetime64[D]")
+    around = lunar_oracle.compute(np.concatenate([days - 1, days, days + 1])).index.reshape(3, -1)
+    edge = (around[0] != around[1]) | (around[2] != around[1])
+    return {dates[i] for i in np.flatnonzero(edge)}
+
+
+def _spread(cases: List[LunarCase], k: int) -> List[LunarCase]:
+    """按日期均匀取 k 个（含首尾）。"""
+    if k <= 0:
+        return []
+    if len(cases) <= k:
+        return list(cases)
+    picks = np.unique(np.rint(np.linspace(0, len(cases) - 1, k)).astype(int))
+    return [cases[i] for i in picks]
+
+
+def _ordered(cases: Sequence[LunarCase]) -> List[LunarCase]:
+    """去重后按日期排序：年、月先于日变化，相邻用例变更的日期字段总数最少。"""
+    return sorted(dict.fromkeys(cases), key=lambda c: (c.date, PHASES.index(c.phase) if c.phase in PHASES else 0))
+
+
+def plan_cases(cases: Sequence[LunarCase], mode: str = "ordered", k: int = 1) -> CasePlan:
+    """生成执行计划。`mode` 为 `all`（原顺序）、`ordered`（去重 + 日期排序）或 `stratified`（再按月相分层抽样）。"""
+    if mode not in PLAN_MODES:
+        raise ValueError(f"未知计划模式: {mode}（可选 {', '.join(PLAN_MODES)}）")
+    original = list(cases)
+    if mode == "all":
+        return CasePlan(mode, original, list(original))
+    if mode == "ordered":
+        ordered = _ordered(original)
+        return CasePlan(mode, original, ordered, _removed(original, ordered))
+
+    edges = boundary_dates(original)
+    chosen: List[LunarCase] = []
+    for phase in dict.fromkeys(case.phase for case in original):
+        in_phase = sorted(dict.fromkeys(c for c in original if c.phase == phase), key=lambda c: c.date)
+        chosen.extend(_spread([c for c in in_phase if c.date not in edges], k))
+        chosen.extend(_spread([c for c in in_phase if c.date in edges], k))
+    ordered = _ordered(chosen)
+    return CasePlan(mode, original, ordered, _removed(original, ordered))
+
+
+def _removed(original: Sequence[LunarCase], kept: Sequence[LunarCase]) -> List[LunarCase]:
+    """原列表中未被保留的用例（重复行只保留第一次出现）。"""
+    remaining = set(kept)
+    removed = []
+    for case in original:
+        if case in remaining:
+            remaining.discard(case)
+        else:
+            removed.append(case)
+    return removed
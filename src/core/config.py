@@ -3,17 +3,53 @@
 职责：
 - 统一加载运行所需配置（平台、Appium 服务器、capabilities 文件路径、设备 profile）
 - 支持环境变量与 .env 覆盖，遵循 SRP，避免硬编码
+- `get_config()` 返回进程内共享的加载器：`.env` 与 `resources/capabilities/*.json` 只解析一次，
+  按文件 mtime 与相关环境变量失效重建
+- capabilities 各 profile 规范化（折叠重复的 `appium:` 前缀）并校验后冻结，按 profile 提供 `AppiumConfig` 与驱动 Options
 """
 
 from __future__ import annotations
 
+import copy
+import dataclasses
 import json
 import os
+import threading
 from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+
+from src.core.logger import setup_logger
+
+# 参与构建 AppiumConfig 的环境变量，取值变化时 `get_config()` 重建
+ENV_KEYS = (
+    "PLATFORM_NAME",
+    "APPIUM_SERVER_URL",
+    "DEVICE_PROFILE",
+    "DEVICE_POOL",
+    "APPIUM_SESSION_POOL_SIZE",
+    "APPIUM_COMMAND_STATS",
+    "APPIUM_PIPELINE_WIDTH",
+    "CASE_PLAN",
+    "CASE_PLAN_K",
+    "RESULT_CACHE",
+    "ARTIFACT_BUDGET_MB",
+    "ARTIFACT_FORMAT",
+    "LUNAR_ORACLE",
+)
+APPIUM_PREFIX = "appium:"
+
+
+class ConfigError(ValueError):
+    """capabilities 文件格式不正确或规范化后存在冲突；`errors` 为全部问题。"""
+
+    def __init__(self, errors: List[str]) -> None:
+        super().__init__("; ".join(errors))
+        self.errors = errors
 
 
 @dataclass(frozen=True)
@@ -24,26 +60,127 @@ class AppiumConfig:
     appium_server_url: str
     capabilities_path: Path
     device_profile: str
+    device_pool: str = ""
+    session_pool_size: int = 1
+    command_stats: bool = False
+    pipeline_width: int = 1
+    case_plan: str = "all"
+    case_plan_k: int = 1
+    result_cache: str = "off"
+    artifact_budget_mb: int = 200
+    artifact_format: str = "webp"
+    lunar_oracle: str = "warn"
+
+
+def normalize_capabilities(caps: Mapping[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """折叠重复的 `appium:` 前缀（如 `appium:appium:forceAppLaunch` -> `appium:forceAppLaunch`）。
+
+    规范化后与已有键重名且取值不同视为冲突，返回 (规范化结果, 问题列表)。
+    """
+    normalized: Dict[str, Any] = {}
+    problems: List[str] = []
+    for key, value in caps.items():
+        name = key
+        while name.startswith(APPIUM_PREFIX + APPIUM_PREFIX):
+            name = name[len(APPIUM_PREFIX) :]
+        # `appium:x` 与裸键 `x` 是同一项
+        bare = name[len(APPIUM_PREFIX) :] if name.startswith(APPIUM_PREFIX) else name
+        duplicate = False
+        for existing in (bare, APPIUM_PREFIX + bare):
+            if existing in normalized:
+                if normalized[existing] != value:
+                    problems.append(f"{key} 与 {existing} 取值冲突")
+                duplicate = True
+        if name != key:
+            problems.append(f"{key} 已规范化为 {name}")
+        if not duplicate:
+            normalized[name] = value
+    return normalized, problems
+
+
+@dataclass(frozen=True)
+class CapabilityProfile:
+    """规范化并冻结后的单个 capabilities profile。"""
+
+    name: str
+    source: Path
+    capabilities: Mapping[str, Any]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """可修改的 capabilities 副本。"""
+        return copy.deepcopy(dict(self.capabilities))
+
+    @cached_property
+    def remote_kwargs(self) -> Dict[str, Any]:
+        """`webdriver.Remote` 的 Options 参数，首次访问时构建一次。"""
+        from src.core.driver_factory import build_remote_kwargs  # pylint: disable=import-outside-toplevel
+
+        return build_remote_kwargs(self.as_dict())
+
+
+def load_profiles(path: Path) -> Dict[str, CapabilityProfile]:
+    """读取并校验一个 capabilities 文件的全部 profile；有错误时抛出 ConfigError。"""
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ConfigError([f"{path.name}: 顶层应为 {{profile: capabilities}}"])
+    platform = path.stem.lower()
+    profiles: Dict[str, CapabilityProfile] = {}
+    errors: List[str] = []
+    for name, raw in data.items():
+        if not isinstance(raw, dict):
+            errors.append(f"{path.name}:{name}: capabilities 应为对象")
+            continue
+        caps, problems = normalize_capabilities(raw)
+        for problem in problems:
+            if "冲突" in problem:
+                errors.append(f"{path.name}:{name}: {problem}")
+            else:
+                setup_logger("tests").warning(f"{path.name}:{name}: {problem}")
+        declared = str(caps.get("platformName", platform)).lower()
+        if declared != platform:
+            errors.append(f"{path.name}:{name}: platformName={caps['platformName']} 与文件平台不一致")
+        profiles[name] = CapabilityProfile(name, path, MappingProxyType(caps))
+    if errors:
+        raise ConfigError(errors)
+    return profiles
 
 
 class ConfigLoader:
     """加载与提供测试运行所需配置。
 
     优先级：环境变量 > .env > 默认值/资源文件
+
+    构造时一次性读取 `.env` 与全部 capabilities 文件；进程内请通过 `get_config()` 复用实例。
     """
 
     def __init__(self) -> None:
-        load_dotenv()  # 加载 .env
         self.project_root = Path(__file__).resolve().parents[2]
         self.resources_dir = self.project_root / "resources"
         self.cap_dir = self.resources_dir / "capabilities"
-
+        self.env_file = self.project_root / ".env"
+        load_env_file(self.env_file)
+        self.stamp = _stamp(self.env_file, self.cap_dir)
+        self.catalog: Dict[Path, Dict[str, CapabilityProfile]] = {
+            path: load_profiles(path) for path in sorted(self.cap_dir.glob("*.json"))
+        }
         self._config = AppiumConfig(
             platform_name=os.getenv("PLATFORM_NAME", "Android"),
             appium_server_url=os.getenv("APPIUM_SERVER_URL", "http://127.0.0.1:4723"),
             capabilities_path=self._resolve_capabilities_path(),
             device_profile=os.getenv("DEVICE_PROFILE", "default"),
+            device_pool=os.getenv("DEVICE_POOL", ""),
+            session_pool_size=int(os.getenv("APPIUM_SESSION_POOL_SIZE", "1")),
+            command_stats=os.getenv("APPIUM_COMMAND_STATS", "0").lower() in ("1", "true", "yes"),
+            pipeline_width=int(os.getenv("APPIUM_PIPELINE_WIDTH", "1")),
+            case_plan=os.getenv("CASE_PLAN", "all").strip().lower(),
+            case_plan_k=int(os.getenv("CASE_PLAN_K", "1")),
+            result_cache=os.getenv("RESULT_CACHE", "off").strip().lower(),
+            artifact_budget_mb=int(os.getenv("ARTIFACT_BUDGET_MB", "200")),
+            artifact_format=os.getenv("ARTIFACT_FORMAT", "webp").strip().lower(),
+            lunar_oracle=os.getenv("LUNAR_ORACLE", "warn").strip().lower(),
         )
+        self._by_profile: Dict[str, AppiumConfig] = {self._config.device_profile: self._config}
 
     def _resolve_capabilities_path(self) -> Path:
         """根据平台推断默认的 capabilities 文件路径。"""
@@ -55,19 +192,87 @@ class ConfigLoader:
         """返回不可变配置快照。"""
         return self._config
 
-    def load_capabilities(self) -> Dict[str, Any]:
-        """读取 capabilities 文件，并按 `device_profile` 选择具体配置。"""
+    def for_profile(self, name: str) -> AppiumConfig:
+        """指定设备 profile 的配置快照（其余字段与当前配置相同）。"""
+        config = self._by_profile.get(name)
+        if config is None:
+            self.profile(name)
+            config = self._by_profile[name] = dataclasses.replace(self._config, device_profile=name)
+        return config
+
+    def profiles(self) -> Dict[str, CapabilityProfile]:
+        """当前平台 capabilities 文件中的全部 profile。"""
         path = self._config.capabilities_path
-        if not path.exists():
+        if path not in self.catalog:
             raise FileNotFoundError(f"未找到 capabilities 文件: {path}")
-        with path.open("r", encoding="utf-8") as f:
-            data: Dict[str, Any] = json.load(f)
-        profile = data.get(self._config.device_profile) or data.get("default")
-        if not isinstance(profile, dict):
+        return self.catalog[path]
+
+    def profile(self, name: Optional[str] = None) -> CapabilityProfile:
+        """按名称取 profile，缺省为 `device_profile`；不存在时回退到 default。"""
+        profiles = self.profiles()
+        found = profiles.get(name or self._config.device_profile) or profiles.get("default")
+        if found is None:
             raise ValueError("capabilities 配置格式不正确，缺少 default 或指定 profile")
-        return profile
+        return found
+
+    def load_capabilities(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """按 `device_profile`（或指定名称）返回规范化后的 capabilities 副本。"""
+        return self.profile(name).as_dict()
+
+    def device_pool_names(self) -> Optional[List[str]]:
+        """解析 `DEVICE_POOL`：``auto`` 表示全部带 udid 的 profile，否则为逗号分隔的 profile 名。"""
+        raw = self._config.device_pool.strip()
+        if not raw or raw.lower() == "auto":
+            return None
+        return [name.strip() for name in raw.split(",") if name.strip()]
+
+
+# 由 .env 写入（而非进程原有）的环境变量，.env 变化时可被覆盖或移除
+_DOTENV_KEYS: Set[str] = set()
+
+
+def load_env_file(path: Path) -> None:
+    """将 `.env` 载入环境变量；进程原有的变量优先，上次由 .env 写入的变量随文件更新。"""
+    values = {k: v for k, v in dotenv_values(path).items() if v is not None} if path.exists() else {}
+    for key in _DOTENV_KEYS - values.keys():
+        os.environ.pop(key, None)
+        _DOTENV_KEYS.discard(key)
+    for key, value in values.items():
+        if key in _DOTENV_KEYS or key not in os.environ:
+            os.environ[key] = value
+            _DOTENV_KEYS.add(key)
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _stamp(env_file: Path, cap_dir: Path) -> Tuple[Any, ...]:
+    """配置来源的指纹：.env 与各 capabilities 文件的 mtime，以及相关环境变量取值。"""
+    try:
+        with os.scandir(cap_dir) as entries:
+            files = tuple(sorted((e.name, e.stat().st_mtime_ns) for e in entries if e.name.endswith(".json")))
+    except FileNotFoundError:
+        files = ()
+    return (_mtime(env_file), files, tuple(os.environ.get(key) for key in ENV_KEYS))
+
+
+_DEFAULT_CONFIG: Optional[ConfigLoader] = None
+_CONFIG_LOCK = threading.Lock()
 
 
 def get_config() -> ConfigLoader:
-    """获取配置加载器实例。"""
-    return ConfigLoader()
+    """获取进程内共享的配置加载器；配置文件或相关环境变量变化后自动重建。"""
+    global _DEFAULT_CONFIG  # pylint: disable=global-statement
+    with _CONFIG_LOCK:
+        loader = _DEFAULT_CONFIG
+        if loader is not None:
+            if _mtime(loader.env_file) != loader.stamp[0]:
+                load_env_file(loader.env_file)
+            if _stamp(loader.env_file, loader.cap_dir) == loader.stamp:
+                return loader
+        _DEFAULT_CONFIG = ConfigLoader()
+        return _DEFAULT_CONFIG
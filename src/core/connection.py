@@ -0,0 +1,75 @@
+"""带埋点的 Appium 连接
+
+职责：
+- `InstrumentedConnection`：在 keep-alive 连接上记录每条 WebDriver 命令的名称、请求/响应字节数与耗时，
+  并按 `pipeline_width` 放宽连接池容量以容纳并发的只读命令
+- 依赖 appium.webdriver（导入较重），通过 `src.core.transport.InstrumentedConnection` 延迟导出
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from selenium.webdriver.remote import utils
+
+from src.core.logger import setup_logger
+from src.core.transport import CommandRecorder, get_command_recorder
+
+if TYPE_CHECKING:
+    from appium.webdriver.appium_connection import AppiumConnection as _BaseConnection
+else:
+    try:
+        from appium.webdriver.appium_connection import AppiumConnection as _BaseConnection
+    except ImportError:  # pragma: no cover - 旧版客户端
+        from selenium.webdriver.remote.remote_connection import RemoteConnection as _BaseConnection
+
+
+class InstrumentedConnection(_BaseConnection):
+    """记录命令统计的 Appium 连接；`pipeline_width` > 1 时允许并发发出只读命令。"""
+
+    def __init__(
+        self,
+        *args: Any,
+        recorder: Optional[CommandRecorder] = None,
+        pipeline_width: int = 1,
+        **kwargs: Any,
+    ) -> None:
+        self.recorder = recorder or get_command_recorder()
+        self.pipeline_width = max(1, pipeline_width)
+        self._io = threading.local()
+        self._command_logger = setup_logger("commands")
+        super().__init__(*args, **kwargs)
+
+    def execute(self, command: str, params: Dict[str, Any]) -> Any:
+        sent = len(utils.dump_json(params)) if params else 0
+        self._io.received = 0
+        start = time.perf_counter()
+        try:
+            return super().execute(command, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            received = getattr(self._io, "received", 0)
+            self.recorder.record(command, sent, received, elapsed, getattr(self._io, "scope", None))
+            self._command_logger.info(f"{command} 发送 {sent}B 接收 {received}B 耗时 {elapsed * 1000:.1f}ms")
+
+    def method_of(self, command: str) -> str:
+        info = self._commands.get(command) or self.extra_commands.get(command)
+        return str(info[0]) if info else ""
+
+    def _get_connection_manager(self) -> Any:
+        manager = super()._get_connection_manager()
+        # 连接池容量需容纳并发的流水线请求，否则多出的连接用完即弃
+        if hasattr(manager, "connection_pool_kw"):
+            manager.connection_pool_kw["maxsize"] = max(getattr(self, "pipeline_width", 1), 1)
+        original = manager.request
+        io = self._io
+
+        def request(*args: Any, **kwargs: Any) -> Any:
+            response = original(*args, **kwargs)
+            io.received = len(response.data or b"")
+            return response
+
+        manager.request = request
+        return manager
@@ -0,0 +1,333 @@
+"""测试数据仓库模块
+
+职责：
+- 每个数据文件每个进程只解析一次，并按内置 schema 校验（月相名、日期格式、出生信息必填字段）
+- 建立按月相、年份、日期区间的索引，参数化时直接按条件取子集
+- 校验通过的结果写入 `.cache/test_data/` 下按源文件路径命名的紧凑 JSON 副本，记录源文件 mtime/size 与内容哈希；
+  mtime/size 未变时不读原文件，仅时间戳变化时按内容哈希沿用副本，均跳过解析与 schema 校验
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.core.logger import setup_logger
+from src.utils.path import project_root
+
+DEFAULT_DATA_FILE = project_root() / "src" / "test_data" / "data.json"
+DEFAULT_CACHE_DIR = project_root() / ".cache" / "test_data"
+SIDECAR_VERSION = 3
+
+LUNAR_SECTION = "lunar phase"
+BIRTH_CHART_SECTION = "birth_chart"
+
+PHASES: Tuple[str, ...] = (
+    "new moon",
+    "waxing crescent",
+    "first quarter",
+    "waxing gibbous",
+    "full moon",
+    "waning gibbous",
+    "last quarter",
+    "waning crescent",
+)
+
+# 出生信息用例的必填字段（`excpected` 沿用数据文件中的拼写）
+BIRTH_CHART_FIELDS: Tuple[str, ...] = (
+    "birth_date",
+    "birth_time",
+    "continent",
+    "region",
+    "state",
+    "city",
+    "sex",
+    "emoji",
+    "relationship",
+    "excpected",
+)
+
+DateLike = Union[str, dt.date]
+
+
+class DataSetError(ValueError):
+    """数据文件不符合 schema。`errors` 为全部问题的列表。"""
+
+    def __init__(self, path: Path, errors: List[str]) -> None:
+        self.path = path
+        self.errors = errors
+        super().__init__(f"{path} 校验失败（{len(errors)} 处）:\n  " + "\n  ".join(errors))
+
+
+@dataclass(frozen=True)
+class LunarCase:
+    """单条月相用例：日期（ISO 格式）与期望月相。"""
+
+    date: str
+    phase: str
+
+    @property
+    def day(self) -> dt.date:
+        return dt.date.fromisoformat(self.date)
+
+    @property
+    def year(self) -> int:
+        return int(self.date[:4])
+
+    @property
+    def id(self) -> str:
+        """参数化用例 ID，空格替换为下划线以便 `-k new_moon` 筛选。"""
+        return f"{self.date}-{self.phase.replace(' ', '_')}"
+
+    def as_param(self) -> Tuple[str, str]:
+        return self.date, self.phase
+
+
+def _parse_day(value: Any) -> Optional[dt.date]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return dt.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _valid_time(value: Any) -> bool:
+    if not isinstance(value, str) or len(value) != 5 or value[2] != ":":
+        return False
+    hour, minute = value[:2], value[3:]
+    return hour.isdigit() and minute.isdigit() and int(hour) < 24 and int(minute) < 60
+
+
+def validate(raw: Any) -> List[str]:
+    """按 schema 校验已解析的 JSON，返回问题列表（为空表示通过）。"""
+    if not isinstance(raw, dict):
+        return ["顶层必须是对象"]
+    errors: List[str] = []
+    lunar = raw.get(LUNAR_SECTION, [])
+    if not isinstance(lunar, list):
+        errors.append(f"{LUNAR_SECTION}: 必须是数组")
+        lunar = []
+    seen: Dict[str, str] = {}
+    for i, item in enumerate(lunar):
+        where = f"{LUNAR_SECTION}[{i}]"
+        if not isinstance(item, dict) or not item:
+            errors.append(f"{where}: 必须是非空的 {{日期: 月相}} 对象")
+            continue
+        for day, phase in item.items():
+            if _parse_day(day) is None:
+                errors.append(f"{where}: 日期格式应为 YYYY-MM-DD: {day!r}")
+            if phase not in PHASES:
+                errors.append(f"{where}: 未知月相 {phase!r}")
+            if day in seen and seen[day] != phase:
+                errors.append(f"{where}: 日期 {day} 的月相与之前的 {seen[day]!r} 冲突")
+            seen.setdefault(day, phase)
+    charts = raw.get(BIRTH_CHART_SECTION, [])
+    if not isinstance(charts, list):
+        errors.append(f"{BIRTH_CHART_SECTION}: 必须是数组")
+        charts = []
+    for i, item in enumerate(charts):
+        where = f"{BIRTH_CHART_SECTION}[{i}]"
+        if not isinstance(item, dict):
+            errors.append(f"{where}: 必须是对象")
+            continue
+        missing = [key for key in BIRTH_CHART_FIELDS if not item.get(key)]
+        if missing:
+            errors.append(f"{where}: 缺少字段 {', '.join(missing)}")
+        if item.get("birth_date") and _parse_day(item["birth_date"]) is None:
+            errors.append(f"{where}: birth_date 格式应为 YYYY-MM-DD: {item['birth_date']!r}")
+        if item.get("birth_time") and not _valid_time(item["birth_time"]):
+            errors.append(f"{where}: birth_time 格式应为 HH:MM: {item['birth_time']!r}")
+    return errors
+
+
+class DataSet:
+    """校验后的测试数据及其索引；查询结果保持数据文件中的原始顺序。"""
+
+    def __init__(
+        self,
+        lunar: Iterable[Tuple[str, str]],
+        birth_charts: Iterable[Dict[str, Any]],
+        digest: str = "",
+        from_cache: bool = False,
+    ) -> None:
+        self.lunar: Tuple[LunarCase, ...] = tuple(LunarCase(day, phase) for day, phase in lunar)
+        self.birth_charts: Tuple[Dict[str, Any], ...] = tuple(birth_charts)
+        self.digest = digest
+        self.from_cache = from_cache
+        self._by_phase: Dict[str, List[int]] = {}
+        self._by_year: Dict[int, List[int]] = {}
+        for i, case in enumerate(self.lunar):
+            self._by_phase.setdefault(case.phase, []).append(i)
+            self._by_year.setdefault(case.year, []).append(i)
+        # 按日期排序的位置索引，区间查询用二分
+        self._by_date = sorted(range(len(self.lunar)), key=lambda i: self.lunar[i].date)
+        self._ordinals = [self.lunar[i].day.toordinal() for i in self._by_date]
+
+    def __len__(self) -> int:
+        return len(self.lunar)
+
+    def phases(self) -> List[str]:
+        return [phase for phase in PHASES if phase in self._by_phase]
+
+    def years(self) -> List[int]:
+        return sorted(self._by_year)
+
+    def select(
+        self,
+        phase: Optional[Union[str, Iterable[str]]] = None,
+        year: Optional[int] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+    ) -> List[LunarCase]:
+        """按月相（单个或多个）、年份、闭区间 [start, end] 取月相用例子集。"""
+        positions: Optional[set] = None
+        if phase is not None:
+            names = [phase] if isinstance(phase, str) else list(phase)
+            positions = {i for name in names for i in self._by_phase.get(name, [])}
+        if year is not None:
+            in_year = set(self._by_year.get(year, []))
+            positions = in_year if positions is None else positions & in_year
+        if start is not None or end is not None:
+            low = bisect.bisect_left(self._ordinals, _ordinal(start)) if start is not None else 0
+            high = bisect.bisect_right(self._ordinals, _ordinal(end)) if end is not None else len(self._ordinals)
+            in_range = set(self._by_date[low:high])
+            positions = in_range if positions is None else positions & in_range
+        if positions is None:
+            return list(self.lunar)
+        return [self.lunar[i] for i in sorted(positions)]
+
+    def lunar_params(self, **filters: Any) -> List[Tuple[str, str]]:
+        """`select()` 结果转为 `(date_str, lunar_phase)` 参数元组。"""
+        return [case.as_param() for case in self.select(**filters)]
+
+    def lunar_ids(self, **filters: Any) -> List[str]:
+        return [case.id for case in self.select(**filters)]
+
+    def payload(self) -> Dict[str, Any]:
+        """写入缓存副本的紧凑形式。"""
+        return {
+            "version": SIDECAR_VERSION,
+            "digest": self.digest,
+            "lunar": [case.as_param() for case in self.lunar],
+            "birth_charts": list(self.birth_charts),
+        }
+
+
+def _ordinal(value: DateLike) -> int:
+    day = value if isinstance(value, dt.date) else dt.date.fromisoformat(value)
+    return day.toordinal()
+
+
+def parse(raw: Dict[str, Any], path: Path, digest: str = "") -> DataSet:
+    """校验并构建数据集；不符合 schema 时抛出 DataSetError。"""
+    errors = validate(raw)
+    if errors:
+        raise DataSetError(path, errors)
+    lunar = [(day, phase) for item in raw.get(LUNAR_SECTION, []) for day, phase in item.items()]
+    return DataSet(lunar, raw.get(BIRTH_CHART_SECTION, []), digest)
+
+
+class DataRepository:
+    """测试数据文件的进程内缓存。
+
+    - `load(path)`：文件 mtime/size 未变时直接返回同一个 DataSet；新进程中 mtime/size 与缓存副本一致时
+      只读副本，不一致时读取原文件比对内容哈希，内容确有变化才解析并校验
+    - `parses`：实际解析 JSON 的次数，便于验证缓存是否生效
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._lock = threading.Lock()
+        self._loaded: Dict[Path, Tuple[Tuple[int, int], DataSet]] = {}
+        self._logger = setup_logger("tests")
+        self.parses = 0
+
+    def load(self, path: Union[str, Path] = DEFAULT_DATA_FILE) -> DataSet:
+        path = Path(path).resolve()
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._loaded.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            dataset = self._load(path, stamp)
+            self._loaded[path] = (stamp, dataset)
+            return dataset
+
+    def sidecar_path(self, path: Path) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{_sidecar_prefix(path)}.v{SIDECAR_VERSION}.json"
+
+    def _load(self, path: Path, stamp: Tuple[int, int]) -> DataSet:
+        sidecar = self.sidecar_path(path)
+        cached = self._read_sidecar(sidecar)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        data = path.read_bytes()
+        digest = hashlib.sha1(data).hexdigest()
+        if cached is not None and cached[1].digest == digest:
+            # 仅时间戳变化（如重新检出）：沿用副本，更新其中记录的 mtime/size
+            dataset = cached[1]
+        else:
+            self.parses += 1
+            dataset = parse(json.loads(data.decode("utf-8")), path, digest)
+        if sidecar is not None:
+            self._write_sidecar(sidecar, path, stamp, dataset)
+        return dataset
+
+    def _read_sidecar(self, sidecar: Optional[Path]) -> Optional[Tuple[Tuple[int, int], DataSet]]:
+        """读取缓存副本，返回 (源文件 mtime/size, DataSet)；不存在、版本不符或损坏时返回 None。"""
+        if sidecar is None or not sidecar.exists():
+            return None
+        try:
+            payload = json.loads(sidecar.read_bytes())
+            if payload.get("version") != SIDECAR_VERSION:
+                return None
+            stamp = (int(payload["mtime_ns"]), int(payload["size"]))
+            return stamp, DataSet(payload["lunar"], payload["birth_charts"], str(payload["digest"]), from_cache=True)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            self._logger.warning(f"测试数据缓存损坏，重新解析: {sidecar} ({exc})")
+            return None
+
+    def _write_sidecar(self, sidecar: Path, path: Path, stamp: Tuple[int, int], dataset: DataSet) -> None:
+        payload = dict(dataset.payload(), mtime_ns=stamp[0], size=stamp[1])
+        try:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            tmp = sidecar.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            tmp.replace(sidecar)
+            # 同一数据文件的旧版本副本不再需要；前缀含完整路径哈希，不会误删其他目录下同名文件的副本
+            for stale in sidecar.parent.glob(f"{_sidecar_prefix(path)}.*.json"):
+                if stale != sidecar:
+                    stale.unlink(missing_ok=True)
+        except OSError as exc:
+            self._logger.warning(f"写入测试数据缓存失败: {sidecar} ({exc})")
+
+
+def _sidecar_prefix(path: Path) -> str:
+    """缓存副本文件名前缀：文件名 + 完整路径哈希。"""
+    return f"{path.stem}.{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:12]}"
+
+
+_DEFAULT_REPOSITORY: Optional[DataRepository] = None
+
+
+def get_data_repository() -> DataRepository:
+    """获取进程内共享的测试数据仓库。"""
+    global _DEFAULT_REPOSITORY  # pylint: disable=global-statement
+    if _DEFAULT_REPOSITORY is None:
+        _DEFAULT_REPOSITORY = DataRepository()
+    return _DEFAULT_REPOSITORY
+
+
+def load_dataset(path: Union[str, Path] = DEFAULT_DATA_FILE) -> DataSet:
+    """使用默认仓库加载数据文件（默认为 `src/test_data/data.json`）。"""
+    return get_data_repository().load(path)
@@ -0,0 +1,246 @@
+"""系统日期控制模块
+
+职责：
+- 抽象“设置设备日期”为多个后端：单条 shell 命令（`cmd alarm set-time`）、root `date` + TIME_SET 广播、设置页 UI 操作
+- 按成本从低到高探测设备支持的后端，选中后按设备缓存，失败时自动回退到下一个后端
+- shell 后端在同一条命令中回读 `date +%F` 校验结果，不额外增加往返
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
+
+from src.core.logger import setup_logger
+from src.core.tracing import span
+
+DateLike = Union[str, dt.date]
+
+
+class DateControlError(RuntimeError):
+    """日期设置失败或回读校验不一致。"""
+
+
+def to_date(value: DateLike) -> dt.date:
+    """将 ``YYYY-MM-DD`` 字符串或 date 统一为 date。"""
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, dt.date):
+        return value
+    return dt.date.fromisoformat(value)
+
+
+def device_key(driver: Any) -> str:
+    """用于缓存后端选择的设备标识（读取本地 capabilities，不发请求）。"""
+    caps = getattr(driver, "capabilities", None) or {}
+    return str(caps.get("udid") or caps.get("deviceUDID") or caps.get("deviceName") or "default")
+
+
+def shell(driver: Any, command: str, timeout_ms: int = 20000) -> str:
+    """通过 `mobile: shell` 执行一条 shell 命令并返回输出。"""
+    output = driver.execute_script("mobile: shell", {"command": command, "timeout": timeout_ms})
+    if isinstance(output, dict):  # includeStderr 时返回 {"stdout":..., "stderr":...}
+        output = output.get("stdout", "")
+    return str(output or "")
+
+
+class DateBackend(ABC):
+    """日期后端基类。`cost` 为单次设置的预估命令数，用于排序；缺少任一抽象方法的后端在构造时即报错。"""
+
+    name = "base"
+    cost = 0
+    # 失败后是否仍允许后续用例重试（兜底后端应为 True）
+    retry_after_failure = False
+
+    @abstractmethod
+    def supports(self, driver: Any) -> bool:
+        """设备是否支持该后端（可发送探测命令，结果应自行缓存）。"""
+
+    @abstractmethod
+    def set_date(self, driver: Any, target: dt.date) -> None:
+        """将设备日期设置为 ``target``，失败时抛出 DateControlError。"""
+
+
+class _ShellBackend(DateBackend):
+    """基于 `mobile: shell` 的后端公共逻辑：一次探测获取 SDK 版本与时区并缓存。"""
+
+    min_sdk = 0
+
+    def __init__(self) -> None:
+        self._probed: Dict[str, Dict[str, str]] = {}
+
+    def supports(self, driver: Any) -> bool:
+        info = self.probe(driver)
+        return bool(info) and int(info.get("sdk") or 0) >= self.min_sdk and self._extra_support(info)
+
+    def probe(self, driver: Any) -> Dict[str, str]:
+        key = device_key(driver)
+        if key not in self._probed:
+            try:
+                out = shell(driver, self.probe_command())
+            except Exception:  # pylint: disable=broad-except
+                # 服务端未开启 adb_shell 等情况
+                self._probed[key] = {}
+            else:
+                self._probed[key] = self.parse_probe(out)
+        return self._probed[key]
+
+    def probe_command(self) -> str:
+        return "getprop ro.build.version.sdk; getprop persist.sys.timezone"
+
+    def parse_probe(self, out: str) -> Dict[str, str]:
+        lines = [line.strip() for line in out.splitlines()]
+        lines += ["", ""]
+        if not lines[0].isdigit():
+            return {}
+        return {"sdk": lines[0], "tz": lines[1]}
+
+    def _extra_support(self, info: Dict[str, str]) -> bool:
+        return True
+
+    @staticmethod
+    def verify(out: str, target: dt.date) -> None:
+        if target.isoformat() not in out:
+            raise DateControlError(f"日期回读不一致，期望 {target.isoformat()}，输出: {out.strip()[-120:]}")
+
+
+class AlarmShellBackend(_ShellBackend):
+    """`cmd alarm set-time`：无需 root，一条命令完成关闭自动时间、设置时间与回读。"""
+
+    name = "alarm-shell"
+    cost = 1
+    min_sdk = 28
+
+    def set_date(self, driver: Any, target: dt.date) -> None:
+        millis = self._epoch_millis(target, self.probe(driver).get("tz", ""))
+        out = shell(driver, f"settings put global auto_time 0; cmd alarm set-time {millis}; date +%F")
+        self.verify(out, target)
+
+    @staticmethod
+    def _epoch_millis(target: dt.date, tz_name: str) -> int:
+        """目标日期当地正午对应的毫秒时间戳；正午可容忍时区误差而不跨日。"""
+        tz: dt.tzinfo = dt.timezone.utc
+        if tz_name:
+            try:
+                from zoneinfo import ZoneInfo  # pylint: disable=import-outside-toplevel
+
+                tz = ZoneInfo(tz_name)
+            except Exception:  # pylint: disable=broad-except
+                tz = dt.timezone.utc
+        noon = dt.datetime(target.year, target.month, target.day, 12, 0, 0, tzinfo=tz)
+        return int(noon.timestamp() * 1000)
+
+
+class RootShellBackend(_ShellBackend):
+    """`su 0 date` + TIME_SET 广播：适用于 userdebug/root 模拟器。"""
+
+    name = "root-shell"
+    cost = 1
+
+    def probe_command(self) -> str:
+        return "getprop ro.build.version.sdk; getprop persist.sys.timezone; su 0 id -u"
+
+    def parse_probe(self, out: str) -> Dict[str, str]:
+        info = super().parse_probe(out)
+        if info:
+            info["root"] = "1" if out.strip().splitlines()[-1].strip() == "0" else ""
+        return info
+
+    def _extra_support(self, info: Dict[str, str]) -> bool:
+        return bool(info.get("root"))
+
+    def set_date(self, driver: Any, target: dt.date) -> None:
+        stamp = f"{target.month:02d}{target.day:02d}1200{target.year:04d}.00"
+        out = shell(
+            driver,
+            "settings put global auto_time 0; "
+            f"su 0 toybox date {stamp} >/dev/null && am broadcast -a android.intent.action.TIME_SET >/dev/null; "
+            "date +%F",
+        )
+        self.verify(out, target)
+
+
+class UiDateBackend(DateBackend):
+    """通过设置页 UI 逐步输入年月日，所有设备都支持，但往返次数最多。"""
+
+    name = "settings-ui"
+    cost = 40
+    retry_after_failure = True
+
+    def __init__(self, flow: Callable[[Any, dt.date], None]) -> None:
+        self._flow = flow
+
+    def supports(self, driver: Any) -> bool:
+        return True
+
+    def set_date(self, driver: Any, target: dt.date) -> None:
+        self._flow(driver, target)
+
+
+class BackendMemory:
+    """按设备记录已选中与已失败的后端，跨用例共享，避免重复探测失败的后端。"""
+
+    def __init__(self) -> None:
+        self.selected: Dict[str, str] = {}
+        self.failed: Dict[str, Set[str]] = {}
+        self.lock = threading.Lock()
+
+
+_MEMORY = BackendMemory()
+
+
+class DateController:
+    """选择最快可用后端设置设备日期，失败时回退。
+
+    选中的后端按设备记忆（默认进程级），后续用例直接使用，不再重复探测。
+    """
+
+    def __init__(self, driver: Any, backends: Sequence[DateBackend], memory: Optional[BackendMemory] = None) -> None:
+        if not backends:
+            raise ValueError("至少需要一个日期后端")
+        self.driver = driver
+        self.backends: List[DateBackend] = sorted(backends, key=lambda b: b.cost)
+        self.memory = memory or _MEMORY
+        self._key = device_key(driver)
+        self._logger = setup_logger("tests")
+
+    @property
+    def selected(self) -> Optional[str]:
+        return self.memory.selected.get(self._key)
+
+    def set_date(self, value: DateLike) -> str:
+        """设置设备日期，返回实际使用的后端名称。"""
+        target = to_date(value)
+        errors: List[str] = []
+        for backend in self._candidates():
+            if backend.name != self.selected and not backend.supports(self.driver):
+                continue
+            try:
+                with span(f"date.{backend.name}"):
+                    backend.set_date(self.driver, target)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(f"{backend.name}: {exc}")
+                self._logger.warning(f"日期后端 {backend.name} 失败，回退下一个: {exc}")
+                self._mark_failed(backend)
+                continue
+            with self.memory.lock:
+                self.memory.selected[self._key] = backend.name
+            self._logger.info(f"日期已设置为 {target.isoformat()}（后端 {backend.name}）")
+            return backend.name
+        raise DateControlError(f"所有日期后端均失败: {'; '.join(errors) or '无可用后端'}")
+
+    def _candidates(self) -> List[DateBackend]:
+        selected = self.selected
+        failed = self.memory.failed.get(self._key, set())
+        ordered = [b for b in self.backends if b.name == selected]
+        ordered += [b for b in self.backends if b.name != selected and b.name not in failed]
+        return ordered
+
+    def _mark_failed(self, backend: DateBackend) -> None:
+        with self.memory.lock:
+            if not backend.retry_after_failure:
+                self.memory.failed.setdefault(self._key, set()).add(backend.name)
+            if self.memory.selected.get(self._key) == backend.name:
+                self.memory.selected.pop(self._key, None)
@@ -0,0 +1,235 @@
+"""设备池调度模块
+
+职责：
+- 从 capabilities 文件中挑选带 `udid`/`systemPort` 的设备 profile 组成设备池
+- 多个 pytest-xdist worker 通过锁文件上的操作系统排他锁（fcntl/msvcrt）各自租用一台互不相同的设备，
+  进程崩溃时锁由操作系统释放，无需按 pid 探活回收
+- 将参数化用例按预估耗时均衡分配到各设备槽位（配合 `--dist loadgroup`）
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from src.core.logger import setup_logger
+
+T = TypeVar("T")
+
+DEFAULT_LEASE_DIR = Path(".device_leases")
+
+
+@dataclass(frozen=True)
+class DeviceLease:
+    """一次设备租用。"""
+
+    profile: str
+    capabilities: Dict[str, Any] = field(hash=False)
+    worker_id: str
+    lock_path: Path
+    # 持有排他锁的文件句柄，归还时关闭
+    handle: Optional[IO[str]] = field(default=None, compare=False, repr=False)
+
+    @property
+    def udid(self) -> str:
+        return str(self.capabilities.get("udid", ""))
+
+    @property
+    def system_port(self) -> int:
+        return int(self.capabilities.get("systemPort", 0))
+
+
+class DevicePool:
+    """基于文件锁的跨进程设备租用池。
+
+    锁文件常驻 `lease_dir`，租用即对其加非阻塞排他锁；文件内容仅记录持有者供排查，不参与判定。
+    """
+
+    def __init__(
+        self,
+        profiles: Dict[str, Dict[str, Any]],
+        lease_dir: Path = DEFAULT_LEASE_DIR,
+        probe: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> None:
+        if not profiles:
+            raise ValueError("设备池为空：capabilities 中没有带 udid 的 profile")
+        self._check_unique(profiles)
+        self.profiles = profiles
+        self.lease_dir = Path(lease_dir)
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+        self.probe = probe
+        self._logger = setup_logger("tests")
+
+    @classmethod
+    def from_capabilities(
+        cls, path: Path, names: Optional[Sequence[str]] = None, lease_dir: Path = DEFAULT_LEASE_DIR, **kwargs: Any
+    ) -> "DevicePool":
+        """从 capabilities 文件构建设备池；未指定 `names` 时选取所有带 udid 的 profile。"""
+        with Path(path).open("r", encoding="utf-8") as f:
+            data: Dict[str, Any] = json.load(f)
+        return cls.from_profiles(data, names, lease_dir=lease_dir, **kwargs)
+
+    @classmethod
+    def from_profiles(
+        cls,
+        data: Dict[str, Any],
+        names: Optional[Sequence[str]] = None,
+        lease_dir: Path = DEFAULT_LEASE_DIR,
+        **kwargs: Any,
+    ) -> "DevicePool":
+        """从已加载的 {profile: capabilities} 构建设备池，选取规则同 `from_capabilities`。"""
+        if names:
+            missing = [n for n in names if n not in data]
+            if missing:
+                raise ValueError(f"capabilities 中不存在设备 profile: {missing}")
+            profiles = {n: data[n] for n in names}
+        else:
+            profiles = {n: p for n, p in data.items() if isinstance(p, dict) and p.get("udid")}
+        return cls(profiles, lease_dir=lease_dir, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def lease(self, worker_id: Optional[str] = None, timeout: float = 60.0, poll: float = 0.5) -> DeviceLease:
+        """为当前 worker 租用一台空闲设备，优先选择与 worker 编号对应的设备。"""
+        worker_id = worker_id or current_worker_id()
+        names = list(self.profiles)
+        start = worker_index(worker_id) % len(names)
+        ordered = names[start:] + names[:start]
+        deadline = time.monotonic() + timeout
+        while True:
+            for name in ordered:
+                lease = self._try_acquire(name, worker_id)
+                if lease is not None:
+                    self._logger.info(
+                        f"{worker_id} 租用设备 {name} (udid={lease.udid}, systemPort={lease.system_port})"
+                    )
+                    return lease
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{worker_id} 在 {timeout}s 内未租到空闲设备，设备数 {len(names)}")
+            time.sleep(poll)
+
+    def release(self, lease: DeviceLease) -> None:
+        """归还设备：清空持有者信息并释放文件锁（锁文件保留，避免删除与加锁之间的竞争）。"""
+        handle = lease.handle
+        if handle is None or handle.closed:
+            return
+        try:
+            handle.seek(0)
+            handle.truncate()
+            handle.flush()
+        finally:
+            _unlock(handle)
+            handle.close()
+        self._logger.info(f"{lease.worker_id} 归还设备 {lease.profile}")
+
+    def _try_acquire(self, name: str, worker_id: str) -> Optional[DeviceLease]:
+        lock_path = self.lease_dir / f"{name}.lock"
+        handle = open(lock_path, "a+", encoding="utf-8")  # pylint: disable=consider-using-with
+        if not _lock(handle):
+            handle.close()
+            return None
+        handle.seek(0)
+        handle.truncate()
+        json.dump({"worker": worker_id, "pid": os.getpid(), "time": time.time()}, handle)
+        handle.flush()
+        lease = DeviceLease(
+            profile=name,
+            capabilities=dict(self.profiles[name]),
+            worker_id=worker_id,
+            lock_path=lock_path,
+            handle=handle,
+        )
+        if self.probe is not None and not self.probe(lease.capabilities):
+            self._logger.warning(f"设备 {name} 健康检查失败，跳过")
+            self.release(lease)
+            return None
+        return lease
+
+    @staticmethod
+    def _check_unique(profiles: Dict[str, Dict[str, Any]]) -> None:
+        for key in ("udid", "systemPort"):
+            values = [p.get(key) for p in profiles.values() if p.get(key) is not None]
+            if len(values) != len(set(values)):
+                raise ValueError(f"设备池中 {key} 重复: {values}")
+
+
+def balance(cases: Iterable[T], slots: int, cost: Optional[Callable[[T], float]] = None) -> List[List[T]]:
+    """按预估耗时将用例均衡分配到 `slots` 个槽位（最长处理时间优先的贪心策略）。
+
+    同耗时用例保持原有顺序，结果可复现。
+    """
+    if slots <= 0:
+        raise ValueError(f"slots 必须大于 0: {slots}")
+    cost = cost or (lambda _: 1.0)
+    indexed = sorted(enumerate(cases), key=lambda pair: (-cost(pair[1]), pair[0]))
+    members: List[List[Tuple[int, T]]] = [[] for _ in range(slots)]
+    loads = [0.0] * slots
+    for idx, case in indexed:
+        target = min(range(slots), key=lambda s: (loads[s], s))
+        loads[target] += cost(case)
+        members[target].append((idx, case))
+    # 槽位内恢复原始顺序
+    return [[case for _, case in sorted(group, key=lambda pair: pair[0])] for group in members]
+
+
+def current_worker_id() -> str:
+    """返回 pytest-xdist worker 标识（如 ``gw0``），非分布式运行时为 ``master``。"""
+    return os.getenv("PYTEST_XDIST_WORKER", "master")
+
+
+def worker_index(worker_id: str) -> int:
+    """从 ``gwN`` 解析 worker 序号，无法解析时返回 0。"""
+    digits = "".join(ch for ch in worker_id if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+def server_ready(server_url: str, timeout: float = 2.0) -> bool:
+    """通过 `/status` 检查 Appium 服务是否就绪。"""
+    try:
+        with urllib.request.urlopen(f"{server_url.rstrip('/')}/status", timeout=timeout) as resp:
+            payload = json.loads(resp.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return False
+    value = payload.get("value") if isinstance(payload, dict) else None
+    return bool(value.get("ready", True)) if isinstance(value, dict) else False
+
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(handle: IO[str]) -> bool:
+        """对文件首字节加非阻塞排他锁（句柄关闭或进程退出时由系统释放）。"""
+        handle.seek(0)
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(handle: IO[str]) -> None:
+        handle.seek(0)
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+
+else:
+    import fcntl
+
+    def _lock(handle: IO[str]) -> bool:
+        """对整个文件加非阻塞排他锁（按打开的文件描述，同进程内的不同句柄同样互斥）。"""
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(handle: IO[str]) -> None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
@@ -3,57 +3,195 @@
 职责：
 - 依据 capabilities 与服务器地址创建 `webdriver.Remote`
 - 兼容不同版本的 appium-python-client：优先平台 Options，其次 AppiumOptions，最后回退 desired_capabilities
+- 通过会话池维持预热会话，会话中途失效时自动换新；所有会话共享同一个 keep-alive HTTP 连接池
+- 新建会话挂载 `DeviceGeometry`，窗口尺寸等几何信息每个会话只取一次
 """
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from importlib import import_module
 
-from appium import webdriver
+from src.core import transport
+from src.core.geometry import geometry_of
+from src.core.lazy import lazy_import
+from src.core.logger import setup_logger
+from src.core.session_pool import SessionPool, is_session_alive
+from src.core.tracing import span
+
+if TYPE_CHECKING:
+    from appium.webdriver.webdriver import WebDriver
+
+# 创建会话时才加载 appium.webdriver
+webdriver = lazy_import("appium.webdriver")
+
+
+def build_remote_kwargs(caps: Dict[str, Any]) -> Dict[str, Any]:
+    """构建 Remote 初始化参数，包含 Options 或 desired_capabilities。"""
+    platform = str(caps.get("platformName", "Android")).lower()
+
+    if platform == "android":
+        try:
+            UiAutomator2Options = getattr(import_module("appium.options.android"), "UiAutomator2Options")
+            return {"options": UiAutomator2Options().load_capabilities(caps)}
+        except Exception:
+            pass
+
+    if platform == "ios":
+        try:
+            XCUITestOptions = getattr(import_module("appium.options.ios"), "XCUITestOptions")
+            return {"options": XCUITestOptions().load_capabilities(caps)}
+        except Exception:
+            pass
+
+    try:
+        AppiumOptions = getattr(import_module("appium.options.common"), "AppiumOptions")
+        return {"options": AppiumOptions().load_capabilities(caps)}
+    except Exception:
+        return {"desired_capabilities": caps}
+
+
+# 同一设备上同时只允许一个会话的自动化驱动
+EXCLUSIVE_AUTOMATIONS = {"uiautomator2", "xcuitest", "espresso"}
+
+
+def _automation_name(caps: Dict[str, Any]) -> str:
+    return str(caps.get("appium:automationName", caps.get("automationName", "")))
+
+
+def _exclusive_device(caps: Dict[str, Any]) -> bool:
+    """capabilities 指向的驱动是否独占设备（未指定 automationName 时按 Android/iOS 默认驱动判断）。"""
+    automation = _automation_name(caps).lower()
+    if automation:
+        return automation in EXCLUSIVE_AUTOMATIONS
+    return str(caps.get("platformName", "")).lower() in {"android", "ios"}
 
 
 class DriverFactory:
-    """Driver 工厂：统一管理创建与销毁，避免重复会话。"""
+    """Driver 工厂：统一管理创建与销毁，避免重复会话。
 
-    def __init__(self, server_url: str, capabilities: Dict[str, Any]):
+    - `pool_size`：预热会话数；池中会话共用同一组 capabilities，即同一台设备。UiAutomator2/XCUITest/Espresso
+      在同一设备上新建会话会结束旧会话，因此这些驱动只允许 1（失效会话仍会自动换新）；多设备并行请使用 `DEVICE_POOL`
+    - `check_interval`：借出会话时健康检查的最小间隔（秒），0 表示每次都检查
+    - `instrument`：使用 `InstrumentedConnection` 记录每条命令的字节数与耗时
+    - `pipeline_width`：>1 时允许并发发出互不依赖的只读命令（隐含开启 `instrument`）
+    - `recorder`：命令统计的去向，默认为进程内共享的 `get_command_recorder()`
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        capabilities: Dict[str, Any],
+        pool_size: int = 1,
+        check_interval: float = 0.0,
+        instrument: bool = False,
+        pipeline_width: int = 1,
+        recorder: Optional[transport.CommandRecorder] = None,
+    ):
+        if pool_size > 1 and _exclusive_device(capabilities):
+            raise ValueError(
+                f"pool_size={pool_size} 无效：{_automation_name(capabilities) or '该驱动'} "
+                "在同一设备上只能保持一个会话，新会话会结束已有会话；多设备并行请使用 DEVICE_POOL"
+            )
         self._server_url = server_url
         self._capabilities = capabilities
-        self._driver: Optional[webdriver.Remote] = None
+        self._pool_size = pool_size
+        self._check_interval = check_interval
+        self._instrument = instrument or pipeline_width > 1
+        self._pipeline_width = pipeline_width
+        self._recorder = recorder
+        self._driver: Optional[WebDriver] = None
+        self._pool: Optional[SessionPool] = None
+        self._executor: Any = None
+        self._remote_kwargs: Optional[Dict[str, Any]] = None
+        self._logger = setup_logger("tests")
+
+    @property
+    def pool(self) -> SessionPool:
+        """懒加载的会话池。"""
+        if self._pool is None:
+            self._pool = SessionPool(self._new_session, size=self._pool_size, check_interval=self._check_interval)
+            self._pool.start(wait=False)
+        return self._pool
 
-    def create(self) -> webdriver.Remote:
+    @property
+    def current(self) -> Optional[WebDriver]:
+        """当前借出的会话（未创建时为 None）。"""
+        return self._driver
+
+    def create(self) -> WebDriver:
         """创建或返回已存在的 Appium Remote 实例。"""
         if self._driver is None:
-            kwargs = self._build_remote_kwargs(self._capabilities)
-            self._driver = webdriver.Remote(command_executor=self._server_url, **kwargs)
+            with span("driver.acquire"):
+                self._driver = self.pool.acquire()
         return self._driver
 
+    def ensure_healthy(self) -> WebDriver:
+        """确认当前会话可用；失效时丢弃并换用池中的预热会话。"""
+        if self._driver is None:
+            return self.create()
+        with span("driver.health_check"):
+            alive = is_session_alive(self._driver)
+        if not alive:
+            self._logger.warning("当前 Appium 会话已失效，切换到新会话")
+            with span("driver.replace"):
+                self._driver = self.pool.replace(self._driver)
+        return self._driver
+
+    def handle(self) -> "DriverHandle":
+        """返回指向当前会话的代理，会话被替换后持有者无需重新获取。"""
+        return DriverHandle(self)
+
     def quit(self) -> None:
         """关闭并清理驱动会话。"""
         if self._driver is not None:
-            self._driver.quit()
+            self.pool.release(self._driver)
             self._driver = None
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
 
-    @staticmethod
-    def _build_remote_kwargs(caps: Dict[str, Any]) -> Dict[str, Any]:
-        """构建 Remote 初始化参数，包含 Options 或 desired_capabilities。"""
-        platform = str(caps.get("platformName", "Android")).lower()
+    def _new_session(self) -> WebDriver:
+        if self._remote_kwargs is None:
+            # Options 只构建一次，池中各会话共用
+            self._remote_kwargs = build_remote_kwargs(self._capabilities)
+        kwargs = self._remote_kwargs
+        with span("driver.new_session"):
+            driver: WebDriver = webdriver.Remote(command_executor=self._command_executor(), **kwargs)
+        geometry_of(driver)
+        return driver
 
-        if platform == "android":
+    def _command_executor(self) -> Any:
+        """构建共享的 keep-alive 连接；旧版客户端不支持时回退为服务器地址。"""
+        if self._executor is None:
             try:
-                UiAutomator2Options = getattr(import_module("appium.options.android"), "UiAutomator2Options")
-                return {"options": UiAutomator2Options().load_capabilities(caps)}
+                AppiumConnection = import_module("appium.webdriver.appium_connection").AppiumConnection
+                AppiumClientConfig = import_module("appium.webdriver.client_config").AppiumClientConfig
+                config = AppiumClientConfig(remote_server_addr=self._server_url, keep_alive=True)
+                if self._instrument:
+                    self._executor = transport.InstrumentedConnection(
+                        client_config=config, recorder=self._recorder, pipeline_width=self._pipeline_width
+                    )
+                else:
+                    self._executor = AppiumConnection(client_config=config)
             except Exception:
-                pass
+                self._executor = self._server_url
+        return self._executor
 
-        if platform == "ios":
-            try:
-                XCUITestOptions = getattr(import_module("appium.options.ios"), "XCUITestOptions")
-                return {"options": XCUITestOptions().load_capabilities(caps)}
-            except Exception:
-                pass
 
-        try:
-            AppiumOptions = getattr(import_module("appium.options.common"), "AppiumOptions")
-            return {"options": AppiumOptions().load_capabilities(caps)}
-        except Exception:
-            return {"desired_capabilities": caps}
+class DriverHandle:
+    """`DriverFactory` 当前会话的轻量代理，属性访问全部转发给当前会话。
+
+    代理不是 `WebDriver` 子类，`isinstance(handle, WebDriver)` 为 False；需要真实实例时使用 `DriverFactory.current`。
+    """
+
+    def __init__(self, factory: DriverFactory) -> None:
+        object.__setattr__(self, "_factory", factory)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._factory.create(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._factory.create(), name, value)
+
+    def __repr__(self) -> str:
+        return f"DriverHandle({self._factory.current!r})"
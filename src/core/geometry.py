@@ -0,0 +1,133 @@
+"""设备几何信息模块
+
+职责：
+- 每个会话只获取一次窗口尺寸与屏幕方向，密度按需获取一次，之后从缓存读取
+- 仅当观察到方向或前台 Activity 变化（或经由本模块旋转屏幕）时才重新获取
+- 由 `DriverFactory` 挂到新建会话上，辅助函数统一通过 `geometry_of(driver)` 读取
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+from src.core.logger import setup_logger
+
+GEOMETRY_ATTR = "geometry"
+
+# page_source 中 hierarchy 的 rotation 属性与方向的对应关系
+_ROTATION_ORIENTATION = {0: "PORTRAIT", 1: "LANDSCAPE", 2: "PORTRAIT", 3: "LANDSCAPE"}
+
+
+@dataclass(frozen=True)
+class Geometry:
+    """某一时刻的窗口几何信息。`density` 未获取时为 None。"""
+
+    width: int
+    height: int
+    orientation: str
+    activity: str = ""
+    density: Optional[int] = None
+
+    @property
+    def window_size(self) -> Dict[str, int]:
+        return {"width": self.width, "height": self.height}
+
+
+class DeviceGeometry:
+    """会话级几何信息缓存。
+
+    - `get()` 首次调用时发 2 条命令（窗口尺寸 + 方向），之后不再访问服务端
+    - `observe_activity()` / `observe_orientation()`：调用方已拿到的新值，变化时使缓存失效
+    - `fetches`：实际向服务端取数的次数，便于统计节省的往返
+    """
+
+    def __init__(self, driver: Any) -> None:
+        self._driver = driver
+        self._lock = threading.Lock()
+        self._cached: Optional[Geometry] = None
+        self._activity = ""
+        self._logger = setup_logger("tests")
+        self.fetches = 0
+
+    def get(self) -> Geometry:
+        """返回缓存的几何信息，缓存失效时重新获取。"""
+        with self._lock:
+            if self._cached is None:
+                self._cached = self._fetch()
+            return self._cached
+
+    @property
+    def window_size(self) -> Dict[str, int]:
+        return self.get().window_size
+
+    @property
+    def density(self) -> int:
+        """屏幕密度（dpi），首次访问时获取一次。"""
+        geometry = self.get()
+        if geometry.density is not None:
+            return geometry.density
+        density = int(self._driver.get_display_density())
+        with self._lock:
+            if self._cached is not None:
+                self._cached = replace(self._cached, density=density)
+        return density
+
+    def invalidate(self, reason: str = "") -> None:
+        with self._lock:
+            if self._cached is not None and reason:
+                self._logger.debug(f"几何信息失效: {reason}")
+            self._cached = None
+
+    def observe_activity(self, activity: str) -> None:
+        """记录调用方读到的前台 Activity，与缓存时不同则失效。"""
+        if not activity:
+            return
+        with self._lock:
+            previous, self._activity = self._activity, activity
+            changed = self._cached is not None and previous and previous != activity
+        if changed:
+            self.invalidate(f"Activity {previous} -> {activity}")
+
+    def observe_orientation(self, orientation: str) -> None:
+        """记录调用方读到的屏幕方向，与缓存时不同则失效。"""
+        cached = self._cached
+        if cached is not None and orientation and orientation.upper() != cached.orientation:
+            self.invalidate(f"方向 {cached.orientation} -> {orientation.upper()}")
+
+    def observe_snapshot(self, width: int, height: int, rotation: int) -> None:
+        """用页面快照中免费获得的尺寸与旋转角更新缓存，不额外发命令。"""
+        orientation = _ROTATION_ORIENTATION.get(rotation, "PORTRAIT")
+        self.observe_orientation(orientation)
+        if width <= 0 or height <= 0:
+            return
+        with self._lock:
+            if self._cached is None:
+                self._cached = Geometry(width, height, orientation, self._activity)
+            elif (self._cached.width, self._cached.height) != (width, height):
+                self._cached = replace(self._cached, width=width, height=height, orientation=orientation)
+
+    def rotate(self, orientation: str) -> None:
+        """旋转屏幕并使缓存失效。"""
+        self._driver.orientation = orientation.upper()
+        self.invalidate(f"旋转至 {orientation.upper()}")
+
+    def _fetch(self) -> Geometry:
+        self.fetches += 1
+        size = self._driver.get_window_size()
+        try:
+            orientation = str(self._driver.orientation).upper()
+        except Exception:  # pylint: disable=broad-except
+            orientation = "PORTRAIT" if size["height"] >= size["width"] else "LANDSCAPE"
+        return Geometry(int(size["width"]), int(size["height"]), orientation, self._activity)
+
+
+def geometry_of(driver: Any) -> DeviceGeometry:
+    """获取会话挂载的几何信息缓存；尚未挂载（非 `DriverFactory` 创建）时当场挂载。"""
+    geometry = getattr(driver, GEOMETRY_ATTR, None)
+    if isinstance(geometry, DeviceGeometry):
+        return geometry
+    geometry = DeviceGeometry(driver)
+    setattr(driver, GEOMETRY_ATTR, geometry)
+    return geometry
@@ -0,0 +1,94 @@
+"""延迟导入模块
+
+职责：
+- `lazy_import(name)`：返回模块代理，首次访问属性时才真正导入；用于 cv2、numpy、appium、selenium.webdriver 等
+  只在用例执行时才用到的重依赖，`pytest -m "not e2e"` 与 xdist worker 启动时不再为其付出导入成本；
+  `name` 写作 `模块:对象` 时代理模块中的对象（如 `AppiumBy`、`WebDriverWait`），支持属性访问与调用
+- `lazy_exports(namespace, exports)`：生成模块级 `__getattr__`（PEP 562），按名称延迟导出其他模块中的对象
+- `is_loaded(name)`：判断模块是否已真正导入，供启动耗时测试断言
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+from typing import Any, Callable, Dict, MutableMapping
+
+_PROXIES: Dict[str, "LazyModule"] = {}
+_LOCK = threading.Lock()
+
+
+class LazyModule:
+    """模块代理：首次访问属性时导入目标模块，之后读到的属性缓存在代理上，后续访问与普通属性相同。
+
+    仅用于函数体内的属性访问；模块级常量、默认参数与基类会在导入时立即触发加载。
+    代理对象不能用于 `except` 子句与 `isinstance`，异常类请直接导入（selenium.common.exceptions 很轻）。
+    """
+
+    def __init__(self, name: str) -> None:
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self) -> Any:
+        module = self._module
+        if module is None:
+            path, _, attr = self._name.partition(":")
+            module = importlib.import_module(path)
+            if attr:
+                module = getattr(module, attr)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        # pytest 收集、inspect 等工具会探测模块级对象的双下划线属性，未加载时不为此触发导入
+        if attr.startswith("__") and attr.endswith("__") and self._module is None:
+            raise AttributeError(attr)
+        value = getattr(self._load(), attr)
+        # 模块函数与常量在导入后不再变化，缓存后不再经过 __getattr__
+        object.__setattr__(self, attr, value)
+        return value
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        raise AttributeError(f"延迟导入的模块 {self._name} 只读")
+
+    def __dir__(self) -> list:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "lazy"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str) -> Any:
+    """按名称返回延迟导入的模块（或 `模块:对象`）；已导入时直接返回模块或对象本身。"""
+    path, _, attr = name.partition(":")
+    module = sys.modules.get(path)
+    if module is not None and (not attr or hasattr(module, attr)):
+        return getattr(module, attr) if attr else module
+    with _LOCK:
+        proxy = _PROXIES.get(name)
+        if proxy is None:
+            proxy = _PROXIES[name] = LazyModule(name)
+    return proxy
+
+
+def lazy_exports(namespace: MutableMapping[str, Any], exports: Dict[str, str]) -> Callable[[str], Any]:
+    """生成模块级 `__getattr__`：`exports` 为 {名称: 所在模块}，首次访问时导入并写回 `namespace`。"""
+
+    def __getattr__(name: str) -> Any:
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {namespace.get('__name__')!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module), name)
+        namespace[name] = value
+        return value
+
+    return __getattr__
+
+
+def is_loaded(name: str) -> bool:
+    return name in sys.modules
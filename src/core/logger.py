@@ -3,17 +3,184 @@
 职责：
 - 提供统一的 Logger，输出到控制台与 `logs/<name>.log`
 - 采用滚动文件策略，避免日志过大
+- 异步模式（`LOG_MODE=async`）：调用线程只把记录放入队列，由后台线程批量写入并统一 flush，
+  同时输出结构化的 `logs/<name>.jsonl`
 """
 
+from __future__ import annotations
+
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
 from pathlib import Path
+from typing import Dict, List, Optional
+
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+MAX_BYTES = 2 * 1024 * 1024
+BACKUP_COUNT = 3
+
+_LISTENERS: Dict[str, "BatchingQueueListener"] = {}
+_LISTENERS_LOCK = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条记录输出一行 JSON，便于机器解析与聚合。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "time": time.strftime(DATE_FORMAT, time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _DeferredFlushMixin:
+    """批量模式：emit 只写入缓冲区，由后台线程在每批结束时调用 `flush_batch()`。"""
+
+    def flush(self) -> None:
+        return
+
+    def flush_batch(self) -> None:
+        super().flush()  # type: ignore[misc]
+
+
+class _BatchedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+
+class _BatchedRotatingFileHandler(_DeferredFlushMixin, RotatingFileHandler):
+    """按已写入字节数判断滚动，避免标准实现每条记录 seek/tell 触发的刷盘。"""
+
+    def __init__(self, filename: Path, maxBytes: int, backupCount: int, encoding: str = "utf-8") -> None:
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self._written = filename.stat().st_size if filename.exists() else 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg.encode(self.encoding or "utf-8"))
+            if self.maxBytes > 0 and self._written and self._written + size >= self.maxBytes:
+                super().flush()
+                self.doRollover()
+                self._written = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._written += size
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """进程内队列：只在调用线程合并消息参数，格式化与 I/O 全部交给后台线程。"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 与标准 QueueHandler 一致：修改副本，同一 logger 上的其他处理器（如 pytest 捕获）仍看到原始记录
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        return record
 
 
-def setup_logger(name: str = "tests", level: int = logging.INFO) -> logging.Logger:
+class BatchingQueueListener:
+    """后台写日志线程：每 `flush_interval` 秒取出最多 `batch_size` 条记录交给各处理器，批次结束统一 flush。"""
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[Optional[logging.LogRecord]]",
+        handlers: List[logging.Handler],
+        batch_size: int = 4096,
+        flush_interval: float = 0.2,
+    ) -> None:
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """写完队列中已有记录后停止线程。"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self) -> None:
+        while True:
+            first = self.queue.get()
+            if first is not None:
+                # 攒批：等待一个刷新间隔再统一写出，减少与调用线程争抢 GIL 的次数
+                self._stopping.wait(self.flush_interval)
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is None:
+                    stop = True
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                try:
+                    getattr(handler, "flush_batch", handler.flush)()
+                except (OSError, ValueError):
+                    # 目标流已关闭（如 pytest 捕获的 stderr），丢弃本批输出但保持线程存活
+                    pass
+            self.batches += 1
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+
+def _log_mode(mode: Optional[str]) -> str:
+    return (mode or os.getenv("LOG_MODE") or "sync").strip().lower()
+
+
+def setup_logger(
+    name: str = "tests",
+    level: int = logging.INFO,
+    mode: Optional[str] = None,
+    console: bool = True,
+    logs_dir: Optional[Path] = None,
+) -> logging.Logger:
     """创建或获取指定名称的 logger。
 
-    - 首次调用时初始化控制台与文件处理器
+    - 首次调用时初始化控制台与文件处理器；`mode`（默认取环境变量 LOG_MODE）为 `async` 时改为队列 + 后台写入
+    - `console=False` 时只写文件（如基准测试，避免输出淹没结果）
+    - `logs_dir` 指定日志目录，默认为工作目录下的 `logs/`
     - 后续相同名称复用同一实例，避免重复 handler
     """
     logger = logging.getLogger(name)
@@ -21,24 +188,66 @@ def setup_logger(name: str = "tests", level: int = logging.INFO) -> logging.Logg
         return logger
     logger.setLevel(level)
 
-    logs_dir = Path("logs")
+    logs_dir = logs_dir or Path("logs")
     logs_dir.mkdir(parents=True, exist_ok=True)
     log_file = logs_dir / f"{name}.log"
 
-    fmt = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    fmt = logging.Formatter(fmt=LOG_FORMAT, datefmt=DATE_FORMAT)
+
+    if _log_mode(mode) == "async":
+        _setup_async(logger, name, level, log_file, fmt, console)
+        return logger
 
-    file_handler = RotatingFileHandler(log_file, maxBytes=2 * 1024 * 1024, backupCount=3, encoding="utf-8")
+    file_handler = RotatingFileHandler(log_file, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8")
     file_handler.setFormatter(fmt)
     file_handler.setLevel(level)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(fmt)
-    console_handler.setLevel(level)
-
     logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(fmt)
+        console_handler.setLevel(level)
+        logger.addHandler(console_handler)
 
     return logger
+
+
+def _setup_async(
+    logger: logging.Logger, name: str, level: int, log_file: Path, fmt: logging.Formatter, console: bool = True
+) -> None:
+    handlers: List[logging.Handler] = []
+    for path, formatter in ((log_file, fmt), (log_file.with_suffix(".jsonl"), JsonLinesFormatter())):
+        file_handler = _BatchedRotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        console_handler = _BatchedStreamHandler()
+        console_handler.setFormatter(fmt)
+        handlers.append(console_handler)
+    for handler in handlers:
+        handler.setLevel(level)
+
+    log_queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue()
+    listener = BatchingQueueListener(log_queue, handlers)
+    listener.start()
+    with _LISTENERS_LOCK:
+        _LISTENERS[name] = listener
+    logger.addHandler(_InProcessQueueHandler(log_queue))
+
+
+def flush_logs() -> None:
+    """阻塞直到所有异步 logger 的队列写完（如附加日志文件到报告前）。"""
+    with _LISTENERS_LOCK:
+        listeners = list(_LISTENERS.values())
+    for listener in listeners:
+        listener.queue.join()
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """停止所有后台写日志线程，确保退出前日志落盘。"""
+    with _LISTENERS_LOCK:
+        listeners = list(_LISTENERS.values())
+        _LISTENERS.clear()
+    for listener in listeners:
+        listener.stop()
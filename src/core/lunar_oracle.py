@@ -0,0 +1,173 @@
+"""月相天文推算模块
+
+职责：
+- 基于朔望月与日月平均运动（Meeus《天文算法》第 48 章的低精度修正项），对 NumPy 日期数组向量化计算
+  月日距角、朔望月龄、照亮比例与八分月相名
+- 按日期区间批量生成月相用例，默认只保留前后容差内月相不变的日期，避免边界日造成误报
+- 与数据文件中的人工期望值交叉核对，在占用设备之前发现写错的期望月相
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.core.dataset import PHASES, LunarCase
+
+SYNODIC_MONTH = 29.530588853
+# 主月相（新月/上弦/满月/下弦）所占的日距角半宽（度），月亮每天约移动 12.2°，即主月相约持续一天
+PRINCIPAL_HALF_WIDTH = 6.1
+DEFAULT_HOUR = 12.0
+
+_J2000 = np.datetime64("2000-01-01T12:00", "m")
+_PHASE_NAMES = np.array(PHASES)
+
+DateArray = Union[np.ndarray, Sequence[Union[str, date]]]
+
+
+def _as_days(days: DateArray) -> np.ndarray:
+    return np.asarray(days, dtype="datetime64[D]")
+
+
+def elongation(days: DateArray, hour: Union[float, np.ndarray] = DEFAULT_HOUR) -> np.ndarray:
+    """月日距角（度，0~360，0 为朔、180 为望），`hour` 为 UTC 小时，可广播。"""
+    offset = (_as_days(days).astype("datetime64[m]") - _J2000).astype(np.float64) / 1440.0
+    t = (offset + np.asarray(hour, dtype=np.float64) / 24.0) / 36525.0
+    d = np.radians(297.8501921 + 445267.1114034 * t)
+    m = np.radians(357.5291092 + 35999.0502909 * t)
+    mp = np.radians(134.9633964 + 477198.8675055 * t)
+    # 相位角 i = 180° - D - 修正项，距角 = 180° - i
+    correction = (
+        6.289 * np.sin(mp)
+        - 2.100 * np.sin(m)
+        + 1.274 * np.sin(2 * d - mp)
+        + 0.658 * np.sin(2 * d)
+        + 0.214 * np.sin(2 * mp)
+        + 0.110 * np.sin(d)
+    )
+    elong: np.ndarray = np.mod(np.degrees(d) + correction, 360.0)
+    return elong
+
+
+def illumination(elong: np.ndarray) -> np.ndarray:
+    """照亮比例（0~1）。"""
+    lit: np.ndarray = (1.0 - np.cos(np.radians(elong))) / 2.0
+    return lit
+
+
+def age_days(elong: np.ndarray) -> np.ndarray:
+    """朔望月龄（天）。"""
+    return elong / 360.0 * SYNODIC_MONTH
+
+
+def phase_index(elong: np.ndarray, half_width: float = PRINCIPAL_HALF_WIDTH) -> np.ndarray:
+    """距角转为 `PHASES` 下标：主月相在其角度 ±half_width 内，其余为两者之间的过渡月相。"""
+    quarter = np.rint(elong / 90.0) % 4
+    distance = np.abs(np.mod(elong - quarter * 90.0 + 180.0, 360.0) - 180.0)
+    between = (np.floor(elong / 90.0).astype(np.int64) * 2 + 1) % 8
+    return np.where(distance <= half_width, (quarter * 2).astype(np.int64), between)
+
+
+@dataclass(frozen=True)
+class MoonPhases:
+    """一组日期的推算结果（各字段等长数组）。"""
+
+    days: np.ndarray
+    elongation: np.ndarray
+    index: np.ndarray
+
+    @property
+    def illumination(self) -> np.ndarray:
+        return illumination(self.elongation)
+
+    @property
+    def age(self) -> np.ndarray:
+        return age_days(self.elongation)
+
+    @property
+    def names(self) -> np.ndarray:
+        names: np.ndarray = _PHASE_NAMES[self.index]
+        return names
+
+
+def compute(days: DateArray, hour: float = DEFAULT_HOUR, half_width: float = PRINCIPAL_HALF_WIDTH) -> MoonPhases:
+    """计算每个日期在 `hour` 时（UTC）的月相。"""
+    arr = _as_days(days)
+    elong = elongation(arr, hour)
+    return MoonPhases(arr, elong, phase_index(elong, half_width))
+
+
+def _window_indices(days: np.ndarray, tolerance_days: float, half_width: float, step_hours: float = 3.0) -> np.ndarray:
+    """每个日期在 [中午 - 容差, 中午 + 容差] 内按 `step_hours` 采样的月相下标，形状 (n, k)。"""
+    span = tolerance_days * 24.0
+    hours = DEFAULT_HOUR + np.arange(-span, span + step_hours / 2, step_hours)
+    return phase_index(elongation(days[:, None], hours[None, :]), half_width)
+
+
+def generate_cases(
+    start: Union[str, date],
+    end: Union[str, date],
+    phases: Optional[Iterable[str]] = None,
+    step: int = 1,
+    stable_days: float = 0.25,
+    half_width: float = PRINCIPAL_HALF_WIDTH,
+) -> List[LunarCase]:
+    """生成 [start, end] 内每隔 `step` 天的月相用例。
+
+    `stable_days` > 0 时只保留前后该容差内月相都不变的日期（设备时区与推算时刻的差异不影响结果）。
+    """
+    days = np.arange(np.datetime64(str(start), "D"), np.datetime64(str(end), "D") + 1, step)
+    if not len(days):
+        return []
+    result = compute(days, half_width=half_width)
+    keep = np.ones(len(days), dtype=bool)
+    if stable_days > 0:
+        window = _window_indices(days, stable_days, half_width)
+        keep &= (window == window[:, :1]).all(axis=1)
+    if phases is not None:
+        wanted = [PHASES.index(name) for name in phases]
+        keep &= np.isin(result.index, wanted)
+    names = result.names
+    return [LunarCase(str(days[i]), str(names[i])) for i in np.flatnonzero(keep)]
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    """期望月相与推算不一致的用例。"""
+
+    date: str
+    expected: str
+    computed: str
+    elongation: float
+    illumination: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.date}: 期望 {self.expected}，推算 {self.computed}"
+            f"（距角 {self.elongation:.1f}°，照亮 {self.illumination:.0%}）"
+        )
+
+
+def cross_check(
+    cases: Iterable[Union[LunarCase, Tuple[str, str]]],
+    tolerance_days: float = 1.0,
+    half_width: float = PRINCIPAL_HALF_WIDTH,
+) -> List[Mismatch]:
+    """核对期望月相；期望值在日期前后 `tolerance_days` 内任一时刻成立即视为一致。"""
+    rows = [case.as_param() if isinstance(case, LunarCase) else tuple(case) for case in cases]
+    if not rows:
+        return []
+    days = _as_days([row[0] for row in rows])
+    expected = np.array([PHASES.index(row[1]) for row in rows])
+    window = _window_indices(days, tolerance_days, half_width)
+    consistent = (window == expected[:, None]).any(axis=1)
+    result = compute(days, half_width=half_width)
+    return [
+        Mismatch(
+            rows[i][0], rows[i][1], str(result.names[i]), float(result.elongation[i]), float(result.illumination[i])
+        )
+        for i in np.flatnonzero(~consistent)
+    ]
@@ -0,0 +1,169 @@
+"""用例结果缓存模块
+
+职责：
+- 为参数化用例计算指纹：被测应用 versionCode（经驱动读取）、参考图内容哈希、设备 profile、测试数据行
+- 将每次执行结果写入本地 SQLite（`.cache/results.sqlite`），指纹相同且上次通过的用例可跳过或直接回放为通过
+- 应用版本按设备与包名只读取一次；参考图哈希按 mtime/size 缓存
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from src.core.date_control import device_key, shell
+from src.core.logger import setup_logger
+from src.utils.path import project_root
+
+DEFAULT_DB_FILE = project_root() / ".cache" / "results.sqlite"
+CACHE_MODES = ("off", "skip", "replay")
+
+_VERSION_CODE = re.compile(r"versionCode=(\d+)")
+_VERSION_NAME = re.compile(r"versionName=(\S+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    nodeid TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (nodeid, fingerprint)
+)
+"""
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    """一条已记录的执行结果。"""
+
+    nodeid: str
+    fingerprint: str
+    outcome: str
+    duration: float
+    recorded_at: float
+
+    @property
+    def passed(self) -> bool:
+        return self.outcome == "passed"
+
+
+def fingerprint(parts: Dict[str, Any]) -> str:
+    """对指纹组成部分做稳定序列化后取 SHA-256。"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite 结果缓存。
+
+    - `lookup(nodeid, fp)`：返回该指纹下最近一次结果，没有时返回 None；命中通过结果时累计 `saved`（上次耗时）
+    - `record(nodeid, fp, outcome, duration)`：写入或覆盖结果
+    - `app_version(driver, package)`：`dumpsys package` 读取 versionCode/versionName，按设备缓存
+    - `file_digest(path)`：参考图内容哈希，按 mtime/size 缓存
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_DB_FILE) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._versions: Dict[Tuple[str, str], str] = {}
+        self._digests: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self._logger = setup_logger("tests")
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def lookup(self, nodeid: str, fp: str) -> Optional[CachedResult]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT nodeid, fingerprint, outcome, duration, recorded_at FROM results "
+                "WHERE nodeid = ? AND fingerprint = ?",
+                (nodeid, fp),
+            ).fetchone()
+        result = CachedResult(*row) if row else None
+        if result is not None and result.passed:
+            self.hits += 1
+            self.saved += result.duration
+        else:
+            self.misses += 1
+        return result
+
+    def record(self, nodeid: str, fp: str, outcome: str, duration: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (nodeid, fingerprint, outcome, duration, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (nodeid, fp, outcome, duration, time.time()),
+            )
+            self._conn.commit()
+
+    def app_version(self, driver: Any, package: str) -> str:
+        """被测应用版本（``versionCode/versionName``）；读取失败返回空串，调用方应视为不可缓存。"""
+        key = (device_key(driver), package)
+        if key in self._versions:
+            return self._versions[key]
+        try:
+            out = shell(driver, f"dumpsys package {package} | grep -E 'versionCode|versionName'")
+        except Exception as exc:  # pylint: disable=broad-except
+            self._logger.warning(f"读取应用版本失败，结果缓存不生效: {exc}")
+            out = ""
+        code, name = _VERSION_CODE.search(out), _VERSION_NAME.search(out)
+        version = f"{code.group(1)}/{name.group(1) if name else ''}" if code else ""
+        self._versions[key] = version
+        return version
+
+    def file_digest(self, path: Union[str, Path]) -> str:
+        """文件内容 SHA-1；文件不存在时返回空串。"""
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return ""
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self._digests.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        digest = hashlib.sha1(path.read_bytes()).hexdigest()
+        self._digests[path] = (stamp, digest)
+        return digest
+
+    def case_fingerprint(
+        self,
+        driver: Any,
+        package: str,
+        profile: str,
+        params: Dict[str, Any],
+        references: Iterable[Union[str, Path]] = (),
+    ) -> Optional[str]:
+        """用例指纹；无法读取应用版本时返回 None（不缓存）。"""
+        version = self.app_version(driver, package)
+        if not version:
+            return None
+        refs = {Path(ref).name: self.file_digest(ref) for ref in references}
+        return fingerprint({"app": version, "package": package, "profile": profile, "params": params, "refs": refs})
+
+
+_DEFAULT_CACHE: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """获取进程内共享的结果缓存。"""
+    global _DEFAULT_CACHE  # pylint: disable=global-statement
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = ResultCache()
+    return _DEFAULT_CACHE
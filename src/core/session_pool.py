@@ -0,0 +1,192 @@
+"""Appium 会话池
+
+职责：
+- 预热并维持 N 个可用会话，借出前做一次廉价的健康检查（GET /session/:id/timeouts）
+- 失效会话被丢弃后由后台线程补齐，借出方只在池空时等待
+- 会话的创建方式由调用方注入（通常为 `DriverFactory`），池本身不关心 capabilities
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+from src.core.lazy import lazy_import
+from src.core.logger import setup_logger
+
+command = lazy_import("selenium.webdriver.remote.command")
+
+
+def is_session_alive(driver: Any) -> bool:
+    """以一次轻量请求判断会话是否仍可用。"""
+    try:
+        driver.execute(command.Command.GET_TIMEOUTS)
+        return True
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+class SessionPool:
+    """线程安全的会话池。
+
+    - `size`：期望保持的会话总数（借出 + 空闲）
+    - `check_interval`：空闲会话距上次确认存活超过该秒数时，借出前重新检查
+    """
+
+    def __init__(
+        self,
+        create: Callable[[], Any],
+        size: int = 1,
+        check_interval: float = 0.0,
+        health_check: Callable[[Any], bool] = is_session_alive,
+    ) -> None:
+        if size < 1:
+            raise ValueError(f"会话池大小必须 >= 1: {size}")
+        self._create = create
+        self.size = size
+        self.check_interval = check_interval
+        self._health_check = health_check
+        self._idle: Deque[Any] = deque()
+        self._lent: Set[int] = set()
+        self._checked_at: Dict[int, float] = {}
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="appium-session")
+        self._logger = setup_logger("tests")
+        self.created = 0
+        self.discarded = 0
+        self.health_checks = 0
+        self.last_error: Optional[BaseException] = None
+
+    def start(self, wait: bool = True) -> None:
+        """补齐到 `size` 个会话；`wait=True` 时至少等到一个会话可用。"""
+        self._refill()
+        if wait:
+            with self._cond:
+                while not self._idle and self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._idle and self.last_error is not None:
+                    raise self.last_error
+
+    def acquire(self, timeout: float = 300.0) -> Any:
+        """借出一个健康会话；池空时等待后台补齐，超时抛出 TimeoutError。"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("会话池已关闭")
+                if not self._idle and not self._pending:
+                    self._refill_locked()
+                while not self._idle:
+                    if not self._pending and self.last_error is not None:
+                        error, self.last_error = self.last_error, None
+                        raise error
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"{timeout}s 内没有可用的 Appium 会话")
+                    self._cond.wait(remaining)
+                driver = self._idle.popleft()
+                self._lent.add(id(driver))
+            if self._healthy(driver):
+                return driver
+            self.discard(driver)
+
+    def release(self, driver: Any) -> None:
+        """归还会话。"""
+        with self._cond:
+            if id(driver) not in self._lent:
+                return
+            self._lent.discard(id(driver))
+            if self._closed:
+                self._quit(driver)
+                return
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def discard(self, driver: Any) -> None:
+        """丢弃失效会话，并在后台补一个新的。"""
+        with self._cond:
+            self._lent.discard(id(driver))
+            self._checked_at.pop(id(driver), None)
+            self.discarded += 1
+            closed = self._closed
+        if closed:
+            self._quit(driver)
+            return
+        self._logger.warning("Appium 会话失效，已丢弃并在后台重建")
+        self._executor.submit(self._quit, driver)
+        self._refill()
+
+    def replace(self, driver: Any, timeout: float = 300.0) -> Any:
+        """丢弃 `driver` 并借出另一个健康会话。"""
+        self.discard(driver)
+        return self.acquire(timeout=timeout)
+
+    def close(self) -> None:
+        """关闭池内全部会话。"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for driver in idle:
+            self._quit(driver)
+        self._executor.shutdown(wait=True)
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def _healthy(self, driver: Any) -> bool:
+        checked = self._checked_at.get(id(driver), 0.0)
+        if self.check_interval and time.monotonic() - checked < self.check_interval:
+            return True
+        self.health_checks += 1
+        ok = self._health_check(driver)
+        if ok:
+            self._checked_at[id(driver)] = time.monotonic()
+        return ok
+
+    def _refill(self) -> None:
+        with self._cond:
+            self._refill_locked()
+
+    def _refill_locked(self) -> None:
+        if self._closed:
+            return
+        missing = self.size - len(self._idle) - len(self._lent) - self._pending
+        for _ in range(max(0, missing)):
+            self._pending += 1
+            self._executor.submit(self._spawn)
+
+    def _spawn(self) -> None:
+        try:
+            driver = self._create()
+        except Exception as exc:  # pylint: disable=broad-except
+            self._logger.error(f"创建 Appium 会话失败: {exc}")
+            with self._cond:
+                self._pending -= 1
+                self.last_error = exc
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._pending -= 1
+            self.created += 1
+            closed = self._closed
+            if not closed:
+                self._checked_at[id(driver)] = time.monotonic()
+                self._idle.append(driver)
+                self._cond.notify_all()
+        if closed:
+            self._quit(driver)
+
+    @staticmethod
+    def _quit(driver: Any) -> None:
+        try:
+            driver.quit()
+        except Exception:  # pylint: disable=broad-except
+            pass
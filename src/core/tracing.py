@@ -0,0 +1,279 @@
+"""步骤耗时追踪模块
+
+职责：
+- 以上下文管理器或装饰器记录嵌套的步骤区间（span），关闭时几乎零开销
+- 按用例归组，导出 Chrome Trace JSON（chrome://tracing、Perfetto 可直接打开）
+- 汇总每个步骤在各参数化用例间的 p50/p95 耗时
+- 长时间运行内存有界：全量区间只保留最近 `max_spans` 个（导出 trace 用），按用例的区间索引在用例结束后释放，
+  步骤耗时在区间关闭时增量累计
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 默认保留的最近区间数，超出后最早的区间不再出现在导出的 trace 中（步骤统计不受影响）
+MAX_SPANS = 100_000
+
+
+@dataclass
+class Span:
+    """单个步骤区间，时间单位为纳秒。"""
+
+    name: str
+    start: int
+    depth: int
+    thread: int
+    case: str
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    end: int = 0
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒）。"""
+        return (self.end - self.start) / 1e9
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """线性插值百分位（q 取 0~100）。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class _NullSpan:
+    """追踪关闭时使用的空上下文，不分配对象、不读时钟。"""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _SpanContext:
+    __slots__ = ("_tracer", "_name", "_attrs", "_span")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._attrs = attrs
+        self._span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self._span = self._tracer._open(self._name, self._attrs)
+        return self._span
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if self._span is not None:
+            if exc_type is not None:
+                self._span.attrs["error"] = exc_type.__name__
+            self._tracer._close(self._span)
+
+
+class Tracer:
+    """线程安全的步骤追踪器。
+
+    - `span(name, **attrs)`：上下文管理器，记录一个（可嵌套的）区间
+    - `traced(name)`：装饰器形式
+    - `case(name)`：标记当前线程正在执行的用例，之后的区间归入该用例
+    - `pop_case(name)`：取出并释放某用例的区间（用例结束后附加到报告时使用）
+    """
+
+    def __init__(
+        self, enabled: bool = True, clock: Callable[[], int] = time.perf_counter_ns, max_spans: int = MAX_SPANS
+    ) -> None:
+        self.enabled = enabled
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._by_case: Dict[str, List[Span]] = {}
+        # {用例: {步骤: 累计秒数}}，嵌套的同名区间只计最外层
+        self._steps: Dict[str, Dict[str, float]] = {}
+        self._origin = clock()
+
+    def span(self, name: str, **attrs: Any) -> Any:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _SpanContext(self, name, attrs)
+
+    def traced(self, name: Optional[str] = None) -> Callable[[F], F]:
+        def decorator(func: F) -> F:
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(label):
+                    return func(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def case(self, name: str) -> "_CaseContext":
+        return _CaseContext(self, name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+            self._by_case = {}
+            self._steps = {}
+
+    def case_spans(self, case: str) -> List[Span]:
+        with self._lock:
+            return list(self._by_case.get(case, ()))
+
+    def pop_case(self, case: str) -> List[Span]:
+        with self._lock:
+            return self._by_case.pop(case, [])
+
+    def chrome_trace(self, spans: Optional[Sequence[Span]] = None) -> Dict[str, Any]:
+        """导出为 Chrome Trace Event 格式（完整事件 ph=X，时间单位微秒）。"""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        for s in self.spans if spans is None else spans:
+            if not s.end:
+                continue
+            args = {
+                k: v if isinstance(v, (int, float, bool)) else str(v)
+                for k, v in s.attrs.items()
+                if not k.startswith("_")
+            }
+            if s.case:
+                args["case"] = s.case
+            events.append(
+                {
+                    "name": s.name,
+                    "cat": s.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": (s.start - self._origin) / 1000,
+                    "dur": (s.end - s.start) / 1000,
+                    "pid": pid,
+                    "tid": s.thread,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: Path, spans: Optional[Sequence[Span]] = None) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.chrome_trace(spans), ensure_ascii=False), encoding="utf-8")
+        return path
+
+    def step_stats(self) -> Dict[str, List[float]]:
+        """每个步骤在各用例中的累计耗时（秒）；同一用例内同名步骤相加，嵌套的同名区间只计最外层。"""
+        with self._lock:
+            per_case = [dict(steps) for steps in self._steps.values()]
+        stats: Dict[str, List[float]] = {}
+        for steps in per_case:
+            for name, seconds in steps.items():
+                stats.setdefault(name, []).append(seconds)
+        return stats
+
+    def summary_lines(self, top: int = 20) -> List[str]:
+        """按 p95 降序输出各步骤的 p50/p95（跨用例）。"""
+        stats = self.step_stats()
+        if not stats:
+            return []
+        rows = sorted(stats.items(), key=lambda kv: percentile(kv[1], 95), reverse=True)[:top]
+        lines = [f"{'p50(s)':>8} {'p95(s)':>8} {'用例数':>6}  步骤"]
+        for name, values in rows:
+            lines.append(f"{percentile(values, 50):8.3f} {percentile(values, 95):8.3f} {len(values):6d}  {name}")
+        return lines
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _open(self, name: str, attrs: Dict[str, Any]) -> Span:
+        stack = self._stack()
+        if any(s.name == name for s in stack):
+            attrs["_nested"] = True
+        span = Span(name, self._clock(), len(stack), threading.get_ident(), getattr(self._local, "case", ""), attrs)
+        stack.append(span)
+        return span
+
+    def _close(self, span: Span) -> None:
+        span.end = self._clock()
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        elif span in stack:
+            stack.remove(span)
+        with self._lock:
+            self.spans.append(span)
+            if span.case:
+                self._by_case.setdefault(span.case, []).append(span)
+            if not span.attrs.get("_nested"):
+                steps = self._steps.setdefault(span.case, {})
+                steps[span.name] = steps.get(span.name, 0.0) + span.duration
+
+
+class _CaseContext:
+    __slots__ = ("_tracer", "_name", "_previous")
+
+    def __init__(self, tracer: Tracer, name: str) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._previous = ""
+
+    def __enter__(self) -> str:
+        local = self._tracer._local
+        self._previous = getattr(local, "case", "")
+        local.case = self._name
+        return self._name
+
+    def __exit__(self, *exc: Any) -> None:
+        self._tracer._local.case = self._previous
+
+
+_DEFAULT_TRACER: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """获取进程内共享的追踪器；环境变量 TRACE=0 时关闭。"""
+    global _DEFAULT_TRACER  # pylint: disable=global-statement
+    if _DEFAULT_TRACER is None:
+        _DEFAULT_TRACER = Tracer(enabled=os.getenv("TRACE", "1") not in ("0", "false", "off"))
+    return _DEFAULT_TRACER
+
+
+def span(name: str, **attrs: Any) -> Any:
+    """使用默认追踪器记录一个区间：`with span("page.find", locator=...):`。"""
+    return get_tracer().span(name, **attrs)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """默认追踪器的装饰器形式；追踪器在调用时解析，便于测试中替换。"""
+
+    def decorator(func: F) -> F:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with get_tracer().span(label):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,176 @@
+"""Appium 命令传输层埋点
+
+职责：
+- `InstrumentedConnection`：在 keep-alive 连接上记录每条 WebDriver 命令的名称、请求/响应字节数与耗时
+- `CommandRecorder`：按作用域（通常为用例 nodeid）累计命令计数，供 pytest 终端汇总
+- `pipeline()`：将互不依赖的只读（GET）命令并发发出，多个往返合并为约一个往返的墙钟时间
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.lazy import lazy_exports, lazy_import
+
+# appium.webdriver 导入约 0.3s，连接类与命令常量只在首次使用时加载
+__getattr__ = lazy_exports(globals(), {"InstrumentedConnection": "src.core.connection"})
+command = lazy_import("selenium.webdriver.remote.command")
+mobilecommand = lazy_import("appium.webdriver.mobilecommand")
+
+CommandCall = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class CommandStat:
+    """单个命令（或作用域合计）的累计统计。"""
+
+    count: int = 0
+    sent: int = 0
+    received: int = 0
+    elapsed: float = 0.0
+    worst: float = 0.0
+
+    def add(self, sent: int, received: int, elapsed: float) -> None:
+        self.count += 1
+        self.sent += sent
+        self.received += received
+        self.elapsed += elapsed
+        self.worst = max(self.worst, elapsed)
+
+
+class CommandRecorder:
+    """线程安全的命令统计。`scope(name)` 内的命令同时计入该作用域。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.commands: Dict[str, CommandStat] = {}
+        self.scopes: Dict[str, CommandStat] = {}
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[CommandStat]:
+        """在上下文内把当前线程（及其发起的流水线命令）的命令计入 `name`。"""
+        with self._lock:
+            stat = self.scopes.setdefault(name, CommandStat())
+        previous = getattr(self._local, "scope", None)
+        self._local.scope = name
+        try:
+            yield stat
+        finally:
+            self._local.scope = previous
+
+    def current_scope(self) -> Optional[str]:
+        return getattr(self._local, "scope", None)
+
+    def record(self, command: str, sent: int, received: int, elapsed: float, scope: Optional[str] = None) -> None:
+        scope = scope if scope is not None else self.current_scope()
+        with self._lock:
+            self.commands.setdefault(command, CommandStat()).add(sent, received, elapsed)
+            if scope is not None:
+                self.scopes.setdefault(scope, CommandStat()).add(sent, received, elapsed)
+
+    def report_lines(self, top: int = 10) -> List[str]:
+        """按用例与命令输出计数、字节数与耗时。"""
+        if not self.commands:
+            return []
+        total = CommandStat()
+        for stat in self.commands.values():
+            total.count += stat.count
+            total.sent += stat.sent
+            total.received += stat.received
+            total.elapsed += stat.elapsed
+        lines = [
+            f"命令 {total.count} 条, 发送 {total.sent / 1024:.1f}KB, 接收 {total.received / 1024:.1f}KB, "
+            f"耗时 {total.elapsed:.1f}s"
+        ]
+        if self.scopes:
+            lines.append(f"{'命令数':>6} {'耗时(s)':>8} {'接收KB':>8}  用例")
+            for name, stat in sorted(self.scopes.items(), key=lambda kv: kv[1].count, reverse=True)[:top]:
+                lines.append(f"{stat.count:6d} {stat.elapsed:8.2f} {stat.received / 1024:8.1f}  {name}")
+        lines.append(f"{'次数':>6} {'均值(ms)':>8} {'最慢(ms)':>8}  命令")
+        for name, stat in sorted(self.commands.items(), key=lambda kv: kv[1].elapsed, reverse=True)[:top]:
+            lines.append(f"{stat.count:6d} {stat.elapsed / stat.count * 1000:8.1f} {stat.worst * 1000:8.1f}  {name}")
+        return lines
+
+
+_DEFAULT_RECORDER: Optional[CommandRecorder] = None
+_PIPELINE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_PIPELINE_LOCK = threading.Lock()
+
+
+def get_command_recorder() -> CommandRecorder:
+    """获取进程内共享的命令统计。"""
+    global _DEFAULT_RECORDER  # pylint: disable=global-statement
+    if _DEFAULT_RECORDER is None:
+        _DEFAULT_RECORDER = CommandRecorder()
+    return _DEFAULT_RECORDER
+
+
+def _executor(width: int) -> ThreadPoolExecutor:
+    global _PIPELINE_EXECUTOR  # pylint: disable=global-statement
+    with _PIPELINE_LOCK:
+        if _PIPELINE_EXECUTOR is None or _PIPELINE_EXECUTOR._max_workers < width:  # pylint: disable=protected-access
+            if _PIPELINE_EXECUTOR is not None:
+                # 已提交的命令照常完成，随后旧线程退出
+                _PIPELINE_EXECUTOR.shutdown(wait=False)
+            _PIPELINE_EXECUTOR = ThreadPoolExecutor(max_workers=width, thread_name_prefix="appium-pipeline")
+        return _PIPELINE_EXECUTOR
+
+
+def pipeline_width(driver: Any) -> int:
+    """驱动连接允许的并发只读命令数（未开启流水线时为 1）。"""
+    return int(getattr(getattr(driver, "command_executor", None), "pipeline_width", 1))
+
+
+def pipeline(driver: Any, calls: Sequence[CommandCall]) -> List[Any]:
+    """发出一组互不依赖的只读命令并按顺序返回各自的 `value`。
+
+    仅接受 GET 命令；连接未开启流水线（`pipeline_width` <= 1）时按顺序逐条执行，结果一致。
+    """
+    connection = getattr(driver, "command_executor", None)
+    width = pipeline_width(driver)
+    method_of = getattr(connection, "method_of", None)
+    if method_of is not None:
+        for command, _ in calls:
+            if method_of(command) != "GET":
+                raise ValueError(f"只有只读（GET）命令可以流水线执行: {command}")
+
+    def _run(call: CommandCall) -> Any:
+        return driver.execute(call[0], dict(call[1]))["value"]
+
+    if width <= 1 or len(calls) <= 1:
+        return [_run(call) for call in calls]
+
+    recorder = getattr(connection, "recorder", None)
+    scope = recorder.current_scope() if recorder is not None else None
+    io = getattr(connection, "_io", None)
+
+    def _run_scoped(call: CommandCall) -> Any:
+        # 工作线程继承调用方的统计作用域
+        if io is not None:
+            io.scope = scope
+        try:
+            return _run(call)
+        finally:
+            if io is not None:
+                io.scope = None
+
+    futures = [_executor(width).submit(_run_scoped, call) for call in calls]
+    return [future.result() for future in futures]
+
+
+def element_state(driver: Any, element: Any) -> Dict[str, Any]:
+    """一次流水线读取元素的可见、可用状态与位置尺寸。"""
+    displayed, enabled, rect = pipeline(
+        driver,
+        [
+            (mobilecommand.MobileCommand.IS_ELEMENT_DISPLAYED, {"id": element.id}),
+            (command.Command.IS_ELEMENT_ENABLED, {"id": element.id}),
+            (command.Command.GET_ELEMENT_RECT, {"id": element.id}),
+        ],
+    )
+    return {"displayed": bool(displayed), "enabled": bool(enabled), "rect": rect}
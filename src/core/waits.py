@@ -0,0 +1,232 @@
+"""自适应等待模块
+
+职责：
+- 以指数退避轮询条件，条件满足立即返回，取代固定 `time.sleep`
+- 按 key（通常为定位器或步骤名）学习典型稳定耗时，持久化到本地 JSON，下次运行据此调整首次轮询间隔
+- 统计每个用例花在等待与操作上的时间，便于依据数据削减等待
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from selenium.common.exceptions import TimeoutException
+
+from src.core.logger import setup_logger
+
+T = TypeVar("T")
+
+DEFAULT_STATS_FILE = Path(".cache") / "settle_times.json"
+_MISSING = object()
+
+
+@dataclass
+class SettleStat:
+    """单个 key 的稳定耗时统计（指数加权平均）。"""
+
+    ewma: float = 0.0
+    count: int = 0
+    worst: float = 0.0
+
+    def observe(self, seconds: float, alpha: float = 0.3) -> None:
+        self.ewma = seconds if self.count == 0 else alpha * seconds + (1 - alpha) * self.ewma
+        self.worst = max(self.worst, seconds)
+        self.count += 1
+
+
+@dataclass
+class WaitBudget:
+    """单个用例的等待/操作耗时账本。"""
+
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+    waited: float = 0.0
+    slept: float = 0.0
+    waits: int = 0
+
+    @property
+    def total(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def acting(self) -> float:
+        return max(0.0, self.total - self.waited)
+
+    @property
+    def wait_ratio(self) -> float:
+        return self.waited / self.total if self.total > 0 else 0.0
+
+
+class AdaptiveWaiter:
+    """指数退避轮询 + 按 key 学习稳定耗时。
+
+    - 首次检查立即执行；未满足时首个间隔取该 key 历史稳定耗时的一半（无历史时为 `initial`）
+    - 之后每次间隔乘以 `factor`，不超过 `max_interval`
+    """
+
+    def __init__(
+        self,
+        stats_file: Optional[Path] = DEFAULT_STATS_FILE,
+        initial: float = 0.05,
+        factor: float = 1.6,
+        max_interval: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.stats_file = stats_file
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats: Dict[str, SettleStat] = self._load()
+        self.budgets: List[WaitBudget] = []
+        self._logger = setup_logger("tests")
+
+    def until(
+        self,
+        condition: Callable[[], T],
+        key: str,
+        timeout: float = 15.0,
+        message: str = "",
+        ignored: tuple = (),
+        default: Any = _MISSING,
+        max_interval: Optional[float] = None,
+    ) -> T:
+        """轮询 `condition` 直到返回真值；超时抛出 TimeoutException，或返回 `default`。"""
+        start = self._clock()
+        deadline = start + timeout
+        ceiling = max_interval if max_interval is not None else self.max_interval
+        interval = min(self._first_interval(key), ceiling)
+        slept = 0.0
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            while True:
+                try:
+                    value = condition()
+                    if value:
+                        self._observe(key, self._clock() - start)
+                        return value
+                except ignored:
+                    pass
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    if default is not _MISSING:
+                        return default  # type: ignore[no-any-return]
+                    raise TimeoutException(message or f"等待超时({timeout}s): {key}")
+                pause = min(interval, remaining)
+                self._sleep(pause)
+                slept += pause
+                interval = min(interval * self.factor, ceiling)
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                # 嵌套等待只在最外层记账，避免重复累计
+                self._charge(self._clock() - start, slept)
+
+    def settle(self, probe: Callable[[], Any], key: str, timeout: float = 3.0) -> Any:
+        """等待 `probe()` 连续两次返回相同值（如元素位置不再变化），返回稳定值。
+
+        超时不抛异常，返回最后一次读数，保持与原固定等待一致的宽松语义。
+        """
+        last = [probe()]
+
+        def _stable() -> bool:
+            current = probe()
+            same = bool(current == last[0])
+            last[0] = current
+            return same
+
+        self.until(_stable, key=f"settle:{key}", timeout=timeout, default=False)
+        return last[0]
+
+    def expected(self, key: str) -> Optional[float]:
+        """返回 key 的历史典型稳定耗时（秒）。"""
+        stat = self.stats.get(key)
+        return stat.ewma if stat else None
+
+    @contextmanager
+    def budget(self, name: str) -> Iterator[WaitBudget]:
+        """在上下文内统计当前线程的等待/操作耗时。"""
+        record = WaitBudget(name, started=self._clock())
+        previous = getattr(self._local, "budget", None)
+        self._local.budget = record
+        try:
+            yield record
+        finally:
+            record.finished = self._clock()
+            self._local.budget = previous
+            with self._lock:
+                self.budgets.append(record)
+
+    def save(self) -> None:
+        """将学习到的稳定耗时写回本地文件。"""
+        if self.stats_file is None:
+            return
+        payload = {
+            k: {"ewma": round(v.ewma, 4), "count": v.count, "worst": round(v.worst, 4)} for k, v in self.stats.items()
+        }
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.stats_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.stats_file)
+        except OSError as exc:
+            self._logger.warning(f"保存等待统计失败: {exc}")
+
+    def report_lines(self, top: int = 10) -> List[str]:
+        """生成等待/操作耗时汇总（按等待耗时降序）。"""
+        if not self.budgets:
+            return []
+        rows = sorted(self.budgets, key=lambda b: b.waited, reverse=True)[:top]
+        total = sum(b.total for b in self.budgets)
+        waited = sum(b.waited for b in self.budgets)
+        summary = f"用例数 {len(self.budgets)}"
+        if total > 0:
+            slept = sum(b.slept for b in self.budgets)
+            summary += f", 总耗时 {total:.1f}s, 等待 {waited:.1f}s ({waited / total:.0%}), 其中纯休眠 {slept:.1f}s"
+        lines = [summary]
+        lines.append(f"{'等待':>8} {'操作':>8} {'占比':>6}  用例")
+        for b in rows:
+            lines.append(f"{b.waited:8.2f} {b.acting:8.2f} {b.wait_ratio:6.0%}  {b.name}")
+        return lines
+
+    def _first_interval(self, key: str) -> float:
+        learned = self.expected(key)
+        if learned is None:
+            return self.initial
+        return min(max(self.initial, learned / 2), self.max_interval)
+
+    def _observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self.stats.setdefault(key, SettleStat()).observe(seconds)
+
+    def _charge(self, waited: float, slept: float) -> None:
+        record: Optional[WaitBudget] = getattr(self._local, "budget", None)
+        if record is not None:
+            record.waited += waited
+            record.slept += slept
+            record.waits += 1
+
+    def _load(self) -> Dict[str, SettleStat]:
+        if self.stats_file is None or not self.stats_file.exists():
+            return {}
+        try:
+            data = json.loads(self.stats_file.read_text(encoding="utf-8"))
+            return {
+                k: SettleStat(float(v["ewma"]), int(v["count"]), float(v.get("worst", 0.0))) for k, v in data.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            setup_logger("tests").warning(f"读取等待统计失败，忽略历史数据: {exc}")
+            return {}
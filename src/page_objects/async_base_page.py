@@ -0,0 +1,140 @@
+"""异步基础 Page 封装
+
+`BasePage` 的协程版本，配合 `AsyncDriver` 在一个事件循环内同时操作多台设备。
+查找经由同一个 `LocatorCache`（策略改写与耗时学习与同步页面共用），等待以 `asyncio.sleep` 轮询，不占用线程。
+步骤追踪基于线程局部的调用栈，并发协程会互相嵌套，异步页面不记录 span。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union, cast
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+from src.core.async_driver import AsyncDriver, AsyncElement
+from src.page_objects.locators import LocatorCache, get_locator_cache
+from src.page_objects.snapshot import PageSnapshot, SnapshotNode
+
+_IGNORED = (NoSuchElementException, StaleElementReferenceException)
+
+
+class AsyncBasePage:
+    """异步页面对象基类，方法与 `BasePage` 一一对应。"""
+
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        timeout: float = 15,
+        locators: Optional[LocatorCache] = None,
+        snapshot_max_age: float = 2.0,
+        poll: float = 0.2,
+    ):
+        self.driver = driver
+        self.timeout = timeout
+        self.locators = locators or get_locator_cache()
+        # 与同步页面共用统计，同一页面类的定位器学习结果互通
+        self.screen = type(self).__name__.removeprefix("Async")
+        self.snapshot_max_age = snapshot_max_age
+        self.poll = poll
+        self._snapshot: Optional[PageSnapshot] = None
+
+    async def locate(self, locator: Tuple[str, str]) -> AsyncElement:
+        """立即查找一次元素（不等待），未找到时抛出 NoSuchElementException。"""
+        return cast(AsyncElement, await self.locators.find_async(self.driver, locator, self.screen))
+
+    async def find(self, locator: Tuple[str, str]) -> AsyncElement:
+        """等待元素出现并返回。"""
+        return cast(AsyncElement, await self._until(lambda: self.locate(locator), locator))
+
+    async def click(self, locator: Tuple[str, str]) -> AsyncElement:
+        """等待元素可点击并执行点击。"""
+
+        async def _clickable() -> Any:
+            element = await self.locate(locator)
+            return element if await element.is_displayed() and await element.is_enabled() else False
+
+        element = cast(AsyncElement, await self._until(_clickable, locator))
+        await element.click()
+        self.invalidate_snapshot()
+        return element
+
+    async def type(self, locator: Tuple[str, str], text: str) -> AsyncElement:
+        """清空并输入文本。"""
+        element = await self.find(locator)
+        await element.clear()
+        await element.send_keys(text)
+        self.invalidate_snapshot()
+        return element
+
+    async def wait_visible(self, locator: Tuple[str, str]) -> AsyncElement:
+        """等待元素可见。"""
+
+        async def _visible() -> Any:
+            element = await self.locate(locator)
+            return element if await element.is_displayed() else False
+
+        return cast(AsyncElement, await self._until(_visible, locator))
+
+    async def snapshot(self, refresh: bool = False) -> PageSnapshot:
+        """返回当前页面快照；不存在、已过期或 `refresh=True` 时重新获取一次 page_source。"""
+        snap = self._snapshot
+        if refresh or snap is None or time.monotonic() - snap.taken_at > self.snapshot_max_age:
+            snap = self._snapshot = PageSnapshot.parse(await self.driver.page_source())
+        return snap
+
+    def invalidate_snapshot(self) -> None:
+        self._snapshot = None
+
+    async def query(self, locator: Tuple[str, str]) -> Optional[SnapshotNode]:
+        """在快照上查找元素，未找到返回 None。"""
+        return (await self.snapshot()).find(locator)
+
+    async def query_all(self, locator: Tuple[str, str]) -> List[SnapshotNode]:
+        return (await self.snapshot()).find_all(locator)
+
+    async def wait_ready(
+        self, locator: Tuple[str, str], timeout: Optional[float] = None, require_enabled: bool = True
+    ) -> SnapshotNode:
+        """等待元素可见、可用、在屏幕内且位置稳定；每次轮询只请求一次 page_source。"""
+        last: List[Optional[Tuple[int, int, int, int]]] = [None]
+
+        async def _ready() -> Any:
+            snap = await self.snapshot(refresh=True)
+            node = snap.find(locator)
+            if node is None or not node.displayed or (require_enabled and not node.enabled) or not snap.in_view(node):
+                last[0] = None
+                return False
+            stable = last[0] == node.bounds
+            last[0] = node.bounds
+            return node if stable else False
+
+        return cast(SnapshotNode, await self._until(_ready, locator, timeout))
+
+    async def tap(self, target: Union[Tuple[str, str], SnapshotNode]) -> SnapshotNode:
+        """按快照中的中心坐标点击，单条命令完成。"""
+        node = target if isinstance(target, SnapshotNode) else await self.wait_ready(target)
+        x, y = node.center
+        await self.driver.execute_script("mobile: clickGesture", {"x": x, "y": y})
+        self.invalidate_snapshot()
+        return node
+
+    async def _until(
+        self,
+        condition: Callable[[], Awaitable[Any]],
+        locator: Tuple[str, str],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """轮询直到条件返回真值，忽略未找到与过期元素；超时抛出 TimeoutException（与 WebDriverWait 一致）。"""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            try:
+                value = await condition()
+                if value:
+                    return value
+            except _IGNORED:
+                pass
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"等待元素超时: {locator[0]}={locator[1]}")
+            await asyncio.sleep(self.poll)
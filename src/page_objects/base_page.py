@@ -1,43 +1,146 @@
 """基础 Page 封装
 
 提供常用查找、点击、输入与显式等待，减少用例重复代码。
+元素查找经由 `LocatorCache`，简单 XPath 会被改写为更快的策略并按页面学习最快解析方式。
+快照模式下一次 `page_source` 回答多个定位与状态查询，页面操作后自动失效。
 """
 
 from __future__ import annotations
 
-from typing import Any, Tuple
+import time
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple, Union
 
-from appium.webdriver.webdriver import WebDriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webelement import WebElement
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+
+from src.core.geometry import geometry_of
+from src.core.lazy import lazy_import
+from src.core.tracing import span
+from src.page_objects.locators import LocatorCache, get_locator_cache
+from src.page_objects.snapshot import PageSnapshot, SnapshotNode
+
+if TYPE_CHECKING:
+    from appium.webdriver.webdriver import WebDriver
+    from selenium.webdriver.remote.webelement import WebElement
+    from selenium.webdriver.support.ui import WebDriverWait
+else:
+    WebDriverWait = lazy_import("selenium.webdriver.support.ui:WebDriverWait")
+
+_IGNORED = (NoSuchElementException, StaleElementReferenceException)
 
 
 class BasePage:
     """页面对象基类。"""
 
-    def __init__(self, driver: WebDriver, timeout: int = 15):
+    def __init__(
+        self,
+        driver: WebDriver,
+        timeout: int = 15,
+        locators: Optional[LocatorCache] = None,
+        snapshot_max_age: float = 2.0,
+    ):
         self.driver = driver
         self.timeout = timeout
+        self.locators = locators or get_locator_cache()
+        # 定位器统计按页面区分，同名定位器在不同页面可能有不同的最快策略
+        self.screen = type(self).__name__
+        self.snapshot_max_age = snapshot_max_age
+        self._snapshot: Optional[PageSnapshot] = None
+
+    def locate(self, locator: Tuple[str, str]) -> WebElement:
+        """立即查找一次元素（不等待），未找到时抛出 NoSuchElementException。"""
+        element: WebElement = self.locators.find(self.driver, locator, self.screen)
+        return element
 
     def find(self, locator: Tuple[str, str]) -> WebElement:
         """等待元素出现并返回。"""
-        return WebDriverWait(self.driver, self.timeout).until(EC.presence_of_element_located(locator))
+        with span("page.find", screen=self.screen, locator=locator[1]):
+            return self._wait().until(lambda _: self.locate(locator))
 
     def click(self, locator: Tuple[str, str]):
         """等待元素可点击并执行点击。"""
-        element = WebDriverWait(self.driver, self.timeout).until(EC.element_to_be_clickable(locator))
-        element.click()
+
+        def _clickable(_: Any) -> Any:
+            element = self.locate(locator)
+            return element if element.is_displayed() and element.is_enabled() else False
+
+        with span("page.click", screen=self.screen, locator=locator[1]):
+            element = self._wait().until(_clickable)
+            element.click()
+        self.invalidate_snapshot()
         return element
 
     def type(self, locator: Tuple[str, str], text: str):
         """清空并输入文本。"""
-        element = self.find(locator)
-        element.clear()
-        element.send_keys(text)
+        with span("page.type", screen=self.screen, locator=locator[1]):
+            element = self.find(locator)
+            element.clear()
+            element.send_keys(text)
+        self.invalidate_snapshot()
         return element
 
     def wait_visible(self, locator: Tuple[str, str]):
         """等待元素可见。"""
-        return WebDriverWait(self.driver, self.timeout).until(EC.visibility_of_element_located(locator))
+
+        def _visible(_: Any) -> Any:
+            element = self.locate(locator)
+            return element if element.is_displayed() else False
+
+        with span("page.wait_visible", screen=self.screen, locator=locator[1]):
+            return self._wait().until(_visible)
+
+    def snapshot(self, refresh: bool = False) -> PageSnapshot:
+        """返回当前页面快照；不存在、已过期或 `refresh=True` 时重新获取一次 page_source。"""
+        snap = self._snapshot
+        if refresh or snap is None or time.monotonic() - snap.taken_at > self.snapshot_max_age:
+            with span("page.snapshot", screen=self.screen):
+                snap = self._snapshot = PageSnapshot.parse(self.driver.page_source)
+            geometry_of(self.driver).observe_snapshot(snap.width, snap.height, snap.rotation)
+        return snap
+
+    def invalidate_snapshot(self) -> None:
+        """页面可能已变化（点击、输入、滚动后），下次查询重新获取快照。"""
+        self._snapshot = None
+
+    def query(self, locator: Tuple[str, str]) -> Optional[SnapshotNode]:
+        """在快照上查找元素，未找到返回 None。"""
+        return self.snapshot().find(locator)
+
+    def query_all(self, locator: Tuple[str, str]) -> List[SnapshotNode]:
+        """在快照上查找全部匹配元素。"""
+        return self.snapshot().find_all(locator)
+
+    def wait_ready(
+        self, locator: Tuple[str, str], timeout: Optional[float] = None, require_enabled: bool = True
+    ) -> SnapshotNode:
+        """等待元素可见、可用、在屏幕内且位置稳定。
+
+        每次轮询只请求一次 page_source，存在性、状态、窗口尺寸与位置稳定性都从快照判定。
+        """
+        last: List[Optional[Tuple[int, int, int, int]]] = [None]
+
+        def _ready(_: Any) -> Any:
+            node = self.snapshot(refresh=True).ready(locator, require_enabled)
+            if node is None:
+                last[0] = None
+                return False
+            # 连续两次快照中位置一致即视为稳定（动画结束）
+            stable = last[0] == node.bounds
+            last[0] = node.bounds
+            return node if stable else False
+
+        wait = WebDriverWait(self.driver, self.timeout if timeout is None else timeout, poll_frequency=0.2)
+        with span("page.wait_ready", screen=self.screen, locator=locator[1]):
+            node: SnapshotNode = wait.until(_ready)
+        return node
+
+    def tap(self, target: Union[Tuple[str, str], SnapshotNode]) -> SnapshotNode:
+        """按快照中的中心坐标点击，单条命令完成，无需再取 WebElement。"""
+        node = target if isinstance(target, SnapshotNode) else self.wait_ready(target)
+        x, y = node.center
+        with span("page.tap", screen=self.screen):
+            self.driver.execute_script("mobile: clickGesture", {"x": x, "y": y})
+        self.invalidate_snapshot()
+        return node
+
+    def _wait(self) -> WebDriverWait:
+        return WebDriverWait(self.driver, self.timeout, ignored_exceptions=_IGNORED)
@@ -0,0 +1,395 @@
+"""定位器解析层
+
+职责：
+- 将简单 XPath 改写为等价的 ID / 无障碍 ID / UiSelector 查找，避免 UiAutomator2 为 XPath 序列化整棵控件树
+- 按“页面 + 逻辑定位器”记录各候选策略的耗时，优先使用上次最快解析成功的策略
+- 改写结果首次命中时与原 XPath 对照校验，不一致的改写永久弃用；统计持久化到本地 JSON
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+from src.core.lazy import lazy_import
+from src.core.logger import setup_logger
+from src.core.waits import SettleStat
+
+AppiumBy = lazy_import("appium.webdriver.common.appiumby:AppiumBy")
+
+Locator = Tuple[str, str]
+
+DEFAULT_STATS_FILE = Path(".cache") / "locator_stats.json"
+
+# 无历史数据时的先验耗时（秒），决定候选的初始尝试顺序；键为 AppiumBy 的策略名（写字面值，导入时不加载 appium）
+PRIOR_SECONDS = {
+    "id": 0.05,
+    "accessibility id": 0.06,
+    "-android uiautomator": 0.08,
+    "xpath": 0.5,
+}
+
+# XPath 属性 -> UiSelector 方法（精确、contains、starts-with）
+_TEXT_ATTRS = {
+    "text": ("text", "textContains", "textStartsWith"),
+    "content-desc": ("description", "descriptionContains", "descriptionStartsWith"),
+    "resource-id": ("resourceId", None, None),
+    "class": ("className", None, None),
+    "package": ("packageName", None, None),
+}
+_BOOL_ATTRS = {
+    "checkable": "checkable",
+    "checked": "checked",
+    "clickable": "clickable",
+    "enabled": "enabled",
+    "focusable": "focusable",
+    "focused": "focused",
+    "long-clickable": "longClickable",
+    "scrollable": "scrollable",
+    "selected": "selected",
+}
+
+_INDEXED = re.compile(r"^\(\s*(?P<inner>.+?)\s*\)\s*\[\s*(?P<index>\d+)\s*\]$")
+_STEP = re.compile(r"^//(?P<cls>\*|[A-Za-z_][\w.$]*)(?P<preds>(?:\[[^\[\]]+\])*)$")
+_PRED = re.compile(r"\[([^\[\]]+)\]")
+_VALUE = r"(?:\"(?P<dq>[^\"]*)\"|'(?P<sq>[^']*)')"
+_EQUALS = re.compile(r"^@(?P<attr>[\w-]+)\s*=\s*" + _VALUE + r"$")
+_FUNC = re.compile(r"^(?P<func>contains|starts-with)\(\s*@(?P<attr>[\w-]+)\s*,\s*" + _VALUE + r"\s*\)$")
+
+
+def _java_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _parse_condition(text: str) -> Optional[Tuple[str, str, str]]:
+    """解析单个谓词条件为 (函数, 属性, 值)；不支持时返回 None。"""
+    text = text.strip()
+    match = _EQUALS.match(text)
+    if match:
+        value = match.group("dq") if match.group("dq") is not None else match.group("sq")
+        return "=", match.group("attr"), value
+    match = _FUNC.match(text)
+    if match:
+        value = match.group("dq") if match.group("dq") is not None else match.group("sq")
+        return match.group("func"), match.group("attr"), value
+    return None
+
+
+def rewrite_xpath(xpath: str) -> List[Locator]:
+    """将单步 XPath 改写为等价的快速定位器（按预期速度排序），无法改写时返回空列表。
+
+    支持 `//Class[@attr="v"]`、`contains()/starts-with()`、`and` 连接多个条件、
+    `(//...)[n]` 全局序号；属性存在性、轴、层级路径等均不改写。
+    """
+    xpath = xpath.strip()
+    index: Optional[int] = None
+    indexed = _INDEXED.match(xpath)
+    if indexed:
+        xpath, index = indexed.group("inner"), int(indexed.group("index"))
+        if index < 1:
+            return []
+    step = _STEP.match(xpath)
+    if not step:
+        return []
+    conditions: List[Tuple[str, str, str]] = []
+    for pred in _PRED.findall(step.group("preds")):
+        for part in re.split(r"\s+and\s+", pred):
+            parsed = _parse_condition(part)
+            if parsed is None:
+                return []
+            conditions.append(parsed)
+
+    cls = step.group("cls")
+    selector = "new UiSelector()"
+    if cls != "*":
+        selector += f".className({_java_string(cls)})"
+    for func, attr, value in conditions:
+        if attr in _BOOL_ATTRS and func == "=" and value in ("true", "false"):
+            selector += f".{_BOOL_ATTRS[attr]}({value})"
+            continue
+        methods = _TEXT_ATTRS.get(attr)
+        method = None
+        if methods is not None:
+            method = {"=": methods[0], "contains": methods[1], "starts-with": methods[2]}[func]
+        if method is None:
+            return []
+        selector += f".{method}({_java_string(value)})"
+    if index is not None:
+        selector += f".instance({index - 1})"
+
+    candidates: List[Locator] = []
+    exact = {attr: value for func, attr, value in conditions if func == "="}
+    if index is None and len(conditions) == 1 and "resource-id" in exact:
+        candidates.append((AppiumBy.ID, exact["resource-id"]))
+    if index is None and len(conditions) == 1 and "content-desc" in exact:
+        candidates.append((AppiumBy.ACCESSIBILITY_ID, exact["content-desc"]))
+    candidates.append((AppiumBy.ANDROID_UIAUTOMATOR, selector))
+    return candidates
+
+
+def locator_key(locator: Locator) -> str:
+    return f"{locator[0]}={locator[1]}"
+
+
+@dataclass
+class LocatorEntry:
+    """单个逻辑定位器在某页面上的解析记录。"""
+
+    locator: Locator
+    candidates: List[Locator]
+    stats: Dict[str, SettleStat] = field(default_factory=dict)
+    winner: Optional[Locator] = None
+    verified: Set[str] = field(default_factory=set)
+    rejected: Set[str] = field(default_factory=set)
+    misses: int = 0
+
+    def expected(self, candidate: Locator) -> float:
+        stat = self.stats.get(locator_key(candidate))
+        if stat and stat.count:
+            return stat.ewma
+        return PRIOR_SECONDS.get(candidate[0], 0.5)
+
+    def order(self, fallback_after: int) -> List[Locator]:
+        """本次尝试顺序：有可靠胜者时只试胜者，连续未命中 `fallback_after` 次后才回退全部候选。
+
+        等待元素出现的轮询中每次只花一次胜者查找；回退时原定位器排在最后，改写失效（如页面改版）时仍能命中。
+        """
+        if self.winner is not None and self.misses < fallback_after:
+            return [self.winner]
+        usable = [c for c in self.candidates if locator_key(c) not in self.rejected]
+        rewrites = sorted((c for c in usable if c != self.locator), key=self.expected)
+        return rewrites + [self.locator]
+
+
+class LocatorCache:
+    """带策略改写与耗时学习的元素查找。
+
+    - `find(driver, locator, screen)` 与 `driver.find_element(*locator)` 语义一致，未找到时抛 NoSuchElementException
+    - `find_async(driver, locator, screen)`：`AsyncDriver` 上的同一查找，统计与同步查找共用
+    - `screen` 区分不同页面上的同名定位器（通常为 Page 类名）
+    - `fallback_after`：胜者策略连续未命中该次数后，重新尝试全部候选
+    """
+
+    def __init__(
+        self,
+        stats_file: Optional[Path] = DEFAULT_STATS_FILE,
+        fallback_after: int = 3,
+        verify: bool = True,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.stats_file = stats_file
+        self.fallback_after = fallback_after
+        self.verify = verify
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._logger = setup_logger("tests")
+        self.entries: Dict[str, LocatorEntry] = {}
+        self._saved: Dict[str, Any] = self._load()
+
+    def find(self, driver: Any, locator: Locator, screen: str = "") -> Any:
+        """按学习到的最快策略查找元素。"""
+        entry = self.entry(locator, screen)
+        order = entry.order(self.fallback_after)
+        for candidate in order:
+            start = self._clock()
+            try:
+                element = driver.find_element(*candidate)
+            except WebDriverException as exc:
+                if not self._failed(entry, candidate, exc):
+                    raise
+                continue
+            elapsed = self._clock() - start
+            if self._needs_check(entry, candidate) and not self._same_as_original(driver, entry, candidate, element):
+                continue
+            self._record(entry, candidate, elapsed)
+            return element
+        self._exhausted(entry, order)
+        raise NoSuchElementException(f"未找到元素: {locator_key(locator)}")
+
+    async def find_async(self, driver: Any, locator: Locator, screen: str = "") -> Any:
+        """`find` 的协程版本，供 `AsyncDriver` 使用；策略选择与统计和同步查找共用。"""
+        entry = self.entry(locator, screen)
+        order = entry.order(self.fallback_after)
+        for candidate in order:
+            start = self._clock()
+            try:
+                element = await driver.find_element(*candidate)
+            except WebDriverException as exc:
+                if not self._failed(entry, candidate, exc):
+                    raise
+                continue
+            elapsed = self._clock() - start
+            if self._needs_check(entry, candidate) and not await self._same_as_original_async(
+                driver, entry, candidate, element
+            ):
+                continue
+            self._record(entry, candidate, elapsed)
+            return element
+        self._exhausted(entry, order)
+        raise NoSuchElementException(f"未找到元素: {locator_key(locator)}")
+
+    def entry(self, locator: Locator, screen: str = "") -> LocatorEntry:
+        key = f"{screen}|{locator_key(locator)}"
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                locator = (locator[0], locator[1])
+                candidates = rewrite_xpath(locator[1]) if locator[0] == AppiumBy.XPATH else []
+                entry = LocatorEntry(locator, candidates + [locator])
+                try:
+                    self._restore(entry, self._saved.get(key))
+                except (KeyError, TypeError, ValueError) as exc:
+                    self._logger.warning(f"定位器历史数据损坏，忽略: {key}: {exc}")
+                self.entries[key] = entry
+        return entry
+
+    def save(self) -> None:
+        """将各定位器的策略选择与耗时写回本地文件。"""
+        if self.stats_file is None:
+            return
+        payload = dict(self._saved)
+        with self._lock:
+            for key, entry in self.entries.items():
+                payload[key] = {
+                    "winner": list(entry.winner) if entry.winner else None,
+                    "verified": sorted(entry.verified),
+                    "rejected": sorted(entry.rejected),
+                    "stats": {
+                        k: {"ewma": round(v.ewma, 4), "count": v.count, "worst": round(v.worst, 4)}
+                        for k, v in entry.stats.items()
+                    },
+                }
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.stats_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.stats_file)
+        except OSError as exc:
+            self._logger.warning(f"保存定位器统计失败: {exc}")
+
+    def report_lines(self, top: int = 10) -> List[str]:
+        """生成定位器耗时汇总（按累计耗时降序）。"""
+        rows = []
+        for key, entry in self.entries.items():
+            hits = [s for s in entry.stats.values() if s.count]
+            if not hits:
+                continue
+            total = sum(s.ewma * s.count for s in hits)
+            winner = entry.winner[0] if entry.winner else "-"
+            original = entry.stats.get(locator_key(entry.locator))
+            rows.append((total, sum(s.count for s in hits), winner, original, key))
+        if not rows:
+            return []
+        rows.sort(key=lambda r: r[0], reverse=True)
+        lines = [f"{'累计':>8} {'次数':>5} {'原策略均值':>10}  {'当前策略':<22} 定位器"]
+        for total, count, winner, original, key in rows[:top]:
+            base = f"{original.ewma:10.3f}" if original and original.count else f"{'-':>10}"
+            lines.append(f"{total:8.2f} {count:5d} {base}  {winner:<22} {key}")
+        return lines
+
+    def _failed(self, entry: LocatorEntry, candidate: Locator, exc: WebDriverException) -> bool:
+        """处理单个候选的查找异常；返回 False 表示应原样抛出（原定位器自身出错）。"""
+        if isinstance(exc, NoSuchElementException):
+            self._record(entry, candidate, None)
+            return True
+        if candidate == entry.locator:
+            return False
+        # 改写后的选择器不被服务端接受
+        self._reject(entry, candidate, f"服务端不支持: {exc.msg or exc}")
+        return True
+
+    def _exhausted(self, entry: LocatorEntry, tried: List[Locator]) -> None:
+        """回退到全部候选仍未命中说明元素尚未出现而非改写失效，重新计数，之后的轮询仍只试胜者。"""
+        if len(tried) > 1:
+            with self._lock:
+                entry.misses = 0
+
+    def _needs_check(self, entry: LocatorEntry, candidate: Locator) -> bool:
+        return candidate != entry.locator and self.verify and locator_key(candidate) not in entry.verified
+
+    def _same_as_original(self, driver: Any, entry: LocatorEntry, candidate: Locator, element: Any) -> bool:
+        """首次命中时用原定位器对照一次，确认改写指向同一元素。"""
+        try:
+            reference = driver.find_element(*entry.locator)
+            same = getattr(reference, "id", None) == getattr(element, "id", None) or reference.rect == element.rect
+        except WebDriverException:
+            same = False
+        return self._checked(entry, candidate, bool(same))
+
+    async def _same_as_original_async(self, driver: Any, entry: LocatorEntry, candidate: Locator, element: Any) -> bool:
+        try:
+            reference = await driver.find_element(*entry.locator)
+            same = reference.id == element.id or await reference.rect() == await element.rect()
+        except WebDriverException:
+            same = False
+        return self._checked(entry, candidate, bool(same))
+
+    def _checked(self, entry: LocatorEntry, candidate: Locator, same: bool) -> bool:
+        """记录对照结果：一致则此后不再对照，不一致则永久弃用该改写。"""
+        if same:
+            with self._lock:
+                entry.verified.add(locator_key(candidate))
+        else:
+            self._reject(entry, candidate, "与原定位器结果不一致")
+        return same
+
+    def _record(self, entry: LocatorEntry, candidate: Locator, elapsed: Optional[float]) -> None:
+        with self._lock:
+            if elapsed is None:
+                if candidate == entry.winner:
+                    entry.misses += 1
+                return
+            entry.stats.setdefault(locator_key(candidate), SettleStat()).observe(elapsed)
+            entry.winner = candidate
+            entry.misses = 0
+
+    def _reject(self, entry: LocatorEntry, candidate: Locator, reason: str) -> None:
+        with self._lock:
+            entry.rejected.add(locator_key(candidate))
+            if entry.winner == candidate:
+                entry.winner = None
+        self._logger.info(f"弃用定位器改写 {locator_key(candidate)}（{reason}）")
+
+    @staticmethod
+    def _restore(entry: LocatorEntry, data: Optional[Dict[str, Any]]) -> None:
+        if not data:
+            return
+        known = {locator_key(c): c for c in entry.candidates}
+        entry.verified = {k for k in data.get("verified", []) if k in known}
+        entry.rejected = {k for k in data.get("rejected", []) if k in known}
+        for k, v in data.get("stats", {}).items():
+            if k in known:
+                entry.stats[k] = SettleStat(float(v["ewma"]), int(v["count"]), float(v.get("worst", 0.0)))
+        winner = data.get("winner")
+        if winner:
+            key = locator_key((winner[0], winner[1]))
+            if key in known and key not in entry.rejected:
+                entry.winner = known[key]
+
+    def _load(self) -> Dict[str, Any]:
+        if self.stats_file is None or not self.stats_file.exists():
+            return {}
+        try:
+            data = json.loads(self.stats_file.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as exc:
+            self._logger.warning(f"读取定位器统计失败，忽略历史数据: {exc}")
+            return {}
+
+
+_DEFAULT_CACHE: Optional[LocatorCache] = None
+
+
+def get_locator_cache() -> LocatorCache:
+    """获取进程内共享的默认定位器缓存（跨页面对象累积统计）。"""
+    global _DEFAULT_CACHE  # pylint: disable=global-statement
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = LocatorCache()
+    return _DEFAULT_CACHE
@@ -0,0 +1,260 @@
+"""页面快照模块
+
+职责：
+- 一次 `page_source` 请求获取整棵控件树，解析为带索引的内存结构（bounds/enabled/displayed/text/resource-id）
+- 在快照上回答定位与状态查询（ID、无障碍 ID、类名、常见 UiSelector、可改写的简单 XPath），不再逐项发 HTTP 命令
+- 无法在快照上等价求值的定位器抛出 `UnsupportedLocator`，由调用方回退为实时查找
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.lazy import lazy_import
+from src.page_objects.locators import Locator, rewrite_xpath
+
+AppiumBy = lazy_import("appium.webdriver.common.appiumby:AppiumBy")
+
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+_SELECTOR_CALL = re.compile(r"\.(?P<method>\w+)\(\s*(?P<arg>\"(?:[^\"\\]|\\.)*\"|-?\d+|true|false)\s*\)")
+
+# UiSelector 方法 -> (属性, 比较方式)
+_SELECTOR_METHODS: Dict[str, Tuple[str, str]] = {
+    "text": ("text", "eq"),
+    "textContains": ("text", "contains"),
+    "textStartsWith": ("text", "startswith"),
+    "textMatches": ("text", "matches"),
+    "description": ("content-desc", "eq"),
+    "descriptionContains": ("content-desc", "contains"),
+    "descriptionStartsWith": ("content-desc", "startswith"),
+    "descriptionMatches": ("content-desc", "matches"),
+    "resourceId": ("resource-id", "eq"),
+    "resourceIdMatches": ("resource-id", "matches"),
+    "className": ("class", "eq"),
+    "classNameMatches": ("class", "matches"),
+    "packageName": ("package", "eq"),
+    "packageNameMatches": ("package", "matches"),
+    "checkable": ("checkable", "eq"),
+    "checked": ("checked", "eq"),
+    "clickable": ("clickable", "eq"),
+    "enabled": ("enabled", "eq"),
+    "focusable": ("focusable", "eq"),
+    "focused": ("focused", "eq"),
+    "longClickable": ("long-clickable", "eq"),
+    "scrollable": ("scrollable", "eq"),
+    "selected": ("selected", "eq"),
+    "index": ("index", "eq"),
+}
+
+
+class UnsupportedLocator(ValueError):
+    """定位器无法在快照上等价求值。"""
+
+
+@dataclass(eq=False)
+class SnapshotNode:
+    """快照中的单个控件。`order` 为文档顺序，与 UiAutomator 的 instance 顺序一致。"""
+
+    order: int
+    attrs: Dict[str, str]
+    bounds: Tuple[int, int, int, int]
+    parent: Optional["SnapshotNode"] = None
+    children: List["SnapshotNode"] = field(default_factory=list)
+
+    @property
+    def class_name(self) -> str:
+        return self.attrs.get("class", "")
+
+    @property
+    def text(self) -> str:
+        return self.attrs.get("text", "")
+
+    @property
+    def resource_id(self) -> str:
+        return self.attrs.get("resource-id", "")
+
+    @property
+    def content_desc(self) -> str:
+        return self.attrs.get("content-desc", "")
+
+    @property
+    def enabled(self) -> bool:
+        return self.attrs.get("enabled", "true") == "true"
+
+    @property
+    def displayed(self) -> bool:
+        width, height = self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1]
+        return self.attrs.get("displayed", "true") == "true" and width > 0 and height > 0
+
+    @property
+    def rect(self) -> Dict[str, int]:
+        left, top, right, bottom = self.bounds
+        return {"x": left, "y": top, "width": right - left, "height": bottom - top}
+
+    @property
+    def location(self) -> Dict[str, int]:
+        return {"x": self.bounds[0], "y": self.bounds[1]}
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+    def __repr__(self) -> str:
+        label = self.resource_id or self.text or self.content_desc
+        return f"SnapshotNode({self.class_name}, {label!r}, {self.bounds})"
+
+
+def _parse_bounds(value: str) -> Tuple[int, int, int, int]:
+    match = _BOUNDS.match(value or "")
+    if not match:
+        return 0, 0, 0, 0
+    left, top, right, bottom = (int(v) for v in match.groups())
+    return left, top, right, bottom
+
+
+def _java_literal(arg: str) -> str:
+    if arg.startswith('"'):
+        # 仅还原引号与反斜杠转义，保留正则中的 \d 等写法
+        return re.sub(r'\\(["\\])', r"\1", arg[1:-1])
+    return arg
+
+
+class PageSnapshot:
+    """解析后的控件树，附带按 resource-id / text / content-desc / class 的索引。"""
+
+    def __init__(
+        self, nodes: List[SnapshotNode], width: int, height: int, digest: str, taken_at: float, rotation: int = 0
+    ) -> None:
+        self.nodes = nodes
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.digest = digest
+        self.taken_at = taken_at
+        self._index: Dict[str, Dict[str, List[SnapshotNode]]] = {
+            "resource-id": {},
+            "text": {},
+            "content-desc": {},
+            "class": {},
+        }
+        for node in nodes:
+            for attr, index in self._index.items():
+                value = node.attrs.get(attr)
+                if value:
+                    index.setdefault(value, []).append(node)
+
+    @classmethod
+    def parse(cls, source: str, clock: Callable[[], float] = time.monotonic) -> "PageSnapshot":
+        """解析 UiAutomator2 的 `page_source` XML。"""
+        root = ET.fromstring(source.encode("utf-8") if isinstance(source, str) else source)
+        nodes: List[SnapshotNode] = []
+
+        def _walk(element: ET.Element, parent: Optional[SnapshotNode]) -> None:
+            for child in element:
+                attrs = dict(child.attrib)
+                attrs.setdefault("class", child.tag)
+                node = SnapshotNode(len(nodes), attrs, _parse_bounds(attrs.get("bounds", "")), parent)
+                nodes.append(node)
+                if parent is not None:
+                    parent.children.append(node)
+                _walk(child, node)
+
+        _walk(root, None)
+        width = int(root.attrib.get("width") or 0) or max((n.bounds[2] for n in nodes), default=0)
+        height = int(root.attrib.get("height") or 0) or max((n.bounds[3] for n in nodes), default=0)
+        digest = hashlib.sha1(source.encode("utf-8") if isinstance(source, str) else source).hexdigest()
+        rotation = int(root.attrib.get("rotation") or 0)
+        return cls(nodes, width, height, digest, clock(), rotation)
+
+    @property
+    def window_size(self) -> Dict[str, int]:
+        return {"width": self.width, "height": self.height}
+
+    def in_view(self, node: SnapshotNode) -> bool:
+        """控件左上角是否落在屏幕内（与 wait_for_element 的判定一致）。"""
+        return 0 <= node.bounds[0] < self.width and 0 <= node.bounds[1] < self.height
+
+    def ready(self, locator: Locator, require_enabled: bool = True) -> Optional[SnapshotNode]:
+        """返回第一个可见、可用（`require_enabled` 时）且在屏幕内的匹配控件，不满足时返回 None。"""
+        node = self.find(locator)
+        if node is None or not node.displayed or (require_enabled and not node.enabled) or not self.in_view(node):
+            return None
+        return node
+
+    def find(self, locator: Locator) -> Optional[SnapshotNode]:
+        """返回第一个匹配的控件，没有时返回 None。"""
+        matches = self.find_all(locator)
+        return matches[0] if matches else None
+
+    def find_all(self, locator: Locator) -> List[SnapshotNode]:
+        """按文档顺序返回全部匹配控件；不支持的定位器抛出 UnsupportedLocator。"""
+        by, value = locator
+        if by == AppiumBy.ID:
+            if ":id/" in value:
+                return list(self._index["resource-id"].get(value, []))
+            # UiAutomator2 允许省略包名前缀
+            return [n for n in self.nodes if n.resource_id == value or n.resource_id.endswith(f":id/{value}")]
+        if by == AppiumBy.ACCESSIBILITY_ID:
+            return list(self._index["content-desc"].get(value, []))
+        if by == AppiumBy.CLASS_NAME:
+            return list(self._index["class"].get(value, []))
+        if by == AppiumBy.ANDROID_UIAUTOMATOR:
+            return self._select(value)
+        if by == AppiumBy.XPATH:
+            rewrites = rewrite_xpath(value)
+            if not rewrites:
+                raise UnsupportedLocator(f"快照不支持该 XPath: {value}")
+            return self._select(rewrites[-1][1])
+        raise UnsupportedLocator(f"快照不支持定位策略: {by}")
+
+    def _select(self, selector: str) -> List[SnapshotNode]:
+        """在快照上求值 `new UiSelector()` 链式条件。"""
+        text = selector.strip().rstrip(";")
+        if not text.startswith("new UiSelector()"):
+            raise UnsupportedLocator(f"快照不支持该 UiSelector: {selector}")
+        rest = text[len("new UiSelector()") :]
+        calls = list(_SELECTOR_CALL.finditer(rest))
+        if "".join(m.group(0) for m in calls) != re.sub(r"\s+(?=\.)", "", rest):
+            raise UnsupportedLocator(f"快照不支持该 UiSelector: {selector}")
+
+        conditions: List[Tuple[str, str, str]] = []
+        instance: Optional[int] = None
+        for call in calls:
+            method, arg = call.group("method"), _java_literal(call.group("arg"))
+            if method == "instance":
+                instance = int(arg)
+                continue
+            if method not in _SELECTOR_METHODS:
+                raise UnsupportedLocator(f"快照不支持 UiSelector.{method}")
+            attr, op = _SELECTOR_METHODS[method]
+            conditions.append((attr, op, arg))
+
+        pool = self.nodes
+        for attr, op, arg in conditions:
+            if op == "eq" and attr in self._index:
+                pool = self._index[attr].get(arg, [])
+                break
+        matches = [n for n in pool if all(self._check(n, attr, op, arg) for attr, op, arg in conditions)]
+        if instance is not None:
+            return matches[instance : instance + 1]
+        return matches
+
+    @staticmethod
+    def _check(node: SnapshotNode, attr: str, op: str, arg: str) -> bool:
+        value = node.attrs.get(attr, "")
+        if op == "eq":
+            return value == arg
+        if op == "contains":
+            return arg in value
+        if op == "startswith":
+            return value.startswith(arg)
+        try:
+            return re.fullmatch(arg, value, re.DOTALL) is not None
+        except re.error as exc:
+            raise UnsupportedLocator(f"正则无法在 Python 中求值: {arg}") from exc
@@ -1,7 +1,8 @@
 """Pytest 全局夹具与钩子
 
 - 提供配置、日志、capabilities 与 Appium Driver 夹具
-- 用例失败时自动附加截图与 page_source 到 Allure
+- 用例失败时取一次截图与 page_source，由后台线程压缩去重落盘，Allure 附件链接到对应文件
+- cv2/numpy/appium 均延迟导入：`-m "not e2e"` 收集与执行单元测试时不加载；月相期望值核对在用例选定后才进行
 """
 
 from __future__ import annotations
@@ -9,18 +10,36 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Generator
+from typing import TYPE_CHECKING, Dict, Generator, List
 
 import allure
 import pytest
-from appium.webdriver.webdriver import WebDriver
-import time
+from src.core.app_lifecycle import get_launch_stats
+from src.core.artifacts import MB, ArtifactCollector
+from src.core.case_planner import CasePlan, CostModel, plan_cases
 from src.core.config import get_config
-from src.core.driver_factory import DriverFactory
+from src.core.dataset import LunarCase
+from src.core.device_pool import DevicePool, balance, server_ready
+from src.core.driver_factory import DriverFactory, DriverHandle
+from src.core.geometry import geometry_of
+from src.core.lazy import lazy_import
 from src.core.logger import setup_logger
-from selenium.webdriver.support.ui import WebDriverWait
+from src.core.result_cache import CachedResult, get_result_cache
+from src.core.tracing import Tracer, get_tracer, span
+from src.core.transport import element_state, get_command_recorder, pipeline_width
+from src.core.waits import AdaptiveWaiter
+from src.page_objects.locators import LocatorCache, get_locator_cache
+from src.page_objects.snapshot import PageSnapshot, UnsupportedLocator
+from src.utils.path import project_root
+from tests.unit.golden_index import GoldenIndex, get_golden_index
+from tests.unit.phase_classifier import PhaseClassifier
+from tests.unit.template_store import TemplateStore, get_template_store
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
-from selenium.webdriver.support import expected_conditions as EC
+
+if TYPE_CHECKING:
+    from appium.webdriver.webdriver import WebDriver
+
+lunar_oracle = lazy_import("src.core.lunar_oracle")
 
 
 @pytest.fixture(scope="session")
@@ -35,36 +54,361 @@ def logger():
     return setup_logger("tests")
 
 
+def _device_pool(config) -> DevicePool:  # type: ignore[no-untyped-def]
+    values = config.values
+    return DevicePool.from_profiles(
+        {name: profile.as_dict() for name, profile in config.profiles().items()},
+        names=config.device_pool_names(),
+        probe=lambda _caps: server_ready(values.appium_server_url),
+    )
+
+
+@pytest.fixture(scope="session")
+def device_lease(config, logger):  # type: ignore[no-untyped-def]
+    """设置 `DEVICE_POOL` 时，为当前 xdist worker 租用一台独占设备；否则返回 None。"""
+    if not config.values.device_pool:
+        yield None
+        return
+    pool = _device_pool(config)
+    lease = pool.lease()
+    yield lease
+    pool.release(lease)
+
+
 @pytest.fixture(scope="session")
-def capabilities(config):  # type: ignore[no-untyped-def]
-    """读取并返回当前设备 profile 的 capabilities。"""
+def capabilities(config, device_lease):  # type: ignore[no-untyped-def]
+    """读取并返回当前设备 profile 的 capabilities（设备池模式下为租用设备的 profile）。"""
+    if device_lease is not None:
+        return device_lease.capabilities
     return config.load_capabilities()
 
 
+PLAN_KEY = pytest.StashKey[CasePlan]()
+
+
+def _apply_case_plan(config, items, mode: str, k: int) -> None:  # type: ignore[no-untyped-def]
+    """按 `CASE_PLAN` 对月相用例去重、排序或分层抽样，其余用例位置不变。"""
+    lunar = {}
+    for index, item in enumerate(items):
+        params = getattr(getattr(item, "callspec", None), "params", {})
+        if "date_str" in params and "lunar_phase" in params:
+            lunar[index] = (LunarCase(params["date_str"], params["lunar_phase"]), item)
+    if not lunar:
+        return
+    plan = plan_cases([case for case, _ in lunar.values()], mode, k)
+    config.stash[PLAN_KEY] = plan
+    by_case: Dict[LunarCase, List[pytest.Item]] = {}
+    for case, item in lunar.values():
+        by_case.setdefault(case, []).append(item)
+    planned = [by_case[case].pop(0) for case in plan.cases]
+    deselected = [item for remaining in by_case.values() for item in remaining]
+    # 计划中的用例整体放在第一个月相用例的位置
+    first = min(lunar)
+    others = [item for index, item in enumerate(items) if index not in lunar]
+    items[:] = others[:first] + planned + others[first:]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):  # type: ignore[no-untyped-def]
+    """按 `CASE_PLAN` 规划月相用例。
+
+    设备池 + xdist 模式下，将 e2e 用例均衡分组到各设备槽位（配合 `--dist loadgroup`）。
+    """
+    app_config = get_config()
+    if app_config.values.case_plan != "all":
+        _apply_case_plan(config, items, app_config.values.case_plan, app_config.values.case_plan_k)
+    if not app_config.values.device_pool or not config.pluginmanager.hasplugin("xdist"):
+        return
+    e2e_items = [item for item in items if item.get_closest_marker("e2e")]
+    slots = len(_device_pool(app_config))
+    for index, group in enumerate(balance(e2e_items, slots)):
+        for item in group:
+            item.add_marker(pytest.mark.xdist_group(name=f"device-slot-{index}"))
+
+
+def pytest_collection_finish(session):  # type: ignore[no-untyped-def]
+    """按 `LUNAR_ORACLE` 核对已选中月相用例的期望值；未选中月相用例时不加载天文推算（numpy）。"""
+    mode = get_config().values.lunar_oracle
+    if mode == "off":
+        return
+    lunar: Dict[LunarCase, List[pytest.Item]] = {}
+    for item in session.items:
+        params = getattr(getattr(item, "callspec", None), "params", {})
+        if "date_str" in params and "lunar_phase" in params:
+            lunar.setdefault(LunarCase(params["date_str"], params["lunar_phase"]), []).append(item)
+    if not lunar:
+        return
+    logger = setup_logger("tests")
+    for mismatch in lunar_oracle.cross_check(list(lunar)):
+        logger.warning(f"期望月相与天文推算不符: {mismatch}")
+        if mode == "skip":
+            for item in lunar[LunarCase(mismatch.date, mismatch.expected)]:
+                item.add_marker(pytest.mark.xfail(run=False, reason=f"期望月相与天文推算不符: {mismatch}"))
+
+
 @pytest.fixture(scope="session")
-def appium_driver(config, capabilities, logger) -> Generator[WebDriver, None, None]:  # type: ignore[no-untyped-def]
-    """创建并在会话结束时释放 Appium 驱动。"""
-    factory = DriverFactory(config.values.appium_server_url, capabilities)
-    driver = factory.create()
-    logger.info("Appium 会话已创建")
-    yield driver
+def driver_factory(config, capabilities, logger) -> Generator[DriverFactory, None, None]:  # type: ignore[no-untyped-def]
+    """提供带会话池的驱动工厂，会话结束时关闭全部会话。"""
+    factory = DriverFactory(
+        config.values.appium_server_url,
+        capabilities,
+        pool_size=config.values.session_pool_size,
+        instrument=config.values.command_stats,
+        pipeline_width=config.values.pipeline_width,
+    )
+    yield factory
     logger.info("开始关闭 Appium 会话")
     factory.quit()
 
 
+@pytest.fixture(scope="session")
+def appium_driver(driver_factory: DriverFactory, logger) -> DriverHandle:  # type: ignore[no-untyped-def]
+    """创建 Appium 会话并返回其代理（非 WebDriver 子类）；会话失效后代理自动指向池中的新会话。"""
+    driver_factory.create()
+    logger.info("Appium 会话已创建")
+    return driver_factory.handle()
+
+
+@pytest.fixture(autouse=True)
+def ensure_appium_session(request):  # type: ignore[no-untyped-def]
+    """e2e 用例失败后确认会话可用，失效时从会话池换新，避免后续用例连锁失败。
+
+    通过的用例不做检查，不为每个用例多一次服务端往返。本夹具定义在 `attach_on_failure` 之前，
+    清理阶段晚于它执行，失败附件仍从原会话采集。
+    """
+    yield
+    if "appium_driver" not in getattr(request, "fixturenames", ()):
+        return
+    if any(getattr(getattr(request.node, f"rep_{when}", None), "failed", False) for when in ("setup", "call")):
+        request.getfixturevalue("driver_factory").ensure_healthy()
+
+
+WAITER_KEY = pytest.StashKey[AdaptiveWaiter]()
+LOCATOR_KEY = pytest.StashKey[LocatorCache]()
+TRACER_KEY = pytest.StashKey[Tracer]()
+TRACE_FILE = Path("logs") / "trace.json"
+
+
+@pytest.fixture(scope="session")
+def adaptive_waiter(request):  # type: ignore[no-untyped-def]
+    """提供会话级自适应等待器：加载历史稳定耗时，会话结束时写回。"""
+    waiter = AdaptiveWaiter()
+    request.config.stash[WAITER_KEY] = waiter
+    yield waiter
+    waiter.save()
+
+
+@pytest.fixture(autouse=True)
+def wait_budget(request):  # type: ignore[no-untyped-def]
+    """e2e 用例统计等待与操作耗时，汇总见终端报告。"""
+    if "appium_driver" not in getattr(request, "fixturenames", ()):
+        yield None
+        return
+    waiter = request.getfixturevalue("adaptive_waiter")
+    with waiter.budget(request.node.nodeid) as record:
+        yield record
+
+
+@pytest.fixture(autouse=True)
+def command_stats(request):  # type: ignore[no-untyped-def]
+    """e2e 用例发出的 Appium 命令计入本用例（需开启 APPIUM_COMMAND_STATS），汇总见终端报告。"""
+    if "appium_driver" not in getattr(request, "fixturenames", ()):
+        yield None
+        return
+    with get_command_recorder().scope(request.node.nodeid) as stat:
+        yield stat
+
+
+@pytest.fixture(scope="session")
+def tracer(request) -> Generator[Tracer, None, None]:  # type: ignore[no-untyped-def]
+    """提供会话级步骤追踪器：会话结束时写出 Chrome Trace JSON 并附加到 Allure。"""
+    trace = get_tracer()
+    request.config.stash[TRACER_KEY] = trace
+    yield trace
+    if trace.spans:
+        path = trace.write_chrome_trace(TRACE_FILE)
+        allure.attach.file(str(path), name="trace.json", attachment_type=allure.attachment_type.JSON)
+
+
+@pytest.fixture(autouse=True)
+def trace_case(request):  # type: ignore[no-untyped-def]
+    """e2e 用例的步骤归入当前用例，用例结束后将本用例的 trace 附加到 Allure。"""
+    if "appium_driver" not in getattr(request, "fixturenames", ()):
+        yield None
+        return
+    trace = request.getfixturevalue("tracer")
+    nodeid = request.node.nodeid
+    with trace.case(nodeid), trace.span("case", test=request.node.name):
+        yield trace
+    spans = trace.pop_case(nodeid)
+    if spans:
+        allure.attach(
+            json.dumps(trace.chrome_trace(spans), ensure_ascii=False),
+            name="trace",
+            attachment_type=allure.attachment_type.JSON,
+        )
+
+
+@pytest.fixture(scope="session")
+def locator_cache(request) -> Generator[LocatorCache, None, None]:  # type: ignore[no-untyped-def]
+    """提供会话级定位器缓存：加载历史策略选择，会话结束时写回。"""
+    cache = get_locator_cache()
+    request.config.stash[LOCATOR_KEY] = cache
+    yield cache
+    cache.save()
+
+
+def pytest_terminal_summary(terminalreporter, config):  # type: ignore[no-untyped-def]
+    """输出等待/操作耗时占比、定位器解析、Appium 命令、结果缓存、失败附件、用例计划、冷启动与各步骤 p50/p95。"""
+    waiter = config.stash.get(WAITER_KEY, None)
+    lines = waiter.report_lines() if waiter is not None else []
+    if lines:
+        terminalreporter.write_sep("-", "等待耗时统计")
+        for line in lines:
+            terminalreporter.write_line(line)
+    cache = config.stash.get(LOCATOR_KEY, None)
+    lines = cache.report_lines() if cache is not None else []
+    if lines:
+        terminalreporter.write_sep("-", "定位器耗时统计")
+        for line in lines:
+            terminalreporter.write_line(line)
+    lines = get_command_recorder().report_lines()
+    if lines:
+        terminalreporter.write_sep("-", "Appium 命令统计")
+        for line in lines:
+            terminalreporter.write_line(line)
+    if get_config().values.result_cache != "off":
+        cache = get_result_cache()
+        if cache.hits or cache.misses:
+            terminalreporter.write_sep("-", "结果缓存")
+            terminalreporter.write_line(
+                f"命中 {cache.hits}，未命中 {cache.misses}，节省约 {cache.saved:.0f}s（{cache.path}）"
+            )
+    collector = config.stash.get(ARTIFACT_KEY, None)
+    lines = collector.report_lines() if collector is not None else []
+    if lines:
+        terminalreporter.write_sep("-", "失败附件")
+        for line in lines:
+            terminalreporter.write_line(line)
+    trace = config.stash.get(TRACER_KEY, None)
+    plan = config.stash.get(PLAN_KEY, None)
+    if plan is not None:
+        # 有实测步骤耗时时用 p50 重新估算节省的设备时间
+        cost = CostModel.from_step_stats(trace.step_stats()) if trace is not None else CostModel()
+        terminalreporter.write_sep("-", "用例计划")
+        for line in plan.summary_lines(cost):
+            terminalreporter.write_line(line)
+    lines = get_launch_stats().report_lines()
+    if lines:
+        terminalreporter.write_sep("-", "冷启动耗时 p50/p95（ms）")
+        for line in lines:
+            terminalreporter.write_line(line)
+    lines = trace.summary_lines() if trace is not None else []
+    if lines:
+        terminalreporter.write_sep("-", f"步骤耗时 p50/p95（trace: {TRACE_FILE}）")
+        for line in lines:
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture(scope="session")
+def template_store(logger) -> TemplateStore:  # type: ignore[no-untyped-def]
+    """提供会话级参考模板缓存：参考图只解码一次，供所有图片断言共享。"""
+    store = get_template_store()
+    count = store.preload()
+    logger.info(f"参考模板已预加载: {count} 张, 占用 {store.nbytes / 1024:.0f} KB")
+    return store
+
+
+@pytest.fixture(scope="session")
+def phase_classifier(template_store) -> PhaseClassifier:  # type: ignore[no-untyped-def]
+    """提供会话级月相分类器：参考图特征矩阵只计算一次。"""
+    return PhaseClassifier(template_store)
+
+
+@pytest.fixture(scope="session")
+def golden_index(template_store, logger) -> GoldenIndex:  # type: ignore[no-untyped-def]
+    """提供会话级 golden 感知哈希索引：特征从 `.cache/golden_index.npz` 加载，仅变化的参考图重新计算。"""
+    index = get_golden_index()
+    logger.info(f"golden 索引已就绪: {len(index)} 张, 本次计算 {index.computed} 张")
+    return index
+
+
+CASE_FINGERPRINT_KEY = pytest.StashKey[str]()
+CASE_REPLAY_KEY = pytest.StashKey[CachedResult]()
+
+
+@pytest.fixture(autouse=True)
+def result_cache(request, config):  # type: ignore[no-untyped-def]
+    """`RESULT_CACHE=skip/replay` 时，带 `result_cache` 标记且指纹未变、上次通过的用例跳过或直接回放为通过。"""
+    marker = request.node.get_closest_marker("result_cache")
+    mode = config.values.result_cache
+    if marker is None or mode == "off" or "appium_driver" not in getattr(request, "fixturenames", ()):
+        yield None
+        return
+    cache = get_result_cache()
+    params = dict(getattr(getattr(request.node, "callspec", None), "params", {}))
+    references = [project_root() / ref.format(**params) for ref in marker.kwargs.get("references", ())]
+    fp = cache.case_fingerprint(
+        request.getfixturevalue("appium_driver"),
+        marker.kwargs["package"],
+        config.values.device_profile,
+        params,
+        references,
+    )
+    if fp is not None:
+        request.node.stash[CASE_FINGERPRINT_KEY] = fp
+        hit = cache.lookup(request.node.nodeid, fp)
+        if hit is not None and hit.passed:
+            if mode == "skip":
+                pytest.skip(f"结果缓存命中：应用与参考图未变，上次通过（{hit.duration:.1f}s）")
+            request.node.stash[CASE_REPLAY_KEY] = hit
+    yield fp
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):  # type: ignore[no-untyped-def]
+    """回放模式下命中缓存的用例不执行测试体，直接记为通过。"""
+    hit = pyfuncitem.stash.get(CASE_REPLAY_KEY, None)
+    if hit is None:
+        return None
+    pyfuncitem.user_properties.append(("result_cache", f"replayed {hit.fingerprint[:12]}"))
+    return True
+
+
 @pytest.hookimpl(hookwrapper=True, tryfirst=True)
 def pytest_runtest_makereport(item):  # type: ignore[no-untyped-def]
-    """在测试阶段结束时收集执行结果，用于失败后附件处理。"""
+    """在测试阶段结束时收集执行结果，用于失败后附件处理与结果缓存。"""
     outcome = yield
     rep = outcome.get_result()
     setattr(item, "rep_" + rep.when, rep)
+    fp = item.stash.get(CASE_FINGERPRINT_KEY, None)
+    if rep.when == "call" and fp is not None and CASE_REPLAY_KEY not in item.stash:
+        get_result_cache().record(item.nodeid, fp, rep.outcome, rep.duration)
+
+
+ARTIFACT_KEY = pytest.StashKey[ArtifactCollector]()
+
+
+@pytest.fixture(scope="session")
+def artifact_collector(request, config) -> Generator[ArtifactCollector, None, None]:  # type: ignore[no-untyped-def]
+    """提供会话级失败附件采集器，会话结束时等待后台写入完成。"""
+    collector = ArtifactCollector(
+        budget_bytes=config.values.artifact_budget_mb * MB,
+        image_format=config.values.artifact_format,
+    )
+    request.config.stash[ARTIFACT_KEY] = collector
+    yield collector
+    collector.close()
 
 
 @pytest.fixture(autouse=True)
 def attach_on_failure(request, logger):  # type: ignore[no-untyped-def]
-    """用例失败时自动附加截图与 page_source 到 Allure。
+    """用例失败时采集截图与 page_source，Allure 中附加指向去重文件的链接。
 
     注意：仅当测试显式依赖 appium_driver 时才尝试截图，避免为非 e2e 用例创建会话。
+    压缩与写盘在后台线程完成，不阻塞后续用例。
     """
     yield
     failed = request.node.rep_call.failed if hasattr(request.node, "rep_call") else False
@@ -74,12 +418,14 @@ def attach_on_failure(request, logger):  # type: ignore[no-untyped-def]
         return
     try:
         driver = request.getfixturevalue("appium_driver")
-        screenshot = driver.get_screenshot_as_png()
-        allure.attach(screenshot, name="screenshot", attachment_type=allure.attachment_type.PNG)
-        source = driver.page_source
-        allure.attach(source, name="page_source", attachment_type=allure.attachment_type.XML)
+        artifacts = request.getfixturevalue("artifact_collector").capture(driver)
+        allure.attach(
+            "\n".join(artifact.uri for artifact in artifacts),
+            name="failure_artifacts",
+            attachment_type=allure.attachment_type.URI_LIST,
+        )
     except Exception as exc:  # pylint: disable=broad-except
-        logger.error("失败附件采集异常: %s", exc)
+        logger.error(f"失败附件采集异常: {exc}")
 
 
 @pytest.fixture(scope="session")
@@ -89,9 +435,20 @@ def load_json(request):
         return json.load(f)
 
 
-@pytest.fixture
-def wait_for_element(appium_driver):
-    """等待元素真实可见、在视口内且位置稳定，并做好点击前准备后返回元素（不点击）。"""
+def element_waiter(appium_driver, adaptive_waiter, locator_cache):
+    """构建 `wait_for_element` 的等待函数（不依赖 pytest，基准测试可直接构建）。
+
+    等待元素真实可见、在视口内且位置稳定，并做好点击前准备后返回元素（不点击）。
+
+    轮询采用指数退避，位置稳定性通过连续读数比较判定，不再固定休眠。
+
+    默认使用快照模式：每次轮询只请求一次 page_source，可见、可用、在屏幕内与位置稳定都从快照判定，
+    就绪后再取一次 WebElement；快照无法等价求值的定位器（`UnsupportedLocator`）回退为逐项查询。
+    """
+
+    # 快照无法求值的定位器，此后直接走逐项查询，不再白取 page_source
+    live_only = set()
+    logger = setup_logger("tests")
 
     def _ensure_native_context():
         try:
@@ -100,17 +457,21 @@ def wait_for_element(appium_driver):
         except Exception:
             pass
 
+    def _offset_from_safe_zone(rect, win):
+        """元素中心在安全区域（屏幕高度 20%~80%）内返回 0，偏上为负、偏下为正。"""
+        cy = rect["y"] + rect["height"] // 2
+        if cy < int(win["height"] * 0.2):
+            return -1
+        return 1 if cy > int(win["height"] * 0.8) else 0
+
     def _center_in_view(el, locator, attempts=5):
         try:
-            win = appium_driver.get_window_size()
-            safe_top = int(win["height"] * 0.2)
-            safe_bottom = int(win["height"] * 0.8)
+            win = geometry_of(appium_driver).window_size
             for _ in range(attempts):
-                rect = el.rect
-                cy = rect["y"] + rect["height"] // 2
-                if safe_top <= cy <= safe_bottom:
-                    return
-                direction = "down" if cy < safe_top else "up"
+                offset = _offset_from_safe_zone(el.rect, win)
+                if offset == 0:
+                    return el
+                direction = "down" if offset < 0 else "up"
                 appium_driver.execute_script(
                     "mobile: scrollGesture",
                     {
@@ -123,9 +484,10 @@ def wait_for_element(appium_driver):
                     },
                 )
                 # 重新获取，避免 stale
-                el = appium_driver.find_element(*locator)
+                el = locator_cache.find(appium_driver, locator)
         except Exception:
             pass
+        return el
 
     def _hide_keyboard_if_shown():
         try:
@@ -133,7 +495,7 @@ def wait_for_element(appium_driver):
         except Exception:
             pass
 
-    def _wait(
+    def _wait_untraced(
         locator,
         timeout=15,
         poll=0.3,
@@ -141,39 +503,66 @@ def wait_for_element(appium_driver):
         stable_time=0.35,
         require_enabled=True,
         prepare_for_click=True,
+        snapshot=True,
     ):
         ignored = (NoSuchElementException, StaleElementReferenceException)
+        key = f"{locator[0]}={locator[1]}"
         _ensure_native_context()
 
-        def _ready(drv):
-            try:
-                el = drv.find_element(*locator)
+        def _ready_in_snapshot(last):
+            snap = PageSnapshot.parse(appium_driver.page_source)
+            geometry_of(appium_driver).observe_snapshot(snap.width, snap.height, snap.rotation)
+            node = snap.ready(locator, require_enabled)
+            # 连续两次快照中位置一致即视为稳定（动画结束）
+            stable = node is not None and last[0] == node.bounds
+            last[0] = node.bounds if node is not None else None
+            return node if stable else False
+
+        def _ready():
+            el = locator_cache.find(appium_driver, locator)
+            if pipeline_width(appium_driver) > 1:
+                # 可见、可用、位置三条只读命令并发发出
+                state = element_state(appium_driver, el)
+                if not state["displayed"] or (require_enabled and not state["enabled"]):
+                    return False
+                rect = state["rect"]
+            else:
                 if not el.is_displayed():
                     return False
                 if require_enabled and not el.is_enabled():
                     return False
                 rect = el.rect
-                size = drv.get_window_size()
-                in_screen = 0 <= rect["x"] < size["width"] and 0 <= rect["y"] < size["height"]
-                if not in_screen:
-                    return False
-                pos1 = el.location
-                time.sleep(stable_time)
-                pos2 = el.location
-                if pos1 != pos2:
-                    return False
-                return el
-            except ignored:
+            size = geometry_of(appium_driver).window_size
+            in_screen = 0 <= rect["x"] < size["width"] and 0 <= rect["y"] < size["height"]
+            if not in_screen:
                 return False
+            return el
+
+        def _until_stable():
+            """返回 (元素, 快照节点)；逐项查询时节点为 None。"""
+            if snapshot and key not in live_only:
+                last = [None]
+                try:
+                    node = adaptive_waiter.until(
+                        lambda: _ready_in_snapshot(last), key=key, timeout=timeout, ignored=ignored, max_interval=poll
+                    )
+                    return locator_cache.find(appium_driver, locator), node
+                except UnsupportedLocator as exc:
+                    logger.debug(f"快照不支持定位器，改为逐项查询: {key}: {exc}")
+                    live_only.add(key)
+            el = adaptive_waiter.until(_ready, key=key, timeout=timeout, ignored=ignored, max_interval=poll)
+            # 位置连续两次读数一致即视为稳定（动画结束）
+            adaptive_waiter.settle(lambda: el.location, key=key, timeout=stable_time * 4)
+            return el, None
 
         try:
-            el = WebDriverWait(appium_driver, timeout, poll_frequency=poll, ignored_exceptions=ignored).until(_ready)
+            el, node = _until_stable()
         except Exception:
             if not allow_scroll:
                 raise
             # 滚动一次再尝试
             try:
-                win = appium_driver.get_window_size()
+                win = geometry_of(appium_driver).window_size
                 appium_driver.execute_script(
                     "mobile: scrollGesture",
                     {
@@ -187,27 +576,33 @@ def wait_for_element(appium_driver):
                 )
             except Exception:
                 pass
-            el = WebDriverWait(appium_driver, timeout, poll_frequency=poll, ignored_exceptions=ignored).until(_ready)
+            el, node = _until_stable()
 
         # 点击前准备：置于安全区域、收起键盘、再次稳定检测
         if prepare_for_click:
             try:
-                _center_in_view(el, locator)
+                # 快照中已在安全区域时不必再读取位置
+                if node is None or _offset_from_safe_zone(node.rect, geometry_of(appium_driver).window_size):
+                    el = _center_in_view(el, locator)
                 _hide_keyboard_if_shown()
-                # 再次稳定校验
-                pos1 = el.location
-                time.sleep(stable_time)
-                pos2 = el.location
-                if pos1 != pos2:
-                    # 若仍在动画，额外等待一次
-                    time.sleep(stable_time)
+                adaptive_waiter.settle(lambda: el.location, key=key, timeout=stable_time * 4)
             except Exception:
                 pass
 
         return el
 
+    def _wait(locator, **kwargs):
+        with span("wait_for_element", locator=locator[1]):
+            return _wait_untraced(locator, **kwargs)
+
     return _wait
 
+
+@pytest.fixture
+def wait_for_element(appium_driver, adaptive_waiter, locator_cache):
+    """等待元素真实可见、在视口内且位置稳定，并做好点击前准备后返回元素（不点击）。"""
+    return element_waiter(appium_driver, adaptive_waiter, locator_cache)
+
     """杀死指定的应用包名（用于参数化测试）"""
     app_package = request.param
     logger.info(f"杀死应用: {app_package}")
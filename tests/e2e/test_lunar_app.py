@@ -1,30 +1,41 @@
 from __future__ import annotations
 import os
+from datetime import date
+from typing import TYPE_CHECKING
 import pytest
-import time
 
-from src.core import logger
 from src.page_objects.sample_page import SamplePage
 from src.core.logger import setup_logger
-from selenium.webdriver.common.by import By
-from tests.unit.image_tools import capture_element_image, test_element_image_match_cv
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import numpy as np
-import json
-from appium.webdriver.common.appiumby import AppiumBy
-from selenium.webdriver.remote.webelement import WebElement
-
-from appium.webdriver import Remote
+from tests.unit.golden_index import assert_golden_match
+from tests.unit.image_tools import capture_element_image
+from tests.unit.phase_classifier import describe
+from tests.unit.screenshot import element_png, get_screenshot_decoder
+from src.core.app_lifecycle import AppLauncher
+from src.core.geometry import geometry_of
+from src.core.dataset import load_dataset
+from src.core.date_control import AlarmShellBackend, DateController, RootShellBackend, UiDateBackend
+from src.core.lazy import lazy_import
+from src.core.tracing import span
+from src.core.waits import AdaptiveWaiter
 from selenium.common.exceptions import WebDriverException
 
+if TYPE_CHECKING:
+    from appium.webdriver import Remote
+    from selenium.webdriver.remote.webelement import WebElement
 
-import cv2
-import pdb
+# selenium/appium 的 webdriver 包在用例执行时才导入，`-m "not e2e"` 收集本文件时不加载
+AppiumBy = lazy_import("appium.webdriver.common.appiumby:AppiumBy")
+By = lazy_import("selenium.webdriver.common.by:By")
+WebDriverWait = lazy_import("selenium.webdriver.support.ui:WebDriverWait")
+EC = lazy_import("selenium.webdriver.support.expected_conditions")
 
 page = None
 logger = setup_logger()
 
+# 焦点/输入确认的等待上限，与被替换的固定休眠（0.3s/0.5s）相同，最坏情况不比原来慢
+FOCUS_BUDGET = 0.3
+TYPE_BUDGET = 0.5
+
 
 @pytest.fixture(scope="module")
 def sample_page(appium_driver):
@@ -68,122 +79,105 @@ def test_get_element_presence(appium_driver):
     except Exception as e:
         logger.info(f"Home element is not present: {e}")
     el = page.find((By.XPATH, "(//android.view.View[@resource-id])[1]"))
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    screenshot_dir = os.path.join(base_dir, "screenshots")
-    os.makedirs(screenshot_dir, exist_ok=True)
-    screenshot_path = os.path.join(screenshot_dir, "screenshot.png")
-    png_data = el.screenshot_as_png
-    with open(screenshot_path, "wb") as f:
-        f.write(png_data)
-    image = cv2.imread(screenshot_path)
-
-    cv2.imshow("PNG Image from File", image)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
-    pdb.set_trace()
+    # 元素截图在内存中解码，不再落盘后读回
+    image = get_screenshot_decoder().decode(el.screenshot_as_base64, gray=False)
+    assert image.size > 0, "元素截图解码失败"
     image = capture_element_image(el)
-    if image is not None:
-        cv2.imshow("PNG Image from File", image)
-        pdb.set_trace()
-    else:
+    if image is None:
         logger.info("图片不存在")
+    else:
+        assert image.shape[0] > 0 and image.shape[1] > 0, "元素裁剪结果为空"
 
 
-data_file = os.path.join(os.path.dirname(__file__), "..", "src", "test_data", "data.json")
-
-
-def _load_lunar_cases():
-    data_file = os.path.join(os.path.dirname(__file__), "..", "..", "src", "test_data", "data.json")
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    cases = []
-    for item in data["lunar phase"]:
-        for date_str, lunar_phase in item.items():
-            cases.append((date_str, lunar_phase))
-    return cases
-
-
-def _load_birth_chart_cases():
-    data_file = os.path.join(os.path.dirname(__file__), "..", "..", "src", "test_data", "data.json")
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    cases = []
-    for item in data["birth_chart"]:
-        cases.append(item)
-    return cases
+# 数据文件每个进程只解析一次，内容未变时直接读取 .cache/test_data 下的缓存副本
+TEST_DATA = load_dataset()
+BIRTH_CHART_CASES = list(TEST_DATA.birth_charts)
 
 
-LUNAR_CASES = _load_lunar_cases()
-BIRTH_CHART_CASES = _load_birth_chart_cases()
+def _lunar_params():
+    """月相用例；期望值与天文推算的核对在选定用例后由 conftest 的 `pytest_collection_finish` 完成（LUNAR_ORACLE）。"""
+    return [pytest.param(case.date, case.phase, id=case.id) for case in TEST_DATA.lunar]
 
 
-def cold_launch(appium_driver: Remote, package: str, activity: str):
-    # 1) 强杀，确保进程退出
-    try:
-        appium_driver.terminate_app(package)
-    except Exception:
-        try:
-            appium_driver.execute_script("mobile: shell", {"command": "am", "args": ["force-stop", package]})
-        except Exception:
-            pass
+LUNAR_CASES = _lunar_params()
 
-    # 2) 冷启动：用 component + MAIN/LAUNCHER + NEW_TASK|CLEAR_TASK
-    try:
-        appium_driver.execute_script(
-            "mobile: startActivity",
-            {
-                "component": f"{package}/{activity}",
-                "intentAction": "android.intent.action.MAIN",
-                "intentCategory": "android.intent.category.LAUNCHER",
-                "intentFlags": 0x10000000 | 0x00008000,  # FLAG_ACTIVITY_NEW_TASK | FLAG_ACTIVITY_CLEAR_TASK
-            },
-        )
-    except WebDriverException:
-        # 3) 兜底：直接调用 ADB am start -S
-        appium_driver.execute_script(
-            "mobile: shell",
-            {"command": "am", "args": ["start", "-S", "-W", "-n", f"{package}/{activity}"]},
-        )
+LUNAR_PACKAGE = "com.ost.lunight"
+LUNAR_ACTIVITY = "io.dcloud.PandoraEntry"
 
 
-def get_lunar_app_moon_image(appium_driver: Remote, lunar_phase: str, save_path: bool = False):
+def get_lunar_app_moon_image(
+    appium_driver: Remote, lunar_phase: str, save_path: bool = False, waiter: AdaptiveWaiter | None = None
+):
+    waiter = waiter or AdaptiveWaiter(stats_file=None)
     logger.info("开始截取图片（冷启动）")
-    cold_launch(appium_driver, "com.ost.lunight", "io.dcloud.PandoraEntry")
-    appium_driver.wait_activity("io.dcloud.PandoraEntry", timeout=10, interval=1)
+    launcher = AppLauncher(appium_driver, LUNAR_PACKAGE, LUNAR_ACTIVITY)
+    launched = launcher.cold_launch()
+    geometry = geometry_of(appium_driver)
+    # am start -W 已确认 Activity 显示时不再轮询，否则每 0.2s 检查一次前台 Activity
+    launcher.wait_ready(launched, waiter=waiter, observe=geometry.observe_activity)
 
     def middle_click():
         logger.info("点击屏幕中间区域")
-        size = appium_driver.get_window_size()
+        size = geometry.window_size
         width = size["width"]
         height = size["height"]
         appium_driver.tap([(width * 0.1, height * 0.1)], 1)
 
     middle_click()
-    time.sleep(0.5)
     el = page.find((By.XPATH, "(//android.view.View[@resource-id])[1]"))
+    # 月相图渲染完成（尺寸/位置不再变化）后再截图
+    waiter.settle(lambda: el.rect, key="moon-image", timeout=2)
     base_dir = os.path.dirname(os.path.abspath(__file__))
     screenshot_dir = os.path.join(base_dir, "..", "..", "src", "image_to_match")
     os.makedirs(screenshot_dir, exist_ok=True)
     screenshot_path = os.path.join(screenshot_dir, f"{lunar_phase}.png")
+    with span("app.screenshot"):
+        # base64 直接解码进复用缓冲区（下一次截图时覆盖），匹配前不再额外拷贝
+        png = element_png(el)
     if save_path:
         with open(screenshot_path, "wb") as f:
-            f.write(el.screenshot_as_png)
+            f.write(png)
             logger.info(f"保存图片到{screenshot_path}")
     else:
-        return el.screenshot_as_png
+        return png
 
 
-@pytest.mark.e2e
-@pytest.mark.parametrize("date_str,lunar_phase", LUNAR_CASES)
-def test_lunar_phase(appium_driver: Remote, wait_for_element, date_str, lunar_phase):
-    logger.info(f"测试日期: {date_str}, 月相: {lunar_phase}")
-    year, month, day = date_str.split("-")
+def set_date_via_settings(appium_driver: Remote, wait_for_element, adaptive_waiter: AdaptiveWaiter, target: date):
+    """通过系统设置页 UI 逐步输入年月日（日期控制的兜底后端）。"""
+    year, month, day = target.isoformat().split("-")
+
+    def wait_focused(el, key):
+        """等待输入框获得焦点，替代固定休眠；最多等待原休眠时长，仍未获得焦点时告警后继续。"""
+        focused = adaptive_waiter.until(
+            lambda: el.get_attribute("focused") == "true",
+            key=f"focus:{key}",
+            timeout=FOCUS_BUDGET,
+            ignored=(WebDriverException,),
+            default=False,
+        )
+        if not focused:
+            logger.warning(f"{key}输入框 {FOCUS_BUDGET}s 内未获得焦点，继续输入")
+
+    def wait_typed(el, text, key):
+        """等待输入内容出现在控件文本中，替代固定休眠；最多等待原休眠时长，未出现时告警后继续。"""
+        typed = adaptive_waiter.until(
+            lambda: text in (el.text or ""),
+            key=f"typed:{key}",
+            timeout=TYPE_BUDGET,
+            ignored=(WebDriverException,),
+            default=False,
+        )
+        if not typed:
+            logger.warning(f"{key} {TYPE_BUDGET}s 内未确认输入 {text!r}，控件文本: {el.text!r}")
+
     appium_driver.execute_script("mobile: startActivity", {"component": "com.android.settings/.Settings"})
-    time.sleep(1)
     el_setting_time_locator = (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("设置日期").instance(0)')
     try:
-        el = WebDriverWait(appium_driver, 10, poll_frequency=0.5).until(
-            EC.presence_of_element_located(el_setting_time_locator)
+        el = adaptive_waiter.until(
+            lambda: appium_driver.find_element(*el_setting_time_locator),
+            key="settings:设置日期",
+            timeout=10,
+            ignored=(WebDriverException,),
         )
         if el is not None:
             logger.info("设置日期已存在，无需进行搜索")
@@ -204,7 +198,6 @@ def test_lunar_phase(appium_driver: Remote, wait_for_element, date_str, lunar_ph
         logger.info("点击设置时间")
         el_time_settings = (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("设置日期")')
         el = wait_for_element(el_time_settings)
-        time.sleep(1)
         el.click()
     # 将日期作为系统时间
 
@@ -225,12 +218,12 @@ def test_lunar_phase(appium_driver: Remote, wait_for_element, date_str, lunar_ph
     el_year_input = (AppiumBy.ANDROID_UIAUTOMATOR, r'new UiSelector().textMatches("(\d{4}.*?年|, 年)")')
     el = wait_for_element(el_year_input)
     el.click()
-    time.sleep(0.3)  # 等待焦点稳定
+    wait_focused(el, "年份")  # 等待焦点稳定
 
     # 使用 UiAutomator2 的原生输入
     appium_driver.execute_script("mobile: type", {"text": str(year)})
     logger.info(f"UiAutomator2 type 输入年份成功: {year}")
-    time.sleep(0.5)  # 等待输入完成
+    wait_typed(el, str(year), "年份")  # 等待输入完成
 
     # 通用的日期输入函数
     def input_date_field(field_name, field_value, field_pattern):
@@ -241,12 +234,12 @@ def test_lunar_phase(appium_driver: Remote, wait_for_element, date_str, lunar_ph
             el = wait_for_element(el_field, timeout=5)
             el.click()
             logger.info(f"点击{field_name}输入框")
-            time.sleep(0.3)
+            wait_focused(el, field_name)
             el.clear()
             logger.info(f"清空{field_name}")
             appium_driver.execute_script("mobile: type", {"text": str(field_value)})
             logger.info(f"UiAutomator2 type 输入{field_name}成功: {field_value}")
-            time.sleep(0.5)
+            wait_typed(el, str(field_value), field_name)
         except Exception as e:
             logger.warning(f"{field_name}输入失败: {e}")
 
@@ -275,15 +268,47 @@ def test_lunar_phase(appium_driver: Remote, wait_for_element, date_str, lunar_ph
         except Exception as e1:
             logger.error(f"所有完成按钮都无法点击: {e1}")
 
+
+@pytest.fixture(scope="module")
+def date_backends():
+    """shell 类日期后端在模块内复用，探测结果只取一次。"""
+    return [AlarmShellBackend(), RootShellBackend()]
+
+
+@pytest.fixture
+def date_controller(appium_driver: Remote, wait_for_element, adaptive_waiter: AdaptiveWaiter, date_backends):
+    """按设备能力选择最快的日期后端，设置页 UI 作为兜底。"""
+    ui = UiDateBackend(lambda drv, target: set_date_via_settings(drv, wait_for_element, adaptive_waiter, target))
+    return DateController(appium_driver, [*date_backends, ui])
+
+
+@pytest.mark.e2e
+@pytest.mark.result_cache(package="com.ost.lunight", references=["src/image_to_match/{lunar_phase}.png"])
+@pytest.mark.parametrize("date_str,lunar_phase", LUNAR_CASES)
+def test_lunar_phase(
+    appium_driver: Remote,
+    date_controller: DateController,
+    adaptive_waiter: AdaptiveWaiter,
+    golden_index,
+    phase_classifier,
+    date_str,
+    lunar_phase,
+):
+    logger.info(f"测试日期: {date_str}, 月相: {lunar_phase}")
+    backend = date_controller.set_date(date_str)
+    logger.info(f"系统日期已设置: {date_str}（{backend}）")
+
     # 调用截取图片函数
-    lunar_bytes = get_lunar_app_moon_image(appium_driver, lunar_phase, save_path=False)
-    expected_img = os.path.join(os.path.dirname(__file__), "..", "..", "src", "image_to_match", f"{lunar_phase}.png")
+    lunar_bytes = get_lunar_app_moon_image(appium_driver, lunar_phase, save_path=False, waiter=adaptive_waiter)
     logger.info(f"对比月相: {lunar_phase}")
     try:
-        test_element_image_match_cv(lunar_bytes, expected_img)
+        # 感知哈希结论明确时不做模板匹配；距离模糊（如新月/蛾眉月）时才回退 matchTemplate
+        result = assert_golden_match(lunar_bytes, lunar_phase, index=golden_index)
+        logger.info(f"月相比对通过（{result.method}，哈希距离 {result.distance}）")
     except Exception as e:
-        logger.error(f"月相对比失败: {e}")
-        pytest.fail(f"月相对比失败: {e}")
+        ranking = describe(phase_classifier.classify(lunar_bytes))
+        logger.error(f"月相对比失败: {e}; 实际最接近: {ranking}")
+        pytest.fail(f"月相对比失败: {e}; 实际最接近: {ranking}")
 
 
 @pytest.mark.e2e
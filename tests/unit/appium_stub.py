@@ -0,0 +1,126 @@
+"""本地 Appium 桩服务
+
+在本机随机端口上模拟 Appium 服务端点，供单元测试离线验证网络相关逻辑。
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Set, Tuple, TypeVar
+
+_S = TypeVar("_S", bound="AppiumStub")
+
+
+class AppiumStub:
+    """可作为上下文管理器使用的 Appium 桩服务。
+
+    - `ready`：`/status` 返回的就绪状态
+    - `requests`：按顺序记录 (方法, 路径)
+    - `sessions`：存活会话 {sessionId: capabilities}，`kill()` 可模拟会话中途失效
+    - `connections`：出现过的客户端地址，用于验证 keep-alive 连接复用
+    - `peak`：同时处理中的请求数峰值，用于验证命令并发发出（不依赖墙钟耗时）
+    """
+
+    def __init__(self, ready: bool = True) -> None:
+        self.ready = ready
+        self.requests: List[Tuple[str, str]] = []
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.created = 0
+        self.connections: Set[Tuple[str, int]] = set()
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self: _S) -> _S:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def kill(self, session_id: str) -> None:
+        """模拟会话在服务端失效（如 UiAutomator2 崩溃）。"""
+        self.sessions.pop(session_id, None)
+
+    def route(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """按请求返回 (状态码, JSON 响应)。"""
+        if method == "GET" and path == "/status":
+            return 200, {"value": {"ready": self.ready, "message": "stub"}}
+        if method == "POST" and path == "/session":
+            session_id = uuid.uuid4().hex
+            caps = body.get("capabilities", {}).get("alwaysMatch", {})
+            self.sessions[session_id] = caps
+            self.created += 1
+            return 200, {"value": {"sessionId": session_id, "capabilities": caps}}
+        parts = path.strip("/").split("/")
+        if len(parts) >= 2 and parts[0] == "session":
+            session_id, command = parts[1], "/".join(parts[2:])
+            if session_id not in self.sessions:
+                return 404, {"value": {"error": "invalid session id", "message": f"会话不存在: {session_id}"}}
+            if method == "DELETE" and not command:
+                self.sessions.pop(session_id, None)
+                return 200, {"value": None}
+            return self.session_command(method, session_id, command, body)
+        return 404, {"value": {"error": "unknown command", "message": path}}
+
+    def session_command(
+        self, method: str, session_id: str, command: str, body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """会话内命令的默认响应，子类可覆盖以模拟更多端点。"""
+        if method == "GET" and command == "timeouts":
+            return 200, {"value": {"implicit": 0, "pageLoad": 300000, "script": 30000}}
+        if method == "GET" and command == "window/rect":
+            return 200, {"value": {"x": 0, "y": 0, "width": 1080, "height": 2340}}
+        return 404, {"value": {"error": "unknown command", "message": command}}
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self, method: str) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw.decode("utf-8")) if raw else {}
+                stub.requests.append((method, self.path))
+                stub.connections.add(self.client_address[:2])
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                try:
+                    status, payload = stub.route(method, self.path, body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:  # noqa: N802
+                self._dispatch("GET")
+
+            def do_POST(self) -> None:  # noqa: N802
+                self._dispatch("POST")
+
+            def do_DELETE(self) -> None:  # noqa: N802
+                self._dispatch("DELETE")
+
+            def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+                return
+
+        return Handler
@@ -0,0 +1,113 @@
+"""单元测试用的假驱动
+
+只实现被测代码用到的少量 WebDriver 接口，记录收到的每条命令，供断言往返次数。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+
+class FakeElement:
+    """只带 id 与 rect 的假元素，始终可见、可用。"""
+
+    def __init__(self, element_id: str, rect: Optional[Dict[str, int]] = None) -> None:
+        self.id = element_id
+        self.rect = rect or {"x": 0, "y": 0, "width": 100, "height": 100}
+
+    @property
+    def location(self) -> Dict[str, int]:
+        return {"x": self.rect["x"], "y": self.rect["y"]}
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        return True
+
+
+class FakeDriver:
+    """记录命令的假驱动。
+
+    - `commands`：按顺序记录 (命令名, 参数)
+    - `shell_handler`：模拟 `mobile: shell` 输出，传入命令字符串，返回输出或抛出异常
+    - `elements`：{(策略, 值): 元素或异常}，未登记的定位器抛出 NoSuchElementException
+    - `page_sources`：依次返回的 page_source，取到最后一个后保持不变
+    """
+
+    def __init__(
+        self,
+        capabilities: Optional[Dict[str, Any]] = None,
+        shell_handler: Optional[Callable[[str], str]] = None,
+        window_size: Tuple[int, int] = (1080, 2340),
+    ) -> None:
+        self.capabilities = capabilities or {"udid": "emulator-5554"}
+        self.commands: List[Tuple[str, Any]] = []
+        self.shell_handler = shell_handler
+        self.window = {"width": window_size[0], "height": window_size[1]}
+        self.elements: Dict[Tuple[str, str], Any] = {}
+        self.page_sources: List[str] = []
+        self.activity = ".MainActivity"
+        self._orientation = "PORTRAIT"
+
+    def count(self, name: str) -> int:
+        return sum(1 for cmd, _ in self.commands if cmd == name)
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        params = args[0] if args else {}
+        self.commands.append((script, params))
+        if script == "mobile: shell":
+            if self.shell_handler is None:
+                raise WebDriverException("Potentially insecure feature 'adb_shell' has not been enabled")
+            return self.shell_handler(params.get("command", ""))
+        return None
+
+    def terminate_app(self, package: str) -> bool:
+        self.commands.append(("terminateApp", package))
+        return True
+
+    def activate_app(self, package: str) -> None:
+        self.commands.append(("activateApp", package))
+
+    def get_window_size(self) -> Dict[str, int]:
+        self.commands.append(("getWindowSize", None))
+        return dict(self.window)
+
+    @property
+    def current_activity(self) -> str:
+        self.commands.append(("getCurrentActivity", None))
+        return self.activity
+
+    @property
+    def orientation(self) -> str:
+        self.commands.append(("getOrientation", None))
+        return self._orientation
+
+    @orientation.setter
+    def orientation(self, value: str) -> None:
+        self.commands.append(("setOrientation", value))
+        self._orientation = value
+        if (value == "LANDSCAPE") != (self.window["width"] > self.window["height"]):
+            self.window = {"width": self.window["height"], "height": self.window["width"]}
+
+    def get_display_density(self) -> int:
+        self.commands.append(("getDisplayDensity", None))
+        return 440
+
+    @property
+    def page_source(self) -> str:
+        self.commands.append(("getPageSource", None))
+        if len(self.page_sources) > 1:
+            return self.page_sources.pop(0)
+        return self.page_sources[0]
+
+    def find_element(self, by: str, value: str) -> Any:
+        self.commands.append(("findElement", (by, value)))
+        found = self.elements.get((by, value))
+        if found is None:
+            raise NoSuchElementException(f"{by}={value}")
+        if isinstance(found, Exception):
+            raise found
+        return found
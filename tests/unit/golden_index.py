@@ -0,0 +1,359 @@
+"""Golden 图片索引
+
+职责：
+- 为 `src/image_to_match/` 及后续登记的 golden 目录中的每张图计算 aHash/dHash/pHash（各 64 位）与 16x16 小嵌入
+- 索引以 `.npz` 落盘（`.cache/golden_index.npz`），按文件 mtime/size 增量更新，内容哈希未变时沿用已算特征
+- “最接近的 golden”查询只做一次异或 + 查表计数，结论明确时不再做模板匹配；
+  距离落在模糊区间（最近与次近相差不足 `margin`，或最近距离超过 `accept`）时回退到 `PyramidMatcher`
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from src.core.lazy import lazy_import
+from tests.unit.image_tools import decode_gray
+from tests.unit.match_engine import DEFAULT_THRESHOLD, PyramidMatcher, get_matcher
+from tests.unit.template_store import DEFAULT_TEMPLATE_DIR, TemplateStore, get_template_store
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+else:
+    cv2 = lazy_import("cv2")
+    np = lazy_import("numpy")
+
+DEFAULT_INDEX_FILE = Path(__file__).resolve().parents[2] / ".cache" / "golden_index.npz"
+INDEX_VERSION = 1
+HASHES = ("ahash", "dhash", "phash")
+EMBED_SIZE = 16
+PRESHRINK = 256
+# 三种哈希的汉明距离之和（0~192）：不超过 ACCEPT 且领先次近 MARGIN 以上时直接下结论，
+# 超过 REJECT 视为与所有 golden 都不像
+DEFAULT_ACCEPT = 12
+DEFAULT_MARGIN = 8
+DEFAULT_REJECT = 48
+DEFAULT_TOP_K = 3
+
+ImageInput = Union[bytes, bytearray, memoryview, str, "np.ndarray"]
+
+
+@dataclass(frozen=True)
+class GoldenMatch:
+    """一次查询的结论。
+
+    - `name`：最接近（或模板匹配确认）的 golden，全部距离过大时为 None
+    - `method`：``"hash"`` 表示仅凭哈希得出结论，``"template"`` 表示回退了模板匹配
+    - `candidates`：哈希距离模糊、需要模板匹配确认的 golden（结论明确时为空）
+    """
+
+    name: Optional[str]
+    distance: int
+    similarity: float
+    method: str
+    candidates: Tuple[str, ...] = ()
+    score: Optional[float] = None
+    elapsed: float = 0.0
+
+    @property
+    def ambiguous(self) -> bool:
+        """哈希距离不足以单独下结论。"""
+        return bool(self.candidates)
+
+
+class GoldenIndex:
+    """感知哈希 golden 索引。
+
+    特征矩阵常驻内存（每张图 3 个 uint64 + 256 维 float16），查询耗时与图片数量几乎无关。
+    回退模板匹配时参考图经 `TemplateStore` 获取，与 `test_element_image_match_cv` 共用解码缓存。
+    """
+
+    def __init__(
+        self,
+        roots: Sequence[Union[str, Path]] = (DEFAULT_TEMPLATE_DIR,),
+        index_file: Optional[Path] = DEFAULT_INDEX_FILE,
+        store: Optional[TemplateStore] = None,
+        matcher: Optional[PyramidMatcher] = None,
+        accept: int = DEFAULT_ACCEPT,
+        margin: int = DEFAULT_MARGIN,
+        reject: int = DEFAULT_REJECT,
+        top_k: int = DEFAULT_TOP_K,
+    ) -> None:
+        if not 0 <= accept <= reject:
+            raise ValueError(f"需要 0 <= accept <= reject: accept={accept}, reject={reject}")
+        self.roots = [Path(root).resolve() for root in roots]
+        self.index_file = index_file
+        self.store = store or get_template_store()
+        self.matcher = matcher
+        self.accept = accept
+        self.margin = margin
+        self.reject = reject
+        self.top_k = top_k
+        self.names: List[str] = []
+        self.paths: List[Path] = []
+        self.hashes = np.zeros((0, len(HASHES)), dtype=np.uint64)
+        self.embeddings = np.zeros((0, EMBED_SIZE * EMBED_SIZE), dtype=np.float16)
+        self._embeddings32 = np.zeros((0, EMBED_SIZE * EMBED_SIZE), dtype=np.float32)
+        self.computed = 0
+        self._rows: Dict[Path, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self.refresh()
+
+    def add_root(self, root: Union[str, Path]) -> int:
+        """登记新的 golden 目录并增量更新索引，返回本次计算特征的图片数。"""
+        path = Path(root).resolve()
+        if path not in self.roots:
+            self.roots.append(path)
+        return self.refresh()
+
+    def refresh(self) -> int:
+        """对照磁盘更新索引：新增或内容变化的图片重新计算，删除的图片移出；有变化时写回索引文件。"""
+        with self._lock:
+            computed = 0
+            rows: Dict[Path, Dict[str, Any]] = {}
+            for path in self._scan():
+                stat = path.stat()
+                row = self._rows.get(path)
+                if row is None or row["mtime_ns"] != stat.st_mtime_ns or row["size"] != stat.st_size:
+                    entry = self.store.entry(path)
+                    if row is None or row["digest"] != entry.digest:
+                        hashes, embedding = features(entry.image)
+                        row = {"digest": entry.digest, "hashes": hashes, "embedding": embedding}
+                        computed += 1
+                    row = dict(row, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                rows[path] = row
+            changed = (
+                computed > 0
+                or rows.keys() != self._rows.keys()
+                or any(rows[p]["mtime_ns"] != self._rows[p]["mtime_ns"] for p in rows)
+            )
+            self._rows = rows
+            self._rebuild()
+            if changed:
+                self._save()
+            self.computed += computed
+            return computed
+
+    def nearest(self, image: ImageInput) -> GoldenMatch:
+        """仅凭哈希查找最接近的 golden，不做模板匹配。"""
+        start = time.perf_counter()
+        gray = decode_gray(image)
+        hashes, embedding = features(gray)
+        return self._rank(hashes, embedding, start)
+
+    def resolve(self, image: ImageInput) -> GoldenMatch:
+        """查找最接近的 golden；哈希距离模糊时对候选逐个模板匹配，取分数最高者（均未过阈值时 `name` 为 None）。"""
+        start = time.perf_counter()
+        gray = decode_gray(image)
+        hit = self._rank(*features(gray), start)
+        if not hit.ambiguous:
+            return hit
+        scores = {name: self._template_score(gray, name) for name in hit.candidates}
+        best = max(scores, key=scores.__getitem__)
+        name = best if scores[best] > DEFAULT_THRESHOLD else None
+        return self._replace(hit, name=name, method="template", score=scores[best], start=start)
+
+    def verify(self, image: ImageInput, expected: str) -> GoldenMatch:
+        """判断截图是否为 `expected`，返回结果的 `name == expected` 即为通过。
+
+        哈希明确指向某个 golden 时直接返回；模糊或与所有 golden 都不像（如截图含背景）时只与 `expected` 做一次模板匹配。
+        """
+        if expected not in self.names:
+            raise KeyError(f"未登记的 golden: {expected}")
+        start = time.perf_counter()
+        gray = decode_gray(image)
+        hit = self._rank(*features(gray), start)
+        if hit.name is not None and not hit.ambiguous:
+            return hit
+        score = self._template_score(gray, expected)
+        if score > DEFAULT_THRESHOLD:
+            return self._replace(hit, name=expected, method="template", score=score, start=start)
+        others = [name for name in hit.candidates if name != expected]
+        return self._replace(hit, name=others[0] if others else None, method="template", score=score, start=start)
+
+    def distances(self, image: ImageInput) -> Dict[str, Tuple[int, ...]]:
+        """返回 {golden: (aHash, dHash, pHash) 汉明距离}，便于调参与失败诊断。"""
+        hashes, _ = features(decode_gray(image))
+        per_hash = _hamming(self.hashes, hashes)
+        return {name: tuple(int(d) for d in per_hash[i]) for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.names
+
+    def _rank(self, hashes: np.ndarray, embedding: np.ndarray, start: float) -> GoldenMatch:
+        if not self.names:
+            raise ValueError("golden 索引为空")
+        distance = _hamming(self.hashes, hashes).sum(axis=1)
+        similarity = self._embeddings32 @ embedding.astype(np.float32)
+        order = np.lexsort((-similarity, distance))
+        best = int(order[0])
+        best_distance = int(distance[best])
+        if best_distance > self.reject:
+            elapsed = time.perf_counter() - start
+            return GoldenMatch(None, best_distance, float(similarity[best]), "hash", elapsed=elapsed)
+        close = tuple(self.names[i] for i in order[: self.top_k] if distance[i] - best_distance < self.margin)
+        decided = best_distance <= self.accept and len(close) == 1
+        return GoldenMatch(
+            name=self.names[best],
+            distance=best_distance,
+            similarity=float(similarity[best]),
+            method="hash",
+            candidates=() if decided else close,
+            elapsed=time.perf_counter() - start,
+        )
+
+    def _template_score(self, gray: np.ndarray, name: str) -> float:
+        template = self.store.get(self.paths[self.names.index(name)])
+        return (self.matcher or get_matcher()).match(gray, template).score
+
+    @staticmethod
+    def _replace(hit: GoldenMatch, name: Optional[str], method: str, score: float, start: float) -> GoldenMatch:
+        return GoldenMatch(
+            name=name,
+            distance=hit.distance,
+            similarity=hit.similarity,
+            method=method,
+            candidates=hit.candidates,
+            score=score,
+            elapsed=time.perf_counter() - start,
+        )
+
+    def _scan(self) -> Iterator[Path]:
+        seen: Dict[str, Path] = {}
+        for root in self.roots:
+            for path in sorted(root.glob("*.png")):
+                if path.stem in seen:
+                    raise ValueError(f"golden 名称重复: {seen[path.stem]} 与 {path}")
+                seen[path.stem] = path
+                yield path
+
+    def _rebuild(self) -> None:
+        paths = list(self._rows)
+        self.paths = paths
+        self.names = [p.stem for p in paths]
+        rows = [self._rows[p] for p in paths]
+        self.hashes = np.array([r["hashes"] for r in rows], dtype=np.uint64).reshape(-1, len(HASHES))
+        self.embeddings = np.array([r["embedding"] for r in rows], dtype=np.float16).reshape(-1, EMBED_SIZE**2)
+        self.hashes.flags.writeable = False
+        self.embeddings.flags.writeable = False
+        self._embeddings32 = self.embeddings.astype(np.float32)
+
+    def _load(self) -> None:
+        if self.index_file is None or not self.index_file.exists():
+            return
+        try:
+            with np.load(self.index_file, allow_pickle=False) as data:
+                if int(data["version"]) != INDEX_VERSION:
+                    return
+                # NpzFile 每次取键都会重新读取数组，先各取一次
+                paths, digests, mtimes, sizes = data["paths"], data["digests"], data["mtime_ns"], data["sizes"]
+                hashes, embeddings = data["hashes"], data["embeddings"]
+                self._rows = {
+                    Path(paths[i]): {
+                        "digest": str(digests[i]),
+                        "mtime_ns": int(mtimes[i]),
+                        "size": int(sizes[i]),
+                        "hashes": hashes[i],
+                        "embedding": embeddings[i],
+                    }
+                    for i in range(len(paths))
+                }
+        except (OSError, KeyError, ValueError):
+            # 索引损坏或格式不符时整体重建
+            self._rows = {}
+
+    def _save(self) -> None:
+        if self.index_file is None:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        rows = [self._rows[p] for p in self.paths]
+        tmp = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp,
+            version=np.array(INDEX_VERSION),
+            paths=np.array([str(p) for p in self.paths], dtype=str),
+            digests=np.array([r["digest"] for r in rows], dtype=str),
+            mtime_ns=np.array([r["mtime_ns"] for r in rows], dtype=np.int64),
+            sizes=np.array([r["size"] for r in rows], dtype=np.int64),
+            hashes=self.hashes,
+            embeddings=self.embeddings,
+        )
+        os.replace(tmp, self.index_file)
+
+
+def features(gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """计算 (aHash, dHash, pHash) 与 16x16 零均值单位范数嵌入；原图只缩放一次到 32x32，其余均由它派生。"""
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGRA2GRAY if gray.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    if min(gray.shape[:2]) > PRESHRINK:
+        # 非整数倍的 INTER_AREA 在大图上很慢：先线性缩到 32 的整数倍，再做整数倍区域平均
+        gray = cv2.resize(gray, (PRESHRINK, PRESHRINK), interpolation=cv2.INTER_LINEAR)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    mean8 = cv2.resize(small, (8, 8), interpolation=cv2.INTER_AREA)
+    wide = cv2.resize(small, (9, 8), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small)[:8, :8]
+    hashes = np.array(
+        [
+            _pack(mean8 > mean8.mean()),
+            _pack(wide[:, 1:] > wide[:, :-1]),
+            # pHash：低频 DCT 系数与其中位数（不含直流分量）比较
+            _pack(low > np.median(low.ravel()[1:])),
+        ],
+        dtype=np.uint64,
+    )
+    embed = cv2.resize(small, (EMBED_SIZE, EMBED_SIZE), interpolation=cv2.INTER_AREA).ravel()
+    embed -= embed.mean()
+    norm = float(np.linalg.norm(embed))
+    return hashes, (embed / norm if norm > 0 else embed).astype(np.float16)
+
+
+def _pack(bits: np.ndarray) -> int:
+    return int(np.packbits(bits.ravel()).view(">u8")[0])
+
+
+_POPCOUNT: Optional[np.ndarray] = None
+
+
+def _hamming(matrix: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """逐个 golden、逐种哈希的汉明距离，形状 (golden 数, 3)。"""
+    global _POPCOUNT  # pylint: disable=global-statement
+    if _POPCOUNT is None:
+        _POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+    xor = np.bitwise_xor(matrix, hashes[None, :])
+    bits = _POPCOUNT[xor.view(np.uint8)].reshape(len(matrix), len(HASHES), 8)
+    distances: np.ndarray = bits.sum(axis=2, dtype=np.int32)
+    return distances
+
+
+_DEFAULT_INDEX: Optional[GoldenIndex] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_golden_index(**kwargs: Any) -> GoldenIndex:
+    """获取进程内共享的默认 golden 索引；传入参数时返回独立实例。"""
+    global _DEFAULT_INDEX  # pylint: disable=global-statement
+    if kwargs:
+        return GoldenIndex(**kwargs)
+    with _DEFAULT_LOCK:
+        if _DEFAULT_INDEX is None:
+            _DEFAULT_INDEX = GoldenIndex()
+        return _DEFAULT_INDEX
+
+
+def assert_golden_match(image: ImageInput, expected: str, index: Optional[GoldenIndex] = None) -> GoldenMatch:
+    """断言截图为 `expected` 对应的 golden；失败信息包含实际最接近的 golden 与判定方式。"""
+    result = (index or get_golden_index()).verify(image, expected)
+    assert result.name == expected, (
+        f"golden 比对失败: 预期 {expected}, 实际最接近 {result.name}"
+        f"（距离 {result.distance}, 判定 {result.method}, 模板分数 {result.score}）"
+    )
+    return result
@@ -1,55 +1,92 @@
 """捕获元素截图"""
 
-from selenium.webdriver.remote.webelement import WebElement
-import cv2
-import numpy as np
-from typing import Any, Union
-from pathlib import Path
+from __future__ import annotations
+
 import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Union
+
+from src.core.lazy import lazy_import
+from src.core.tracing import span, traced
+from tests.unit.match_engine import DEFAULT_THRESHOLD, MatchResult, PyramidMatcher, get_matcher
+from tests.unit.screenshot import crop, get_screenshot_decoder, screen_image
+from tests.unit.template_store import TemplateStore, get_template_store
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+    from selenium.webdriver.remote.webelement import WebElement
+else:
+    cv2 = lazy_import("cv2")
+    np = lazy_import("numpy")
 
 
-def capture_element_image(element: WebElement):
-    """捕获元素截图"""
-    screenshot = element.screenshot_as_png
+@traced("image.capture")
+def capture_element_image(element: WebElement, reduce: int = 1, gray: bool = False) -> Optional[np.ndarray]:
+    """整屏截图一次，按元素位置裁剪（返回视图）；`reduce` > 1 时解码阶段直接降采样。"""
+    try:
+        image = screen_image(element.parent, reduce=reduce, gray=gray)
+    except ValueError:
+        return None
+    return crop(image, element.rect, reduce)
 
-    # 获取元素位置和大小
-    location = element.location
-    size = element.size
-    left = location["x"]
-    top = location["y"]
-    right = left + size["width"]
-    bottom = top + size["height"]
 
-    np_array = np.frombuffer(screenshot, np.uint8)
-    image = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
-    cv2.imshow("PNG Image from File", image)
-    if image is not None:
-        cropped_image = image[top:bottom, left:right]
-        return cropped_image
+def decode_gray(pic_data: Union[bytes, bytearray, memoryview, str, np.ndarray], reduce: int = 1) -> np.ndarray:
+    """将 PNG 字节（或 base64 文本、一维字节数组）解码为灰度数组；已解码的图像原样返回。"""
+    if isinstance(pic_data, np.ndarray):
+        if pic_data.ndim != 1:
+            return pic_data
+        pic_data = pic_data.data
+    return get_screenshot_decoder().decode(pic_data, reduce=reduce, gray=True)
 
-    return None
 
+def _scaled_store(reduce: int) -> TemplateStore:
+    """与降采样截图匹配的参考图缓存（按倍数各一份）。"""
+    store = _SCALED_STORES.get(reduce)
+    if store is None:
+        store = _SCALED_STORES.setdefault(reduce, get_template_store(scale=1 / reduce))
+    return store
 
-def test_element_image_match_cv(pic_data: np.ndarray[Any, np.dtype[np.uint8]], expected_img: Union[str, Path]):
+
+_SCALED_STORES: Dict[int, TemplateStore] = {}
+
+
+def test_element_image_match_cv(
+    pic_data: Union[bytes, bytearray, memoryview, str, np.ndarray],
+    expected_img: Union[str, Path],
+    store: Optional[TemplateStore] = None,
+    matcher: Optional[PyramidMatcher] = None,
+    reduce: int = 1,
+) -> MatchResult:
     """
-    @param pic_data: 元素截图
-    @param expected_img: 预期图片
-    @return: 匹配度
+    @param pic_data: 元素截图（PNG 字节、base64 文本或已解码的灰度数组）
+    @param expected_img: 预期图片路径或月相名称
+    @param store: 参考模板缓存，默认使用进程内共享实例
+    @param matcher: 匹配引擎，默认使用金字塔匹配器（结论明确时提前返回）
+    @param reduce: 截图解码降采样倍数（1/2/4/8），未指定 store 时参考图按同一比例缩放
+    @return: 匹配结果（分数、位置、缩放比、耗时）
     """
     logger = logging.getLogger("tests")
-    if isinstance(expected_img, str):
-        expected_img = Path(expected_img)
-    if isinstance(pic_data, (bytes, bytearray)):
-        array = np.frombuffer(pic_data, np.uint8)
-        element_data = cv2.imdecode(array, cv2.IMREAD_GRAYSCALE)
-    # 2. 模板匹配
-    expected_img = cv2.imread(expected_img, cv2.IMREAD_GRAYSCALE)
-    result = cv2.matchTemplate(element_data, expected_img, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, _ = cv2.minMaxLoc(result)
-    logger.info(f"图片匹配度为{max_val}")
-    assert max_val > 0.8, f"图片匹配失败，匹配度为{max_val}"
+    element_data = decode_gray(pic_data, reduce)
+    # 2. 模板匹配（参考图由缓存提供，避免每个用例重复读盘解码）
+    with span("image.template"):
+        templates = store or (get_template_store() if reduce == 1 else _scaled_store(reduce))
+        template = templates.get(expected_img)
+    with span("image.match"):
+        result = (matcher or get_matcher()).match(element_data, template)
+    max_val = result.score
+    logger.info(
+        f"图片匹配度为{max_val}（层级 {result.level}, 缩放 {result.scale:.2f}, 耗时 {result.elapsed * 1000:.1f} ms）"
+    )
+    assert result.passed(DEFAULT_THRESHOLD), f"图片匹配失败，匹配度为{max_val}"
+    return result
+
+
+# 供用例直接调用的断言函数，避免被 pytest 当作测试收集
+test_element_image_match_cv.__test__ = False  # type: ignore[attr-defined]
 
 
 if __name__ == "__main__":
     actual_img = cv2.imread("tests\e2e\screenshots\screenshot.png", cv2.IMREAD_GRAYSCALE)
+    assert actual_img is not None
     test_element_image_match_cv(actual_img, "src\image_to_match\\new moon.png")
@@ -0,0 +1,206 @@
+"""图片匹配引擎
+
+职责：
+- 由粗到细的金字塔模板匹配：先在低分辨率上整图搜索，再逐层只在候选位置附近细化
+- 分数明显高于/低于阈值时提前返回，避免无谓的全分辨率计算
+- 截图小于模板时自动缩放模板，返回结构化结果（分数、位置、缩放比、耗时）
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from src.core.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+else:
+    cv2 = lazy_import("cv2")
+    np = lazy_import("numpy")
+
+DEFAULT_THRESHOLD = 0.8
+
+
+@dataclass(frozen=True)
+class MatchResult:
+    """一次匹配的结果。"""
+
+    score: float
+    location: Tuple[int, int]
+    scale: float
+    elapsed: float
+    level: int
+    early_exit: bool
+    # 参与相关计算的像素对数（候选位置数 x 模板像素数），与机器快慢无关的工作量
+    cost: int = 0
+
+    def passed(self, threshold: float = DEFAULT_THRESHOLD) -> bool:
+        return self.score > threshold
+
+
+class PyramidMatcher:
+    """金字塔模板匹配器。
+
+    - `margin`：粗层分数落在 ``threshold ± margin`` 之外即视为结论明确，直接返回
+    - `levels`：最多下采样层数，模板最短边不小于 `min_size`
+    - 模板金字塔按数组缓存（持有引用，避免 id 复用），适合与 TemplateStore 的只读数组配合
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        margin: float = 0.1,
+        levels: int = 3,
+        min_size: int = 32,
+        pad: int = 4,
+        cache_size: int = 16,
+    ) -> None:
+        self.threshold = threshold
+        self.margin = margin
+        self.levels = levels
+        self.min_size = min_size
+        self.pad = pad
+        self.cache_size = cache_size
+        self._pyramids: "OrderedDict[int, Tuple[np.ndarray, List[np.ndarray]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match(self, image: np.ndarray, template: np.ndarray) -> MatchResult:
+        """在 `image` 中搜索 `template`，返回最佳匹配。"""
+        start = time.perf_counter()
+        image = _to_gray(image)
+        template = _to_gray(template)
+
+        scale = 1.0
+        if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+            # 截图小于模板：等比缩小模板以适配，而不是让 matchTemplate 报错
+            scale = min(image.shape[0] / template.shape[0], image.shape[1] / template.shape[1])
+            size = (max(1, int(template.shape[1] * scale)), max(1, int(template.shape[0] * scale)))
+            template_pyr = self._build(cv2.resize(template, size, interpolation=cv2.INTER_AREA))
+        else:
+            template_pyr = self._template_pyramid(template)
+
+        depth = len(template_pyr) - 1
+        image_pyr = [image]
+        for _ in range(depth):
+            image_pyr.append(cv2.pyrDown(image_pyr[-1]))
+
+        # 最粗层整图搜索
+        score, loc = _best(image_pyr[depth], template_pyr[depth])
+        cost = _cost(image_pyr[depth], template_pyr[depth])
+        for level in range(depth, 0, -1):
+            if self._decided(score):
+                return self._result(score, loc, level, scale, start, early_exit=True, cost=cost)
+            score, loc, step = self._refine(image_pyr[level - 1], template_pyr[level - 1], loc)
+            cost += step
+        return self._result(score, loc, 0, scale, start, early_exit=False, cost=cost)
+
+    def _decided(self, score: float) -> bool:
+        return score >= self.threshold + self.margin or score < self.threshold - self.margin
+
+    def _refine(
+        self, image: np.ndarray, template: np.ndarray, coarse: Tuple[int, int]
+    ) -> Tuple[float, Tuple[int, int], int]:
+        """在上一层候选位置（放大 2 倍）附近的小窗口内细化，同时返回本层工作量。"""
+        th, tw = template.shape[:2]
+        ih, iw = image.shape[:2]
+        x0 = max(0, coarse[0] * 2 - self.pad)
+        y0 = max(0, coarse[1] * 2 - self.pad)
+        x1 = min(iw, coarse[0] * 2 + tw + self.pad)
+        y1 = min(ih, coarse[1] * 2 + th + self.pad)
+        roi = image[y0:y1, x0:x1]
+        if roi.shape[0] < th or roi.shape[1] < tw:
+            roi, x0, y0 = image, 0, 0
+        score, (x, y) = _best(roi, template)
+        return score, (x + x0, y + y0), _cost(roi, template)
+
+    def _result(
+        self,
+        score: float,
+        loc: Tuple[int, int],
+        level: int,
+        scale: float,
+        start: float,
+        early_exit: bool,
+        cost: int,
+    ) -> MatchResult:
+        factor = 2**level
+        location = (int(loc[0] * factor), int(loc[1] * factor))
+        return MatchResult(
+            score=float(score),
+            location=location,
+            scale=scale,
+            elapsed=time.perf_counter() - start,
+            level=level,
+            early_exit=early_exit,
+            cost=cost,
+        )
+
+    def _template_pyramid(self, template: np.ndarray) -> List[np.ndarray]:
+        key = id(template)
+        with self._lock:
+            cached = self._pyramids.get(key)
+            if cached is not None and cached[0] is template:
+                self._pyramids.move_to_end(key)
+                return cached[1]
+        pyramid = self._build(template)
+        with self._lock:
+            self._pyramids[key] = (template, pyramid)
+            while len(self._pyramids) > self.cache_size:
+                self._pyramids.popitem(last=False)
+        return pyramid
+
+    def _build(self, template: np.ndarray) -> List[np.ndarray]:
+        pyramid = [template]
+        while len(pyramid) <= self.levels and min(pyramid[-1].shape[:2]) // 2 >= self.min_size:
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        return pyramid
+
+
+def full_match(image: np.ndarray, template: np.ndarray) -> MatchResult:
+    """全分辨率单次匹配，作为金字塔结果的对照基准。"""
+    start = time.perf_counter()
+    image, template = _to_gray(image), _to_gray(template)
+    score, loc = _best(image, template)
+    return MatchResult(
+        score=float(score),
+        location=loc,
+        scale=1.0,
+        elapsed=time.perf_counter() - start,
+        level=0,
+        early_exit=False,
+        cost=_cost(image, template),
+    )
+
+
+def _best(image: np.ndarray, template: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return float(max_val), (int(max_loc[0]), int(max_loc[1]))
+
+
+def _cost(image: np.ndarray, template: np.ndarray) -> int:
+    th, tw = template.shape[:2]
+    return int((image.shape[0] - th + 1) * (image.shape[1] - tw + 1) * th * tw)
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(image, code)
+    return image
+
+
+_DEFAULT_MATCHER: Optional[PyramidMatcher] = None
+
+
+def get_matcher() -> PyramidMatcher:
+    """获取进程内共享的默认匹配器（复用模板金字塔缓存）。"""
+    global _DEFAULT_MATCHER  # pylint: disable=global-statement
+    if _DEFAULT_MATCHER is None:
+        _DEFAULT_MATCHER = PyramidMatcher()
+    return _DEFAULT_MATCHER
@@ -0,0 +1,82 @@
+"""月相分类器
+
+职责：
+- 为全部参考图一次性计算紧凑特征（下采样、零均值、单位范数），堆叠为 NumPy 矩阵
+- 对一张截图只做一次矩阵乘法即可得到与所有月相的相似度，并按分数排序
+- 用例失败时直接给出“实际更像哪个月相”，免去逐个重跑比对
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Tuple, Union
+
+from src.core.lazy import lazy_import
+from tests.unit.image_tools import decode_gray
+from tests.unit.template_store import TemplateStore, get_template_store
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+else:
+    cv2 = lazy_import("cv2")
+    np = lazy_import("numpy")
+
+DEFAULT_FEATURE_SIZE = (32, 32)
+
+
+@dataclass(frozen=True)
+class PhaseScore:
+    """单个月相的相似度。"""
+
+    phase: str
+    score: float
+
+
+class PhaseClassifier:
+    """基于参考图特征矩阵的批量月相打分。
+
+    相似度为下采样后的归一化互相关（与 TM_CCOEFF_NORMED 同义），取值 [-1, 1]。
+    """
+
+    def __init__(self, store: Optional[TemplateStore] = None, size: Tuple[int, int] = DEFAULT_FEATURE_SIZE) -> None:
+        self.store = store or get_template_store()
+        self.size = size
+        self.names: List[str] = self.store.names()
+        if not self.names:
+            raise ValueError(f"参考图目录为空: {self.store.root}")
+        self.matrix = np.stack([self.features(self.store.get(name)) for name in self.names])
+        self.matrix.flags.writeable = False
+
+    def features(self, image: Union[bytes, bytearray, np.ndarray]) -> np.ndarray:
+        """计算单张图片的特征向量。"""
+        gray = decode_gray(image)
+        if gray is None:
+            raise ValueError("截图解码失败")
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        small -= small.mean()
+        norm = float(np.linalg.norm(small))
+        return small / norm if norm > 0 else small
+
+    def scores(self, images: Iterable[Union[bytes, bytearray, np.ndarray]]) -> np.ndarray:
+        """批量打分，返回形状为 (图片数, 月相数) 的相似度矩阵。"""
+        batch = np.stack([self.features(image) for image in images])
+        scores: np.ndarray = batch @ self.matrix.T
+        return scores
+
+    def classify(self, image: Union[bytes, bytearray, np.ndarray]) -> List[PhaseScore]:
+        """对单张截图按相似度从高到低返回全部月相。"""
+        row = self.matrix @ self.features(image)
+        order = np.argsort(-row, kind="stable")
+        return [PhaseScore(self.names[i], float(row[i])) for i in order]
+
+    def best(self, image: Union[bytes, bytearray, np.ndarray]) -> PhaseScore:
+        """返回最相似的月相。"""
+        return self.classify(image)[0]
+
+
+def describe(ranking: Sequence[PhaseScore], top: int = 3) -> str:
+    """将排序结果格式化为一行，便于写入日志与失败信息。"""
+    return ", ".join(f"{item.phase}={item.score:.2f}" for item in ranking[:top])
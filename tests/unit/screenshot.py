@@ -0,0 +1,131 @@
+"""截图解码管线
+
+职责：
+- 直接取 Appium 返回的 base64 截图，分块解码进可复用缓冲区，不再为每次截图分配完整的 PNG 字节串
+- 仅需匹配时直接以降采样灰度解码（`cv2.IMREAD_REDUCED_GRAYSCALE_*`），解码与后续匹配的数据量同步减少
+- 元素裁剪返回原图视图而非拷贝
+"""
+
+from __future__ import annotations
+
+import binascii
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+from src.core.lazy import lazy_import
+from src.core.tracing import span
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+else:
+    cv2 = lazy_import("cv2")
+    np = lazy_import("numpy")
+
+# 每块 base64 字符数（4 的倍数），解码时的临时分配不超过其 3/4
+CHUNK = 64 * 1024
+
+# (降采样倍数, 是否灰度) -> imdecode 标志名；取值在首次解码时才从 cv2 读取
+_REDUCED_FLAGS = {
+    (1, True): "IMREAD_GRAYSCALE",
+    (2, True): "IMREAD_REDUCED_GRAYSCALE_2",
+    (4, True): "IMREAD_REDUCED_GRAYSCALE_4",
+    (8, True): "IMREAD_REDUCED_GRAYSCALE_8",
+    (1, False): "IMREAD_COLOR",
+    (2, False): "IMREAD_REDUCED_COLOR_2",
+    (4, False): "IMREAD_REDUCED_COLOR_4",
+    (8, False): "IMREAD_REDUCED_COLOR_8",
+}
+
+Encoded = Union[str, bytes, bytearray, memoryview]
+
+
+def imread_flag(reduce: int = 1, gray: bool = True) -> int:
+    """降采样倍数（1/2/4/8）与是否灰度对应的 imdecode 标志。"""
+    try:
+        flag: int = getattr(cv2, _REDUCED_FLAGS[(reduce, gray)])
+        return flag
+    except KeyError as exc:
+        raise ValueError(f"reduce 只支持 1/2/4/8: {reduce}") from exc
+
+
+class ScreenshotDecoder:
+    """base64 截图解码器，持有一块按需增长的 PNG 缓冲区。
+
+    - `png(b64)` 返回缓冲区上的 memoryview，下一次解码时被覆盖；需要长期保留时请自行 `bytes()`
+    - 非线程安全，请通过 `get_screenshot_decoder()` 获取当前线程的实例
+    """
+
+    def __init__(self, chunk: int = CHUNK) -> None:
+        self.chunk = max(4, chunk - chunk % 4)
+        self._buffer = bytearray()
+        self.grows = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    def png(self, data: Encoded) -> memoryview:
+        """base64 文本解码进缓冲区；已是 PNG 字节时原样返回其视图。"""
+        if isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == b"\x89PNG":
+            return memoryview(data)
+        # a2b_base64 直接接受 ASCII str，按块切片解码，不生成整段 bytes 副本
+        text: Union[str, bytes] = data if isinstance(data, str) else bytes(data)
+        if isinstance(text, str) and ("\n" in text or "\r" in text):
+            text = text.replace("\n", "").replace("\r", "")
+        elif isinstance(text, bytes) and (b"\n" in text or b"\r" in text):
+            text = text.replace(b"\n", b"").replace(b"\r", b"")
+        needed = len(text) // 4 * 3
+        if needed > len(self._buffer):
+            # 按 1.5 倍增长，截图尺寸相近时只在首次分配
+            self._buffer = bytearray(max(needed, len(self._buffer) * 3 // 2))
+            self.grows += 1
+        view = memoryview(self._buffer)
+        size = 0
+        for offset in range(0, len(text), self.chunk):
+            piece = binascii.a2b_base64(text[offset : offset + self.chunk])
+            view[size : size + len(piece)] = piece
+            size += len(piece)
+        return view[:size]
+
+    def decode(self, data: Encoded, reduce: int = 1, gray: bool = True) -> np.ndarray:
+        """解码为图像数组；`reduce` > 1 时在解码阶段直接降采样。"""
+        png = self.png(data)
+        with span("image.decode", nbytes=len(png), reduce=reduce):
+            image = cv2.imdecode(np.frombuffer(png, np.uint8), imread_flag(reduce, gray))
+        if image is None:
+            raise ValueError("截图解码失败")
+        return image
+
+
+def crop(image: np.ndarray, rect: Dict[str, Any], reduce: int = 1) -> np.ndarray:
+    """按元素 rect（设备坐标）裁剪，返回视图；`reduce` 为图像相对设备坐标的降采样倍数。"""
+    height, width = image.shape[:2]
+    left = min(max(0, int(rect["x"]) // reduce), width)
+    top = min(max(0, int(rect["y"]) // reduce), height)
+    right = min(width, left + max(0, int(rect["width"]) // reduce))
+    bottom = min(height, top + max(0, int(rect["height"]) // reduce))
+    return image[top:bottom, left:right]
+
+
+_LOCAL = threading.local()
+
+
+def get_screenshot_decoder() -> ScreenshotDecoder:
+    """获取当前线程复用的解码器。"""
+    decoder: Optional[ScreenshotDecoder] = getattr(_LOCAL, "decoder", None)
+    if decoder is None:
+        decoder = _LOCAL.decoder = ScreenshotDecoder()
+    return decoder
+
+
+def element_png(element: Any, decoder: Optional[ScreenshotDecoder] = None) -> memoryview:
+    """元素截图的 PNG 字节（缓冲区视图），跳过 selenium 的整段 b64decode。"""
+    return (decoder or get_screenshot_decoder()).png(element.screenshot_as_base64)
+
+
+def screen_image(
+    driver: Any, reduce: int = 1, gray: bool = True, decoder: Optional[ScreenshotDecoder] = None
+) -> np.ndarray:
+    """整屏截图解码为数组。"""
+    return (decoder or get_screenshot_decoder()).decode(driver.get_screenshot_as_base64(), reduce, gray)
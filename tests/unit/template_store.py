@@ -0,0 +1,187 @@
+"""参考模板缓存
+
+职责：
+- 每个会话只解码一次 `src/image_to_match/` 下的参考图，常驻为灰度数组（可选预缩放/预处理）
+- 按文件 mtime/size 判定失效，内容哈希未变时复用已解码数组
+- 按 LRU 控制总内存占用，供所有基于图片的断言共享
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Union
+
+from src.core.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+else:
+    cv2 = lazy_import("cv2")
+    np = lazy_import("numpy")
+
+DEFAULT_TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "src" / "image_to_match"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+Preprocess = Callable[["np.ndarray"], "np.ndarray"]
+
+
+@dataclass(frozen=True)
+class TemplateEntry:
+    """单个已解码的参考图。"""
+
+    name: str
+    path: Path
+    image: np.ndarray
+    mtime_ns: int
+    size: int
+    digest: str
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.image.nbytes)
+
+
+class TemplateStore:
+    """参考图解码缓存。
+
+    - `get()` 接受月相名（如 ``"new moon"``）或图片路径，返回只读灰度数组
+    - 每次读取仅做一次 `stat`，文件变更后才重新读取；内容哈希一致时不重复解码
+    - 超出 `max_bytes` 时按最近最少使用淘汰
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path] = DEFAULT_TEMPLATE_DIR,
+        scale: float = 1.0,
+        preprocess: Optional[Preprocess] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        if scale <= 0:
+            raise ValueError(f"scale 必须大于 0: {scale}")
+        self.root = Path(root).resolve()
+        self.scale = scale
+        self.preprocess = preprocess
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, TemplateEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.decodes = 0
+
+    def preload(self, pattern: str = "*.png") -> int:
+        """解码目录下全部参考图，返回加载数量。"""
+        paths = sorted(self.root.glob(pattern))
+        for path in paths:
+            self.entry(path)
+        return len(paths)
+
+    def names(self) -> List[str]:
+        """返回目录下所有参考图名称（不含扩展名）。"""
+        return sorted(p.stem for p in self.root.glob("*.png"))
+
+    def get(self, key: Union[str, Path]) -> np.ndarray:
+        """按名称或路径获取灰度模板。"""
+        return self.entry(key).image
+
+    def entry(self, key: Union[str, Path]) -> TemplateEntry:
+        """按名称或路径获取模板条目，必要时解码并刷新。"""
+        path = self._resolve(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError as exc:
+            raise FileNotFoundError(f"未找到参考图: {path}") from exc
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+                self._entries.move_to_end(path)
+                return cached
+            entry = self._load(path, stat.st_mtime_ns, stat.st_size, cached)
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            self._evict()
+            return entry
+
+    def invalidate(self, key: Union[str, Path, None] = None) -> None:
+        """丢弃指定模板或全部模板的缓存。"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._resolve(key), None)
+
+    @property
+    def nbytes(self) -> int:
+        """当前缓存的解码数据总字节数。"""
+        return sum(e.nbytes for e in self._entries.values())
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, (str, Path)):
+            return False
+        return self._resolve(key) in self._entries
+
+    def __iter__(self) -> Iterator[TemplateEntry]:
+        return iter(list(self._entries.values()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _resolve(self, key: Union[str, Path]) -> Path:
+        if isinstance(key, Path) or key.lower().endswith(".png") or "/" in key or "\\" in key:
+            return Path(key).resolve()
+        return self.root / f"{key}.png"
+
+    def _load(self, path: Path, mtime_ns: int, size: int, cached: Optional[TemplateEntry]) -> TemplateEntry:
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached is not None and cached.digest == digest:
+            # 仅时间戳变化（如 touch/checkout），沿用已解码数组
+            image = cached.image
+        else:
+            image = self._decode(raw, path)
+        return TemplateEntry(name=path.stem, path=path, image=image, mtime_ns=mtime_ns, size=size, digest=digest)
+
+    def _decode(self, raw: bytes, path: Path) -> np.ndarray:
+        image = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"参考图解码失败: {path}")
+        if self.scale != 1.0:
+            width = max(1, int(round(image.shape[1] * self.scale)))
+            height = max(1, int(round(image.shape[0] * self.scale)))
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        if self.preprocess is not None:
+            image = self.preprocess(image)
+        image = np.ascontiguousarray(image)
+        image.flags.writeable = False
+        self.decodes += 1
+        return image
+
+    def _evict(self) -> None:
+        total = sum(e.nbytes for e in self._entries.values())
+        # 至少保留最近使用的一项，避免单张超限时反复解码
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, oldest = self._entries.popitem(last=False)
+            total -= oldest.nbytes
+
+
+_DEFAULT_STORE: Optional[TemplateStore] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_template_store(**kwargs: Any) -> TemplateStore:
+    """获取进程内共享的默认模板缓存；传入参数时返回独立实例。"""
+    global _DEFAULT_STORE  # pylint: disable=global-statement
+    if kwargs:
+        return TemplateStore(**kwargs)
+    with _DEFAULT_LOCK:
+        if _DEFAULT_STORE is None:
+            _DEFAULT_STORE = TemplateStore()
+        return _DEFAULT_STORE
+
+
+def template_digests(store: Optional[TemplateStore] = None) -> Dict[str, str]:
+    """返回 {名称: sha256}，便于结果缓存等场景引用参考图版本。"""
+    store = store or get_template_store()
+    return {name: store.entry(name).digest for name in store.names()}
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import pytest
+
+from src.core.app_lifecycle import (
+    AppLauncher,
+    AppLaunchError,
+    LaunchMemory,
+    LaunchStats,
+    LaunchStrategy,
+    activity_matches,
+    parse_am_start,
+)
+from src.core.waits import AdaptiveWaiter
+from tests.unit.fakes import FakeDriver
+
+PACKAGE = "com.ost.lunight"
+ACTIVITY = "io.dcloud.PandoraEntry"
+AM_START_OUTPUT = f"""Stopping: {PACKAGE}
+Starting: Intent {{ cmp={PACKAGE}/{ACTIVITY} }}
+Status: ok
+LaunchState: COLD
+Activity: {PACKAGE}/{ACTIVITY}
+TotalTime: 812
+WaitTime: 830
+Complete
+"""
+
+
+def _launcher(driver: FakeDriver, memory: LaunchMemory, stats: LaunchStats) -> AppLauncher:
+    return AppLauncher(driver, PACKAGE, ACTIVITY, memory=memory, stats=stats)
+
+
+def test_am_start_reports_total_time_and_skips_polling():
+    driver = FakeDriver(shell_handler=lambda cmd: AM_START_OUTPUT)
+    stats = LaunchStats()
+    launcher = _launcher(driver, LaunchMemory(), stats)
+    for _ in range(3):
+        result = launcher.cold_launch()
+        assert launcher.wait_ready(result)
+    assert result.strategy == "am-start-shell" and result.total_ms == 812
+    # 强杀、启动、计时与就绪确认共一条命令
+    assert [cmd for cmd, _ in driver.commands] == ["mobile: shell"] * 3
+    assert "-S -W" in driver.commands[0][1]["command"]
+    assert stats.samples[PACKAGE] == [812.0] * 3
+    assert "TotalTime" in stats.report_lines()[0]
+
+
+def test_failed_strategy_is_remembered_per_device_and_ready_is_polled():
+    driver = FakeDriver()  # 未开启 adb_shell
+    driver.activity = ACTIVITY
+    memory, stats = LaunchMemory(), LaunchStats()
+    slept = []
+    waiter = AdaptiveWaiter(stats_file=None, sleep=slept.append)
+    for _ in range(2):
+        launcher = _launcher(driver, memory, stats)
+        result = launcher.cold_launch()
+        assert result.strategy == "start-activity" and result.total_ms is None
+        assert launcher.wait_ready(result, waiter=waiter)
+    assert driver.count("mobile: shell") == 1
+    assert driver.count("mobile: startActivity") == 2 and driver.count("getCurrentActivity") == 2
+    assert memory.selected[driver.capabilities["udid"]] == "start-activity"
+
+    driver.activity = ".Other"
+    seen = []
+    assert not launcher.wait_ready(waiter=waiter, timeout=0.05, observe=seen.append)
+    assert seen and all(pause <= 0.2 for pause in slept)
+
+
+def test_failed_strategy_is_probed_again_after_cooldown():
+    calls = []
+
+    def _flaky(cmd):
+        calls.append(cmd)
+        if len(calls) == 1:
+            raise RuntimeError("adb 连接瞬断")
+        return AM_START_OUTPUT
+
+    now = [0.0]
+    driver = FakeDriver(shell_handler=_flaky)
+    memory = LaunchMemory(retry_after=60.0)
+    launcher = AppLauncher(driver, PACKAGE, ACTIVITY, memory=memory, stats=LaunchStats(), clock=lambda: now[0])
+    assert launcher.cold_launch().strategy == "start-activity"
+    now[0] = 30.0
+    assert launcher.cold_launch().strategy == "start-activity" and len(calls) == 1
+    now[0] = 61.0
+    assert launcher.cold_launch().strategy == "am-start-shell" and len(calls) == 2
+    assert not memory.failed[driver.capabilities["udid"]]
+
+
+def test_strategy_without_launch_cannot_be_constructed():
+    class Incomplete(LaunchStrategy):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_parse_and_activity_matching():
+    with pytest.raises(AppLaunchError):
+        parse_am_start("Error: Activity class {com.x/.Main} does not exist.")
+    assert parse_am_start("Status: timeout\nActivity: com.x/.Main\n") == {"total_ms": None, "activity": ""}
+    assert activity_matches(".Main", "com.x", "com.x.Main")
+    assert activity_matches("com.x/.Main", "com.x", ".Main")
+    assert not activity_matches("com.y.Main", "com.x", ".Main")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import os
+import threading
+from typing import Any, Dict, List
+
+from selenium.webdriver.remote.command import Command
+
+from src.core.artifacts import ArtifactCollector
+from tests.unit.template_store import DEFAULT_TEMPLATE_DIR
+
+
+class CaptureDriver:
+    """只响应截图与 page_source 两条命令的假驱动。"""
+
+    def __init__(self, image: str, source: str) -> None:
+        self.screen = base64.b64encode((DEFAULT_TEMPLATE_DIR / f"{image}.png").read_bytes()).decode("ascii")
+        self.source = source
+        self.commands: List[str] = []
+
+    def execute(self, command: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self.commands.append(command)
+        return {"value": self.screen if command == Command.SCREENSHOT else self.source}
+
+
+def test_identical_evidence_is_written_once_and_compressed(tmp_path):
+    collector = ArtifactCollector(tmp_path)
+    driver = CaptureDriver("full moon", "<hierarchy>" + "<node/>" * 500 + "</hierarchy>")
+    first = collector.capture(driver)
+    second = collector.capture(driver)
+    collector.close()
+
+    assert driver.commands == [Command.SCREENSHOT, Command.GET_PAGE_SOURCE] * 2
+    assert [a.deduplicated for a in first + second] == [False, False, True, True]
+    assert [a.path for a in first] == [a.path for a in second]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(a.path.name for a in first)
+    screenshot, source = first
+    assert screenshot.path.suffix == ".webp"
+    assert screenshot.path.stat().st_size < len(base64.b64decode(driver.screen))
+    assert gzip.decompress(source.path.read_bytes()).decode("utf-8") == driver.source
+    assert source.uri.startswith("file://")
+    assert "去重 2 份" in collector.report_lines()[0]
+
+
+def test_budget_evicts_least_recently_used_unreferenced_files(tmp_path):
+    previous = ArtifactCollector(tmp_path, budget_bytes=10 * 1024, image_format="png")
+    old = [previous.page_source(f"<hierarchy id='{i}'>{'x' * 400 * i}</hierarchy>") for i in range(4)]
+    previous.close()
+    for i, artifact in enumerate(old):
+        os.utime(artifact.path, (1000 + i, 1000 + i))
+
+    collector = ArtifactCollector(tmp_path, budget_bytes=160, image_format="png")
+    # 去重命中上次运行的最早一份：本次报告引用它，不再淘汰
+    assert collector.page_source("<hierarchy id='0'></hierarchy>").deduplicated
+    current = collector.page_source("<hierarchy id='9'>" + "y" * 900 + "</hierarchy>")
+    collector.close()
+
+    assert collector.evicted == 2 and collector.total_bytes <= 160
+    assert [a.path.exists() for a in old] == [True, False, False, True]
+    assert current.path.exists()
+
+
+def test_referenced_files_survive_when_budget_is_exceeded(tmp_path):
+    collector = ArtifactCollector(tmp_path, budget_bytes=100, image_format="png")
+    sources = [collector.page_source(f"<hierarchy id='{i}'>{'x' * 400 * (i + 1)}</hierarchy>") for i in range(3)]
+    collector.close()
+    assert collector.evicted == 0 and all(a.path.exists() for a in sources)
+    # 新实例从目录恢复已有文件，继续去重
+    reopened = ArtifactCollector(tmp_path, budget_bytes=100)
+    assert reopened.page_source("<hierarchy id='0'>" + "x" * 400 + "</hierarchy>").deduplicated
+    reopened.close()
+
+
+def test_capture_does_not_wait_for_encoding(tmp_path, monkeypatch):
+    collector = ArtifactCollector(tmp_path)
+    encode = collector._encode_image  # pylint: disable=protected-access
+    release = threading.Event()
+
+    def _blocked(b64: str) -> bytes:
+        # 编码阻塞到主线程放行；超时只为测试失败时不挂死
+        release.wait(timeout=10)
+        return encode(b64)
+
+    monkeypatch.setattr(collector, "_encode_image", _blocked)
+    screenshot, _ = collector.capture(CaptureDriver("new moon", "<hierarchy/>"))
+    # 编码尚未放行时 capture 已返回，截图文件还没写出
+    assert not release.is_set() and not screenshot.path.exists()
+    release.set()
+    collector.close()
+    assert screenshot.path.exists() and collector.written == 2
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Tuple
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchElementException, TimeoutException
+
+from src.core.async_driver import ELEMENT_KEY, AsyncConnection, AsyncDriver, open_sessions, w3c_capabilities
+from src.core.transport import CommandRecorder
+from src.page_objects.async_base_page import AsyncBasePage
+from src.page_objects.locators import LocatorCache
+from tests.unit.appium_stub import AppiumStub
+
+CAPS = {"platformName": "Android", "automationName": "UiAutomator2", "deviceName": "stub"}
+LATENCY = 0.05
+SOURCE = (
+    '<hierarchy rotation="0" width="1080" height="2340">'
+    '<android.widget.Button resource-id="date" text="设置" bounds="[0,0][100,50]" displayed="true" enabled="true"/>'
+    "</hierarchy>"
+)
+
+
+class DeviceStub(AppiumStub):
+    """每条会话命令固定延迟的假设备：只有 id=date 的按钮，点击按会话计数。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.clicks: Dict[str, int] = {}
+
+    def session_command(
+        self, method: str, session_id: str, command: str, body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        time.sleep(LATENCY)
+        if method == "POST" and command == "element":
+            if body == {"using": "id", "value": "date"}:
+                return 200, {"value": {ELEMENT_KEY: f"{session_id}-date"}}
+            return 404, {"value": {"error": "no such element", "message": f"未找到 {body['value']}"}}
+        if command.startswith("element/") and command.endswith("/click"):
+            self.clicks[session_id] = self.clicks.get(session_id, 0) + 1
+            return 200, {"value": None}
+        if command.endswith("/rect"):
+            return 200, {"value": {"x": 0, "y": 0, "width": 100, "height": 50}}
+        if command.endswith(("/displayed", "/enabled")):
+            return 200, {"value": True}
+        if command == "screenshot":
+            return 200, {"value": "iVBORw0KGgo="}
+        if command == "source":
+            return 200, {"value": SOURCE}
+        if command == "execute/sync":
+            return 200, {"value": body}
+        return super().session_command(method, session_id, command, body)
+
+
+async def _scenario(driver: AsyncDriver) -> str:
+    """一台设备上的典型步骤：点击设置、读位置、执行脚本、截图。"""
+    page = AsyncBasePage(driver, timeout=1, locators=LocatorCache(stats_file=None))
+    await page.click(("id", "date"))
+    element = await page.find(("id", "date"))
+    assert await element.rect() == {"x": 0, "y": 0, "width": 100, "height": 50}
+    assert await driver.execute_script("mobile: shell", {"command": "date"}) == {
+        "script": "mobile: shell",
+        "args": [{"command": "date"}],
+    }
+    return await driver.screenshot()
+
+
+def test_many_sessions_share_one_loop_with_concurrent_round_trips():
+    devices = 6
+
+    async def main() -> Tuple[int, int]:
+        recorder = CommandRecorder()
+        connection = AsyncConnection(stub.url, max_connections=devices, recorder=recorder)
+        drivers = await open_sessions(stub.url, [dict(CAPS, udid=f"emulator-{i}") for i in range(devices)], connection)
+        shots = await asyncio.gather(*(_scenario(driver) for driver in drivers))
+        assert shots == ["iVBORw0KGgo="] * devices
+        await asyncio.gather(*(driver.quit() for driver in drivers))
+        await connection.close()
+        return recorder.commands["clickElement"].count, connection.opened
+
+    with DeviceStub() as stub:
+        clicks, opened = asyncio.run(main())
+        assert clicks == devices and sorted(stub.clicks.values()) == [1] * devices
+        assert stub.sessions == {} and stub.created == devices
+    # 多台设备的命令同时在途（按桩服务记录的峰值判断，不依赖墙钟耗时），且不超过连接上限
+    assert 1 < stub.peak <= devices
+    # keep-alive：连接数不超过并发上限
+    assert opened <= devices
+
+
+def test_errors_map_to_selenium_exceptions_and_page_waits_time_out():
+    async def main() -> str:
+        connection = AsyncConnection(stub.url, max_connections=2)
+        async with await AsyncDriver.create(stub.url, CAPS, connection) as driver:
+            with pytest.raises(NoSuchElementException, match="未找到 missing"):
+                await driver.find_element("id", "missing")
+            page = AsyncBasePage(driver, timeout=0.3, poll=0.05, locators=LocatorCache(stats_file=None))
+            with pytest.raises(TimeoutException):
+                await page.find(("id", "missing"))
+            node = await page.wait_ready(("id", "date"))
+            assert node.center == (50, 25)
+            await page.tap(node)
+        with pytest.raises(InvalidSessionIdException):
+            await driver.page_source()
+        await connection.close()
+        return driver.session_id
+
+    with DeviceStub() as stub:
+        session_id = asyncio.run(main())
+        assert stub.requests[0] == ("POST", "/session")
+        assert ("DELETE", f"/session/{session_id}") in stub.requests
+        # 错误响应后连接仍可复用，不为每条命令新建连接
+        assert len(stub.connections) <= 2
+
+
+def test_capabilities_prefix_and_chunked_body():
+    body = w3c_capabilities({"platformName": "Android", "udid": "x", "appium:noReset": True})
+    expected = {"platformName": "Android", "appium:udid": "x", "appium:noReset": True}
+    assert body["capabilities"]["alwaysMatch"] == expected
+
+    async def main() -> bytes:
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'5\r\n{"val\r\n7;ext=1\r\nue": 1}\r\n0\r\nX-Trailer: y\r\n\r\n')
+        reader.feed_eof()
+        return await AsyncConnection._read_chunked(reader)  # pylint: disable=protected-access
+
+    assert asyncio.run(main()) == b'{"value": 1}'
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+
+from benchmarks.bench import BENCHMARKS, DATE, Benchmark, _page, compare, load_baseline, run_all, run_benchmark
+
+
+def test_round_trips_and_device_time_match_baseline():
+    names = [b.name for b in BENCHMARKS if b.name != "image.match"]
+    results = run_all(names, iterations=50)
+    baseline = load_baseline()
+    assert set(names) <= set(baseline)
+    assert compare(results, baseline, time_tolerance=None) == []
+    by_name = {r.name: r for r in results}
+    # 直接查找只需一次 findElement；冷启动由 am start -W 一条命令完成且不再轮询 Activity
+    assert by_name["page.find"].commands == 1
+    assert by_name["app.cold_launch"].commands == 1
+
+
+def test_extra_round_trip_or_sleep_is_flagged():
+    baseline = load_baseline()
+
+    def _extra_find(driver):
+        page = _page(driver)
+
+        def _op():
+            page.find(DATE)
+            driver.find_element(*DATE)
+
+        return _op
+
+    def _sleepy(driver):
+        page = _page(driver)
+
+        def _op():
+            page.find(DATE)
+            time.sleep(0.1)
+
+        return _op
+
+    extra = run_benchmark(Benchmark("page.find", _extra_find), iterations=20)
+    sleepy = run_benchmark(Benchmark("page.find", _sleepy), iterations=20)
+    assert any("命令数" in line for line in compare([extra], baseline, time_tolerance=None))
+    regressions = compare([sleepy], baseline, time_tolerance=None)
+    assert len(regressions) == 1 and "设备时间" in regressions[0]
+    # 虚拟时钟：休眠不真正等待
+    assert sleepy.p50_us < 100_000
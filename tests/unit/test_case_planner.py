@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import pytest
+
+from src.core.case_planner import CostModel, boundary_dates, plan_cases
+from src.core.dataset import PHASES, LunarCase, load_dataset
+from src.core.lunar_oracle import generate_cases
+
+
+def test_ordered_plan_dedupes_and_reduces_date_changes():
+    cases = list(reversed(load_dataset().lunar))
+    cases.append(cases[0])
+    plan = plan_cases(cases, "ordered")
+    assert len(plan.cases) == len(cases) - 1 and plan.skipped == [cases[0]]
+    assert [c.date for c in plan.cases] == sorted(c.date for c in plan.cases)
+    assert plan.state_changes() < plan.state_changes(cases)
+    assert plan.saved_seconds() > 0
+
+
+def test_stratified_plan_keeps_k_representatives_and_boundaries_per_phase():
+    cases = generate_cases("2024-01-01", "2024-12-31", stable_days=0)
+    edges = boundary_dates(cases)
+    plan = plan_cases(cases, "stratified", k=2)
+    for phase in PHASES:
+        kept = [c for c in plan.cases if c.phase == phase]
+        assert sum(c.date in edges for c in kept) == 2
+        assert len(kept) <= 4
+    assert len(plan.cases) + len(plan.skipped) == len(cases)
+    cost = CostModel(set_date=2.0, launch=4.0, capture=1.0)
+    assert plan.saved_seconds(cost) == pytest.approx(cost.total(cases) - cost.total(plan.cases))
+    assert "节省" in plan.summary_lines(cost)[1]
+
+
+def test_cost_model_from_step_stats_and_repeated_dates():
+    model = CostModel.from_step_stats({"date.alarm-shell": [0.5, 0.7], "app.cold_launch": [3.0], "case": [20.0]})
+    assert model.set_date == pytest.approx(0.6) and model.launch == 3.0 and model.capture == 1.5
+    same = [LunarCase("2024-04-08", "new moon")] * 2
+    assert model.total(same) == pytest.approx(model.set_date + model.launch + 2 * model.capture)
+    with pytest.raises(ValueError):
+        plan_cases(same, "random")
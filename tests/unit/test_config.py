@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import json
+import os
+import shutil
+import time
 
-from src.core.config import ConfigLoader
+import pytest
+
+import src.core.config as config_module
+from src.core.config import ConfigError, ConfigLoader, get_config, load_env_file, load_profiles
 
 
 def test_capabilities_path_exists():
@@ -18,5 +25,88 @@ def test_load_capabilities_default_profile():
 
 
 def get_capabilities():
+    return get_config().load_capabilities()
+
+
+def test_get_config_is_shared_until_env_changes(monkeypatch):
+    monkeypatch.delenv("CASE_PLAN", raising=False)
+    loader = get_config()
+    loads = []
+
+    def _counting(path):
+        loads.append(path)
+        return load_profiles(path)
+
+    # 缓存命中时不重新读取 capabilities 文件
+    monkeypatch.setattr(config_module, "load_profiles", _counting)
+    for _ in range(1000):
+        assert get_config() is loader
+    assert loads == []
+    # 返回副本，调用方修改不影响缓存
+    get_capabilities()["noReset"] = False
+    assert get_capabilities()["noReset"] is True
+
+    monkeypatch.setenv("CASE_PLAN", "ordered")
+    rebuilt = get_config()
+    assert rebuilt is not loader and rebuilt.values.case_plan == "ordered"
+    assert loads and get_config() is rebuilt and len(loads) == len(rebuilt.catalog)
+    assert rebuilt.for_profile("ci").device_profile == "ci"
+    assert rebuilt.for_profile("ci") is rebuilt.for_profile("ci")
+
+    monkeypatch.setenv("LUNAR_ORACLE", " Skip ")
+    assert get_config() is not rebuilt and get_config().values.lunar_oracle == "skip"
+
+
+def test_profiles_are_normalized_and_options_built_once():
+    loader = get_config()
+    caps = loader.load_capabilities("default")
+    assert caps["appium:forceAppLaunch"] is True
+    assert not any(key.startswith("appium:appium:") for key in caps)
+    profile = loader.profile("emulator-5554")
+    assert profile.remote_kwargs is profile.remote_kwargs
+    assert set(loader.profiles()) >= {"default", "ci", "emulator-5554"}
+
+
+def test_capability_file_change_invalidates(tmp_path, monkeypatch):
+    cap_dir = tmp_path / "capabilities"
+    shutil.copytree(ConfigLoader().cap_dir, cap_dir)
     loader = ConfigLoader()
-    return loader.load_capabilities()
+    loader.cap_dir = cap_dir
+    loader.stamp = config_module._stamp(loader.env_file, cap_dir)  # pylint: disable=protected-access
+    monkeypatch.setattr(config_module, "_DEFAULT_CONFIG", loader)
+    assert get_config() is loader
+    later = time.time() + 5
+    os.utime(cap_dir / "android.json", (later, later))
+    assert get_config() is not loader
+
+
+def test_invalid_profiles_are_reported(tmp_path):
+    path = tmp_path / "android.json"
+    path.write_text(
+        json.dumps(
+            {
+                "default": {"platformName": "Android", "noReset": True, "appium:appium:noReset": False},
+                "phone": {"platformName": "iOS"},
+                "broken": [],
+            }
+        ),
+        encoding="utf-8",
+    )
+    with pytest.raises(ConfigError) as info:
+        load_profiles(path)
+    assert len(info.value.errors) == 3
+
+
+def test_env_file_reload_respects_process_environment(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    monkeypatch.setenv("CONFIG_TEST_FIXED", "process")
+    monkeypatch.delenv("CONFIG_TEST_VALUE", raising=False)
+    env_file.write_text("CONFIG_TEST_VALUE=1\nCONFIG_TEST_FIXED=dotenv\n", encoding="utf-8")
+    load_env_file(env_file)
+    assert os.environ["CONFIG_TEST_VALUE"] == "1" and os.environ["CONFIG_TEST_FIXED"] == "process"
+    env_file.write_text("CONFIG_TEST_VALUE=2\n", encoding="utf-8")
+    load_env_file(env_file)
+    assert os.environ["CONFIG_TEST_VALUE"] == "2"
+    env_file.write_text("", encoding="utf-8")
+    load_env_file(env_file)
+    assert "CONFIG_TEST_VALUE" not in os.environ and os.environ["CONFIG_TEST_FIXED"] == "process"
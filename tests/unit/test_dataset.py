@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.core.dataset import DEFAULT_DATA_FILE, DataRepository, DataSetError, load_dataset
+
+
+def test_default_data_file_is_valid_and_indexed():
+    dataset = load_dataset()
+    assert load_dataset() is dataset
+    assert len(dataset) == 40 and len(dataset.birth_charts) == 18
+    assert len(dataset.phases()) == 8
+    new_moons = dataset.select(phase="new moon")
+    assert new_moons and all(case.phase == "new moon" for case in new_moons)
+    in_2024 = dataset.select(start="2024-01-01", end="2024-12-31")
+    assert in_2024 and dataset.select(year=2024) == in_2024
+    assert dataset.select(phase="full moon", year=2023) == [c for c in dataset.lunar if c.id == "2023-04-06-full_moon"]
+
+
+def test_sidecar_skips_parsing_until_content_changes(tmp_path, monkeypatch):
+    data_file = tmp_path / "data.json"
+    shutil.copy(DEFAULT_DATA_FILE, data_file)
+    cache_dir = tmp_path / "cache"
+    reads: List[Path] = []
+    read_bytes = Path.read_bytes
+
+    def _counting(self: Path) -> bytes:
+        reads.append(self)
+        return read_bytes(self)
+
+    monkeypatch.setattr(Path, "read_bytes", _counting)
+
+    first = DataRepository(cache_dir)
+    assert not first.load(data_file).from_cache
+    assert first.parses == 1 and len(list(cache_dir.glob("*.json"))) == 1
+
+    # 新进程（新仓库实例）mtime/size 未变：只读缓存副本，不读原文件
+    reads.clear()
+    dataset = DataRepository(cache_dir).load(data_file)
+    assert dataset.from_cache and data_file not in reads
+    assert dataset.lunar_params() == first.load(data_file).lunar_params()
+
+    # 仅时间戳变化：比对内容哈希后沿用副本，不重新解析，并记录新的时间戳
+    second = DataRepository(cache_dir)
+    stat = data_file.stat()
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert second.load(data_file).from_cache and second.parses == 0
+    reads.clear()
+    assert DataRepository(cache_dir).load(data_file).from_cache and data_file not in reads
+
+    raw = json.loads(data_file.read_text(encoding="utf-8"))
+    raw["lunar phase"].append({"2030-01-01": "new moon"})
+    data_file.write_text(json.dumps(raw), encoding="utf-8")
+    assert len(second.load(data_file)) == 41 and second.parses == 1
+    # 旧副本被替换
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_same_named_files_in_other_directories_keep_their_sidecars(tmp_path):
+    cache_dir = tmp_path / "cache"
+    files = []
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        files.append(tmp_path / name / "data.json")
+        shutil.copy(DEFAULT_DATA_FILE, files[-1])
+    raw = json.loads(files[1].read_text(encoding="utf-8"))
+    raw["lunar phase"].append({"2030-01-01": "new moon"})
+    files[1].write_text(json.dumps(raw), encoding="utf-8")
+
+    for data_file in files:
+        DataRepository(cache_dir).load(data_file)
+    assert len(list(cache_dir.glob("data.*.json"))) == 2
+    fresh = DataRepository(cache_dir)
+    assert all(fresh.load(data_file).from_cache for data_file in files) and fresh.parses == 0
+
+
+def test_schema_errors_are_reported_together(tmp_path):
+    data_file = tmp_path / "data.json"
+    raw = {
+        "lunar phase": [{"2023-13-01": "new moon"}, {"2023-03-22": "blue moon"}],
+        "birth_chart": [{"birth_date": "1990-05-12", "birth_time": "9:15"}],
+    }
+    data_file.write_text(json.dumps(raw), encoding="utf-8")
+    with pytest.raises(DataSetError) as info:
+        DataRepository(None).load(data_file)
+    messages = "\n".join(info.value.errors)
+    assert "2023-13-01" in messages and "blue moon" in messages
+    assert "birth_time" in messages and "缺少字段" in messages
@@ -0,0 +1,96 @@
+import datetime as dt
+
+import pytest
+
+from src.core.date_control import (
+    AlarmShellBackend,
+    BackendMemory,
+    DateBackend,
+    DateControlError,
+    DateController,
+    RootShellBackend,
+    UiDateBackend,
+)
+from tests.unit.fakes import FakeDriver
+
+
+def make_shell(sdk="33", root=False, alarm_works=True):
+    """模拟设备 shell：记录当前日期，按能力决定命令是否生效。"""
+    state = {"date": "2024-01-01"}
+
+    def handler(command):
+        if command.startswith("getprop"):
+            lines = [sdk, "Asia/Shanghai"]
+            if "su 0 id -u" in command:
+                lines.append("0" if root else "/system/bin/sh: su: not found")
+            return "\n".join(lines) + "\n"
+        if "cmd alarm set-time" in command and alarm_works:
+            millis = int(command.split("set-time ")[1].split(";")[0])
+            state["date"] = (
+                dt.datetime.fromtimestamp(millis / 1000, dt.timezone(dt.timedelta(hours=8))).date().isoformat()
+            )
+        if "su 0 toybox date" in command and root:
+            stamp = command.split("toybox date ")[1].split()[0]
+            state["date"] = f"{stamp[8:12]}-{stamp[0:2]}-{stamp[2:4]}"
+        return state["date"] + "\n"
+
+    return handler
+
+
+def make_controller(driver, ui_calls=None):
+    ui = UiDateBackend(lambda drv, target: ui_calls.append(target) if ui_calls is not None else None)
+    return DateController(driver, [ui, RootShellBackend(), AlarmShellBackend()], memory=BackendMemory())
+
+
+def test_alarm_backend_single_command_after_probe():
+    driver = FakeDriver(shell_handler=make_shell())
+    controller = make_controller(driver)
+    assert controller.set_date("2024-09-18") == "alarm-shell"
+    driver.commands.clear()
+    assert controller.set_date(dt.date(2025, 3, 14)) == "alarm-shell"
+    assert driver.count("mobile: shell") == 1
+
+
+def test_falls_back_to_root_when_readback_mismatches():
+    driver = FakeDriver(shell_handler=make_shell(root=True, alarm_works=False))
+    controller = make_controller(driver)
+    assert controller.set_date("2024-02-29") == "root-shell"
+    driver.commands.clear()
+    # 失败的 alarm 后端被记住，后续只发一条命令
+    assert controller.set_date("2024-03-01") == "root-shell"
+    assert driver.count("mobile: shell") == 1
+
+
+def test_falls_back_to_ui_without_shell():
+    calls = []
+    driver = FakeDriver()
+    controller = make_controller(driver, calls)
+    assert controller.set_date("2024-05-01") == "settings-ui"
+    assert controller.set_date("2024-05-02") == "settings-ui"
+    assert calls == [dt.date(2024, 5, 1), dt.date(2024, 5, 2)]
+    assert driver.count("mobile: shell") == 2  # 每个 shell 后端只探测一次
+
+
+def test_old_sdk_without_root_uses_ui():
+    calls = []
+    driver = FakeDriver(shell_handler=make_shell(sdk="26"))
+    assert make_controller(driver, calls).set_date("2023-12-31") == "settings-ui"
+    assert calls == [dt.date(2023, 12, 31)]
+
+
+def test_all_backends_failing_raises():
+    def broken(drv, target):
+        raise RuntimeError("控件未找到")
+
+    controller = DateController(FakeDriver(), [UiDateBackend(broken)], memory=BackendMemory())
+    with pytest.raises(DateControlError):
+        controller.set_date("2024-01-02")
+
+
+def test_incomplete_backend_rejected_on_construction():
+    class NoSetDate(DateBackend):
+        def supports(self, driver):
+            return True
+
+    with pytest.raises(TypeError):
+        NoSetDate()
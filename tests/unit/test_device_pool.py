@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from src.core.config import ConfigLoader
+from src.core.device_pool import DevicePool, balance, server_ready, worker_index
+from src.utils.path import project_root
+from tests.unit.appium_stub import AppiumStub
+
+PROFILES = {
+    f"emulator-{5554 + 2 * i}": {"platformName": "Android", "udid": f"emulator-{5554 + 2 * i}", "systemPort": 8200 + i}
+    for i in range(3)
+}
+
+
+def test_workers_lease_distinct_devices(tmp_path):
+    pool = DevicePool(PROFILES, lease_dir=tmp_path)
+    leases = {}
+
+    def _lease(worker):
+        leases[worker] = pool.lease(worker, timeout=2, poll=0.01)
+
+    threads = [threading.Thread(target=_lease, args=(f"gw{i}",)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({lease.udid for lease in leases.values()}) == 3
+    assert len({lease.system_port for lease in leases.values()}) == 3
+    with pytest.raises(TimeoutError):
+        pool.lease("gw3", timeout=0.05, poll=0.01)
+    pool.release(leases["gw1"])
+    assert pool.lease("gw3", timeout=1, poll=0.01).profile == leases["gw1"].profile
+
+
+def test_stale_lease_is_reclaimed(tmp_path):
+    pool = DevicePool({"emulator-5554": PROFILES["emulator-5554"]}, lease_dir=tmp_path)
+    # 残留的锁文件内容不参与判定，只有持有中的文件锁才会阻止租用
+    (tmp_path / "emulator-5554.lock").write_text(json.dumps({"worker": "gw9", "pid": 2**22 + 1}), encoding="utf-8")
+    assert pool.lease("gw0", timeout=0.5, poll=0.01).profile == "emulator-5554"
+
+
+def test_crashed_worker_releases_lease(tmp_path):
+    code = (
+        "import os, sys\n"
+        "from src.core.device_pool import DevicePool\n"
+        f"pool = DevicePool({PROFILES!r}, lease_dir={str(tmp_path)!r})\n"
+        "lease = pool.lease('gw0', timeout=1)\n"
+        "print(lease.profile, flush=True)\n"
+        "sys.stdin.readline()\n"
+        "os._exit(1)\n"
+    )
+    worker = subprocess.Popen(
+        [sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=project_root()
+    )
+    try:
+        held = worker.stdout.readline().strip()
+        pool = DevicePool({held: PROFILES[held]}, lease_dir=tmp_path)
+        with pytest.raises(TimeoutError):
+            pool.lease("gw1", timeout=0.05, poll=0.01)
+        # 持有者未归还即退出：文件锁随进程释放
+        worker.stdin.write("\n")
+        worker.stdin.flush()
+        worker.wait(timeout=10)
+        assert pool.lease("gw1", timeout=1, poll=0.01).profile == held
+    finally:
+        worker.kill()
+        worker.wait()
+
+
+def test_duplicate_system_port_rejected(tmp_path):
+    profiles = {"a": {"udid": "a", "systemPort": 8200}, "b": {"udid": "b", "systemPort": 8200}}
+    with pytest.raises(ValueError):
+        DevicePool(profiles, lease_dir=tmp_path)
+
+
+def test_pool_from_android_capabilities(tmp_path):
+    pool = DevicePool.from_capabilities(ConfigLoader().values.capabilities_path, lease_dir=tmp_path)
+    assert len(pool) >= 2
+    assert all(p.get("udid") and p.get("systemPort") for p in pool.profiles.values())
+
+
+def test_balance_spreads_cases_evenly():
+    groups = balance(range(40), 3)
+    assert sorted(len(g) for g in groups) == [13, 13, 14]
+    assert sorted(x for g in groups for x in g) == list(range(40))
+    weighted = balance(["slow", "a", "b", "c"], 2, cost=lambda c: 3.0 if c == "slow" else 1.0)
+    assert ["slow"] in weighted
+    assert worker_index("gw12") == 12 and worker_index("master") == 0
+
+
+def test_probe_against_mock_appium_server(tmp_path):
+    with AppiumStub() as stub:
+        pool = DevicePool(PROFILES, lease_dir=tmp_path, probe=lambda _caps: server_ready(stub.url))
+        assert pool.lease("gw0", timeout=1).profile == "emulator-5554"
+        stub.ready = False
+        with pytest.raises(TimeoutError):
+            pool.lease("gw1", timeout=0.05, poll=0.01)
+        assert ("GET", "/status") in stub.requests
+        # 健康检查失败的设备立即释放，其他 worker 可以再次尝试
+        stub.ready = True
+        assert pool.lease("gw1", timeout=1, poll=0.01).profile == "emulator-5556"
+    assert not server_ready(stub.url, timeout=0.2)
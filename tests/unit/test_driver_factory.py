@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import pytest
+
+from src.core.driver_factory import DriverFactory
+from src.core.geometry import geometry_of
+from src.core.session_pool import SessionPool
+from tests.unit.appium_stub import AppiumStub
+
+CAPS = {"platformName": "Android", "automationName": "UiAutomator2", "deviceName": "stub"}
+
+
+def test_create_reuses_session_and_keep_alive_connection():
+    with AppiumStub() as stub:
+        factory = DriverFactory(stub.url, CAPS)
+        driver = factory.create()
+        assert factory.create() is driver
+        for _ in range(5):
+            driver.get_window_size()
+        assert stub.created == 1
+        assert len(stub.connections) == 1
+        factory.quit()
+        assert not stub.sessions
+
+
+def test_dead_session_is_replaced_from_pool():
+    with AppiumStub() as stub:
+        factory = DriverFactory(stub.url, CAPS)
+        handle = factory.handle()
+        first = factory.create()
+        stub.kill(first.session_id)
+        replaced = factory.ensure_healthy()
+        assert replaced is not first
+        assert replaced.session_id in stub.sessions
+        # 代理始终指向当前会话
+        assert handle.session_id == replaced.session_id
+        assert factory.ensure_healthy() is replaced
+        factory.quit()
+        assert not stub.sessions
+
+
+def test_multiple_sessions_on_one_device_rejected():
+    with pytest.raises(ValueError, match="只能保持一个会话"):
+        DriverFactory("http://127.0.0.1:4723", CAPS, pool_size=2)
+    with pytest.raises(ValueError):
+        DriverFactory("http://127.0.0.1:4723", {"platformName": "iOS", "appium:udid": "x"}, pool_size=2)
+    # 不独占设备的驱动（如桌面端）允许多个预热会话
+    DriverFactory("http://127.0.0.1:4723", {"platformName": "Windows", "automationName": "Windows"}, pool_size=2)
+
+
+def test_pool_refills_in_background_and_checks_health():
+    with AppiumStub() as stub:
+        factory = DriverFactory(stub.url, CAPS)
+        pool = SessionPool(factory._new_session, size=2)  # pylint: disable=protected-access
+        pool.start()
+        first = pool.acquire(timeout=5)
+        second = pool.acquire(timeout=5)
+        stub.kill(second.session_id)
+        pool.release(second)
+        third = pool.acquire(timeout=5)
+        assert third.session_id not in (first.session_id, second.session_id)
+        assert pool.discarded == 1 and pool.created == 3
+        assert pool.health_checks >= 3
+        pool.release(first)
+        pool.release(third)
+        pool.close()
+        assert not stub.sessions
+
+
+def test_create_failure_surfaces_error():
+    def _boom():
+        raise ConnectionError("appium down")
+
+    pool = SessionPool(_boom)
+    with pytest.raises(ConnectionError):
+        pool.start()
+    with pytest.raises(ConnectionError):
+        pool.acquire(timeout=5)
+    pool.close()
+
+
+def test_sessions_carry_cached_geometry():
+    with AppiumStub() as stub:
+        factory = DriverFactory(stub.url, CAPS)
+        handle = factory.handle()
+        for _ in range(5):
+            assert geometry_of(handle).window_size == {"width": 1080, "height": 2340}
+        assert geometry_of(handle) is factory.create().geometry
+        assert stub.requests.count(("GET", f"/session/{handle.session_id}/window/rect")) == 1
+        factory.quit()
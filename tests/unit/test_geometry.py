@@ -0,0 +1,42 @@
+from src.core.geometry import geometry_of
+from tests.unit.fakes import FakeDriver
+
+
+def test_window_size_fetched_once_per_session():
+    driver = FakeDriver()
+    for _ in range(20):  # 相当于 20 次 _ready 轮询 + 滚动/居中
+        assert geometry_of(driver).window_size == {"width": 1080, "height": 2340}
+    assert geometry_of(driver).density == 440
+    assert geometry_of(driver).density == 440
+    assert driver.count("getWindowSize") == 1
+    assert driver.count("getOrientation") == 1
+    assert driver.count("getDisplayDensity") == 1
+
+
+def test_rotation_and_activity_changes_invalidate():
+    driver = FakeDriver()
+    geometry = geometry_of(driver)
+    geometry.observe_activity(".MainActivity")
+    assert geometry.get().orientation == "PORTRAIT"
+
+    geometry.rotate("landscape")
+    assert geometry.window_size == {"width": 2340, "height": 1080}
+    assert geometry.get().orientation == "LANDSCAPE"
+
+    geometry.observe_activity(".MainActivity")
+    geometry.observe_orientation("LANDSCAPE")
+    assert geometry.fetches == 2
+    geometry.observe_activity(".SettingsActivity")
+    geometry.get()
+    assert geometry.fetches == 3
+
+
+def test_snapshot_feeds_geometry_without_commands():
+    driver = FakeDriver()
+    geometry = geometry_of(driver)
+    geometry.observe_snapshot(1080, 2340, 0)
+    assert geometry.window_size == {"width": 1080, "height": 2340}
+    assert driver.count("getWindowSize") == 0
+    geometry.observe_snapshot(2340, 1080, 1)
+    assert geometry.get().orientation == "LANDSCAPE"
+    assert driver.count("getWindowSize") == 0
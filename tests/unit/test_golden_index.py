@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+
+import cv2
+import pytest
+
+from tests.unit.golden_index import GoldenIndex, assert_golden_match
+from tests.unit.match_engine import PyramidMatcher
+from tests.unit.template_store import DEFAULT_TEMPLATE_DIR, TemplateStore
+
+SCREENSHOT = Path(__file__).resolve().parents[1] / "e2e" / "screenshots" / "screenshot.png"
+
+
+class CountingMatcher(PyramidMatcher):
+    """记录模板匹配次数，用于确认结论明确时不回退。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def match(self, image, template):
+        self.calls += 1
+        return super().match(image, template)
+
+
+@pytest.fixture
+def index(template_store):
+    return GoldenIndex(index_file=None, store=template_store, matcher=CountingMatcher())
+
+
+def test_every_golden_resolves_to_itself(index):
+    for name in index.names:
+        result = index.resolve(index.store.get(name))
+        assert result.name == name and result.distance == 0
+    # 满月/亏凸月、新月/蛾眉月哈希几乎相同，只有这两组回退模板匹配
+    hashed = [name for name in index.names if not index.nearest(index.store.get(name)).ambiguous]
+    assert sorted(hashed) == ["first quarter", "last quarter", "waning crescent", "waxing gibbous"]
+
+
+def test_decisive_hash_skips_template_matching(index):
+    result = assert_golden_match(index.store.get("first quarter"), "first quarter", index=index)
+    assert result.method == "hash" and index.matcher.calls == 0
+    rejected = index.verify(index.store.get("last quarter"), "first quarter")
+    assert rejected.name == "last quarter" and index.matcher.calls == 0
+    with pytest.raises(AssertionError, match="实际最接近 last quarter"):
+        assert_golden_match(index.store.get("last quarter"), "first quarter", index=index)
+
+
+def test_ambiguous_distance_falls_back_to_template(index):
+    screenshot = cv2.imread(str(SCREENSHOT), cv2.IMREAD_GRAYSCALE)
+    hit = index.nearest(screenshot)
+    assert hit.ambiguous and set(hit.candidates) == {"new moon", "waxing crescent"}
+    result = assert_golden_match(SCREENSHOT.read_bytes(), "new moon", index=index)
+    assert result.method == "template" and result.score is not None and result.score > 0.8
+    assert index.matcher.calls == 1
+    failed = index.verify(screenshot, "full moon")
+    assert failed.name == "new moon" and failed.score is not None and failed.score < 0.8
+
+
+def test_decisive_queries_never_run_template_matching(index):
+    # 查询开销只看是否回退模板匹配（计数匹配器），不断言墙钟耗时
+    image = index.store.get("waxing gibbous")
+    for _ in range(200):
+        assert index.verify(image, "waxing gibbous").method == "hash"
+    assert index.matcher.calls == 0
+
+
+def test_index_persists_and_updates_incrementally(tmp_path):
+    golden = tmp_path / "golden"
+    golden.mkdir()
+    for name in ("new moon", "full moon"):
+        shutil.copy(DEFAULT_TEMPLATE_DIR / f"{name}.png", golden / f"{name}.png")
+    index_file = tmp_path / "index.npz"
+    first = GoldenIndex([golden], index_file=index_file, store=TemplateStore(golden))
+    assert first.computed == 2 and index_file.exists()
+
+    # 重新加载：不解码、不重算
+    store = TemplateStore(golden)
+    second = GoldenIndex([golden], index_file=index_file, store=store)
+    assert second.computed == 0 and store.decodes == 0
+    assert (second.hashes == first.hashes).all()
+
+    # 仅时间戳变化：哈希一致，沿用特征；新增目录只计算新增图片
+    stat = os.stat(golden / "new moon.png")
+    os.utime(golden / "new moon.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert second.refresh() == 0
+    extra = tmp_path / "extra"
+    extra.mkdir()
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "first quarter.png", extra / "first quarter.png")
+    assert second.add_root(extra) == 1
+    assert GoldenIndex([golden, extra], index_file=index_file, store=store).computed == 0
+
+    # 内容变化重新计算，删除的图片移出
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "last quarter.png", golden / "full moon.png")
+    (golden / "new moon.png").unlink()
+    assert second.refresh() == 1
+    assert sorted(second.names) == ["first quarter", "full moon"]
+    assert second.nearest(TemplateStore().get("last quarter")).name == "full moon"
+
+
+def test_duplicate_names_rejected(tmp_path):
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "new moon.png", tmp_path / "new moon.png")
+    with pytest.raises(ValueError, match="名称重复"):
+        GoldenIndex([DEFAULT_TEMPLATE_DIR, tmp_path], index_file=None)
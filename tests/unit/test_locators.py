@@ -0,0 +1,136 @@
+import pytest
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException
+
+from src.page_objects.base_page import BasePage
+from src.page_objects.locators import LocatorCache, rewrite_xpath
+from tests.unit.fakes import FakeDriver, FakeElement
+
+HOME = (AppiumBy.XPATH, '//android.widget.Image[@text="home-active"]')
+HOME_UI = (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.Image").text("home-active")')
+
+
+@pytest.mark.parametrize(
+    "xpath,expected",
+    [
+        (
+            '//*[@resource-id="android:id/button1"]',
+            [
+                (AppiumBy.ID, "android:id/button1"),
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().resourceId("android:id/button1")'),
+            ],
+        ),
+        (
+            "//*[@content-desc='搜索设置']",
+            [
+                (AppiumBy.ACCESSIBILITY_ID, "搜索设置"),
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().description("搜索设置")'),
+            ],
+        ),
+        (HOME[1], [HOME_UI]),
+        (
+            '(//android.widget.TextView[contains(@text, "年") and @clickable="true"])[3]',
+            [
+                (
+                    AppiumBy.ANDROID_UIAUTOMATOR,
+                    'new UiSelector().className("android.widget.TextView")'
+                    '.textContains("年").clickable(true).instance(2)',
+                )
+            ],
+        ),
+        ("(//android.view.View[@resource-id])[1]", []),
+        ('//android.widget.Button[@text="a"][2]', []),
+        ('//android.widget.ListView/android.widget.TextView[@text="a"]', []),
+    ],
+)
+def test_rewrite_xpath(xpath, expected):
+    assert rewrite_xpath(xpath) == expected
+
+
+def test_learns_rewrite_and_skips_xpath():
+    driver = FakeDriver()
+    element = FakeElement("e1")
+    driver.elements[HOME] = element
+    driver.elements[HOME_UI] = element
+    cache = LocatorCache(stats_file=None)
+
+    assert cache.find(driver, HOME, "Home") is element  # 首次命中改写，用原 XPath 对照一次
+    driver.commands.clear()
+    for _ in range(3):
+        assert cache.find(driver, HOME, "Home") is element
+    assert driver.commands == [("findElement", HOME_UI)] * 3
+    assert cache.entry(HOME, "Home").winner == HOME_UI
+
+
+def test_mismatched_or_invalid_rewrite_is_rejected():
+    driver = FakeDriver()
+    driver.elements[HOME] = FakeElement("right", {"x": 0, "y": 0, "width": 1, "height": 1})
+    driver.elements[HOME_UI] = FakeElement("wrong")
+    cache = LocatorCache(stats_file=None)
+    assert cache.find(driver, HOME).id == "right"
+    assert cache.entry(HOME).winner == HOME
+
+    button = (AppiumBy.XPATH, '//*[@resource-id="ok"]')
+    driver.elements[button] = FakeElement("ok")
+    driver.elements[(AppiumBy.ID, "ok")] = InvalidSelectorException("bad")
+    driver.elements[(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().resourceId("ok")')] = FakeElement("ok")
+    assert cache.find(driver, button).id == "ok"
+    assert cache.entry(button).winner[0] == AppiumBy.ANDROID_UIAUTOMATOR
+
+
+def test_stale_rewrite_falls_back_to_original_and_persists(tmp_path):
+    driver = FakeDriver()
+    element = FakeElement("e1")
+    driver.elements[HOME] = element
+    driver.elements[HOME_UI] = element
+    stats = tmp_path / "locators.json"
+    cache = LocatorCache(stats_file=stats, fallback_after=1)
+    cache.find(driver, HOME)
+
+    del driver.elements[HOME_UI]
+    driver.commands.clear()
+    with pytest.raises(NoSuchElementException):
+        cache.find(driver, HOME)  # 单次未命中只试胜者，不额外执行原 XPath
+    assert cache.find(driver, HOME) is element  # 连续未命中后回退，由原 XPath 命中
+    assert driver.commands == [("findElement", HOME_UI), ("findElement", HOME_UI), ("findElement", HOME)]
+    assert cache.entry(HOME).winner == HOME
+    cache.save()
+
+    restored = LocatorCache(stats_file=stats)
+    assert restored.entry(HOME).winner == HOME
+    assert any("home-active" in line for line in restored.report_lines())
+
+
+def test_retries_all_candidates_after_repeated_misses():
+    button = (AppiumBy.XPATH, '//*[@resource-id="ok"]')
+    by_id = (AppiumBy.ID, "ok")
+    driver = FakeDriver()
+    driver.elements[button] = driver.elements[by_id] = FakeElement("ok")
+    cache = LocatorCache(stats_file=None, fallback_after=2)
+    cache.find(driver, button)
+    entry = cache.entry(button)
+    assert entry.order(cache.fallback_after) == [by_id]
+
+    driver.elements.clear()
+    driver.commands.clear()
+    for _ in range(2):
+        with pytest.raises(NoSuchElementException):
+            cache.find(driver, button)
+    assert driver.commands == [("findElement", by_id)] * 2
+    assert entry.order(cache.fallback_after) == entry.candidates[:-1] + [button]
+    assert len(entry.candidates) == 3
+
+    # 全部候选都未命中：元素尚未出现，后续轮询仍只试胜者
+    with pytest.raises(NoSuchElementException):
+        cache.find(driver, button)
+    assert entry.winner == by_id and entry.order(cache.fallback_after) == [by_id]
+
+
+def test_base_page_uses_locator_cache():
+    driver = FakeDriver()
+    element = FakeElement("e1")
+    driver.elements[HOME_UI] = element
+    driver.elements[HOME] = element
+    page = BasePage(driver, timeout=1, locators=LocatorCache(stats_file=None))
+    assert page.find(HOME) is element
+    assert page.locators.entry(HOME, "BasePage").winner == HOME_UI
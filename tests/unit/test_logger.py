@@ -1,6 +1,22 @@
 from __future__ import annotations
 
-from src.core.logger import setup_logger
+import json
+import logging
+import threading
+from typing import List
+
+from src.core.logger import flush_logs, setup_logger
+
+
+class RecordingHandler(logging.Handler):
+    """收集经过的日志记录，不做格式化。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
 
 
 def test_logger_setup_singleton_like():
@@ -8,3 +24,61 @@ def test_logger_setup_singleton_like():
     logger2 = setup_logger("tests")
     assert logger1 is logger2
     logger1.info("logger ok")
+
+
+def test_async_logger_writes_text_and_json_lines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = setup_logger("unit-async", mode="async")
+    assert setup_logger("unit-async", mode="async") is logger
+    assert len(logger.handlers) == 1
+    logger.info("等待元素 %s", "id=button1")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("失败")
+    flush_logs()
+
+    text = (tmp_path / "logs" / "unit-async.log").read_text(encoding="utf-8")
+    assert "| INFO | unit-async | 等待元素 id=button1" in text
+    rows = [
+        json.loads(line) for line in (tmp_path / "logs" / "unit-async.jsonl").read_text(encoding="utf-8").splitlines()
+    ]
+    assert rows[0]["message"] == "等待元素 id=button1" and rows[0]["level"] == "INFO"
+    assert "ValueError: boom" in rows[1]["exc"]
+
+
+def test_async_caller_thread_only_enqueues(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = setup_logger("unit-async-threads", mode="async", console=False)
+    # 只看本模块处理链路，排除向 pytest 日志捕获处理器的传播（monkeypatch 结束后恢复）
+    monkeypatch.setattr(logger, "propagate", False)
+    formatted_on = set()
+    original = logging.Formatter.format
+
+    def _format(self, record):
+        formatted_on.add(threading.current_thread().name)
+        return original(self, record)
+
+    monkeypatch.setattr(logging.Formatter, "format", _format)
+    for i in range(200):
+        logger.info("轮询 %s 第 %d 次", "id=button1", i)
+    flush_logs()
+    # 格式化与写文件全部在后台线程完成，调用线程只把记录放入队列
+    assert formatted_on == {"log-writer"}
+    lines = (tmp_path / "logs" / "unit-async-threads.log").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 200 and lines[-1].endswith("轮询 id=button1 第 199 次")
+
+
+def test_queue_handler_leaves_record_for_other_handlers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = setup_logger("unit-async-prepare", mode="async", console=False)
+    monkeypatch.setattr(logger, "propagate", False)
+    capture = RecordingHandler()
+    logger.addHandler(capture)
+    try:
+        logger.info("等待元素 %s", "id=button1")
+    finally:
+        logger.removeHandler(capture)
+    flush_logs()
+    record = capture.records[0]
+    assert record.msg == "等待元素 %s" and record.args == ("id=button1",)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import numpy as np
+
+from src.core.dataset import PHASES, load_dataset
+from src.core.lunar_oracle import compute, cross_check, generate_cases
+
+
+def test_known_phases_and_illumination():
+    # 2024-04-08 日全食（朔）、2024-04-15 上弦、2024-10-17 满月、2024-05-04 残月
+    result = compute(["2024-04-08", "2024-04-15", "2024-10-17", "2024-05-04"])
+    assert list(result.names) == ["new moon", "first quarter", "full moon", "waning crescent"]
+    assert result.illumination[0] < 0.01 and result.illumination[2] > 0.99
+    assert 0 <= result.age.min() and result.age.max() < 29.54
+
+
+def test_cross_check_flags_only_inconsistent_rows():
+    dataset = load_dataset()
+    flagged = {m.date for m in cross_check(dataset.lunar)}
+    assert not flagged & {c.date for c in dataset.select(start="2023-01-01", end="2025-12-31")}
+    # 2027-05 一组整体晚了约三天（实际朔日为 2027-05-06）
+    assert "2027-05-09" in flagged
+    assert cross_check([("2024-04-08", "full moon")])[0].computed == "new moon"
+
+
+def test_generated_cases_cover_all_phases_and_agree_with_oracle():
+    cases = generate_cases("2024-01-01", "2024-12-31")
+    assert {c.phase for c in cases} == set(PHASES)
+    assert not cross_check(cases, tolerance_days=0)
+    assert {c.phase for c in generate_cases("2024-01-01", "2024-03-31", phases=["full moon"])} == {"full moon"}
+
+
+def test_vectorized_matches_single_dates():
+    # 只校验批量与逐日结果一致；耗时不在单元测试中断言
+    days = np.arange(np.datetime64("1900-01-01"), np.datetime64("1900-01-01") + 100_000)
+    result = compute(days)
+    assert len(result.index) == len(days)
+    for i in range(0, len(days), 9973):
+        single = compute([str(days[i])])
+        assert single.names[0] == result.names[i] and single.age[0] == result.age[i]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+import pytest
+
+from tests.unit.image_tools import test_element_image_match_cv as assert_image_match
+from tests.unit.match_engine import PyramidMatcher, full_match
+
+SCREENSHOT = Path(__file__).resolve().parents[1] / "e2e" / "screenshots" / "screenshot.png"
+
+
+def _pairs(store):
+    store.preload()
+    images = {entry.name: entry.image for entry in store}
+    images["screenshot"] = cv2.imread(str(SCREENSHOT), cv2.IMREAD_GRAYSCALE)
+    names = store.names()
+    return [(images[a], images[b]) for a in images for b in names]
+
+
+def test_same_verdicts_as_full_resolution(template_store):
+    matcher = PyramidMatcher()
+    for image, template in _pairs(template_store):
+        assert matcher.match(image, template).passed() == full_match(image, template).passed()
+
+
+def test_less_work_than_full_resolution(template_store):
+    # 按像素对数比较工作量而非墙钟耗时，避免共享 CI 机器上的抖动
+    matcher = PyramidMatcher()
+    pairs = _pairs(template_store)
+    full = sum(full_match(image, template).cost for image, template in pairs)
+    results = [matcher.match(image, template) for image, template in pairs]
+    pyramid = sum(result.cost for result in results)
+    assert pyramid < full / 4, f"金字塔 {pyramid} 像素对, 全分辨率 {full} 像素对"
+    assert any(result.early_exit for result in results)
+
+
+def test_locates_template_in_larger_screenshot(template_store):
+    template = template_store.get("new moon")
+    image = cv2.copyMakeBorder(cv2.imread(str(SCREENSHOT), cv2.IMREAD_GRAYSCALE), 40, 60, 32, 8, cv2.BORDER_CONSTANT)
+    result = PyramidMatcher().match(image, template)
+    assert result.passed()
+    assert abs(result.location[0] - 32) <= 8 and abs(result.location[1] - 40) <= 8
+
+
+def test_screenshot_smaller_than_template(template_store):
+    template = template_store.get("new moon")
+    # 宽于模板但矮于模板：原始 matchTemplate 直接报错
+    image = cv2.copyMakeBorder(cv2.resize(template, (300, 300)), 0, 0, 150, 150, cv2.BORDER_CONSTANT)
+    with pytest.raises(cv2.error):
+        full_match(image, template)
+    result = assert_image_match(image, "new moon", store=template_store)
+    assert result.scale < 1.0
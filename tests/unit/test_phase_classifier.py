@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+
+from tests.unit.phase_classifier import PhaseClassifier, describe
+
+SCREENSHOT = Path(__file__).resolve().parents[1] / "e2e" / "screenshots" / "screenshot.png"
+
+
+def test_each_reference_ranks_itself_first(phase_classifier):
+    for name in phase_classifier.names:
+        ranking = phase_classifier.classify(phase_classifier.store.get(name))
+        assert len(ranking) == len(phase_classifier.names)
+        assert ranking[0].score >= 0.999
+        assert name in [item.phase for item in ranking if item.score >= ranking[0].score - 1e-6]
+
+
+def test_classify_png_bytes(phase_classifier):
+    ranking = phase_classifier.classify(SCREENSHOT.read_bytes())
+    assert ranking[0].phase in {"new moon", "waxing crescent"}
+    assert [item.score for item in ranking] == sorted((item.score for item in ranking), reverse=True)
+    assert describe(ranking, top=2).count("=") == 2
+
+
+def test_batch_scores_match_single(template_store):
+    classifier = PhaseClassifier(template_store, size=(16, 16))
+    images = [template_store.get("full moon"), cv2.imread(str(SCREENSHOT))]
+    matrix = classifier.scores(images)
+    assert matrix.shape == (2, len(classifier.names))
+    single = {item.phase: item.score for item in classifier.classify(images[1])}
+    for i, name in enumerate(classifier.names):
+        assert abs(matrix[1, i] - single[name]) < 1e-5
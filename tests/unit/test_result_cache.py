@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import shutil
+
+from src.core import transport
+from src.core.result_cache import ResultCache
+from src.core.transport import CommandRecorder
+from tests.unit.fakes import FakeDriver
+from tests.unit.template_store import DEFAULT_TEMPLATE_DIR
+
+PACKAGE = "com.ost.lunight"
+PARAMS = {"date_str": "2023-03-22", "lunar_phase": "new moon"}
+
+
+def _driver(version_code: int) -> FakeDriver:
+    return FakeDriver(
+        shell_handler=lambda cmd: (
+            f"    versionCode={version_code} minSdk=21 targetSdk=33\n    versionName=1.{version_code}\n"
+        )
+    )
+
+
+def test_passed_case_hits_until_app_or_reference_changes(tmp_path):
+    reference = tmp_path / "new moon.png"
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "new moon.png", reference)
+    cache = ResultCache(tmp_path / "results.sqlite")
+    driver = _driver(7)
+
+    fp = cache.case_fingerprint(driver, PACKAGE, "default", PARAMS, [reference])
+    assert fp is not None and cache.lookup("case", fp) is None
+    cache.record("case", fp, "passed", 12.5)
+    # 应用版本按设备只读取一次
+    assert cache.case_fingerprint(driver, PACKAGE, "default", PARAMS, [reference]) == fp
+    assert driver.count("mobile: shell") == 1
+
+    # 新进程（新缓存实例）仍能命中并统计节省的时间
+    reopened = ResultCache(tmp_path / "results.sqlite")
+    hit = reopened.lookup("case", fp)
+    assert hit is not None and hit.passed and reopened.saved == 12.5
+
+    assert reopened.case_fingerprint(_driver(8), PACKAGE, "default", PARAMS, [reference]) != fp
+    assert reopened.case_fingerprint(driver, PACKAGE, "ci", PARAMS, [reference]) != fp
+    assert (
+        reopened.case_fingerprint(driver, PACKAGE, "default", {**PARAMS, "date_str": "2023-03-23"}, [reference]) != fp
+    )
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "full moon.png", reference)
+    assert reopened.case_fingerprint(driver, PACKAGE, "default", PARAMS, [reference]) != fp
+
+
+def test_failed_results_and_unknown_version_are_not_reused(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite")
+    fp = cache.case_fingerprint(_driver(7), PACKAGE, "default", PARAMS)
+    cache.record("case", fp, "failed", 3.0)
+    result = cache.lookup("case", fp)
+    assert result is not None and not result.passed
+    assert cache.hits == 0 and cache.misses == 1
+    # 未开启 adb_shell 时无法读取版本，不生成指纹
+    assert cache.case_fingerprint(FakeDriver(capabilities={"udid": "other"}), PACKAGE, "default", PARAMS) is None
+
+
+pytest_plugins = ["pytester"]
+
+INNER_TEST = """
+import pytest
+from tests.unit.fakes import FakeDriver
+
+@pytest.fixture(scope="session")
+def appium_driver():
+    return FakeDriver(shell_handler=lambda cmd: "versionCode=7 versionName=1.7")
+
+
+@pytest.fixture(autouse=True)
+def ensure_appium_session():
+    return None
+
+
+@pytest.mark.result_cache(package="com.ost.lunight", references=[])
+@pytest.mark.parametrize("date_str", ["2023-03-22", "2023-03-24"])
+def test_case(appium_driver, date_str):
+    with open("runs.txt", "a", encoding="utf-8") as f:
+        f.write(date_str + "\\n")
+    assert date_str != "2023-03-24"
+"""
+
+
+def test_plugin_replays_only_passed_cases(pytester, monkeypatch, tmp_path):
+    import src.core.result_cache as result_cache  # pylint: disable=import-outside-toplevel
+
+    monkeypatch.setattr(result_cache, "_DEFAULT_CACHE", ResultCache(tmp_path / "results.sqlite"))
+    # 内层会话的 command_stats 夹具写入独立的统计对象，不污染外层会话的命令汇总
+    monkeypatch.setattr(transport, "_DEFAULT_RECORDER", CommandRecorder())
+    monkeypatch.setenv("RESULT_CACHE", "replay")
+    pytester.makepyfile(test_inner=INNER_TEST)
+    args = ("-p", "tests.conftest", "-p", "no:cacheprovider", "-q")
+    pytester.runpytest_inprocess(*args).assert_outcomes(passed=1, failed=1)
+    pytester.runpytest_inprocess(*args).assert_outcomes(passed=1, failed=1)
+    # 第二轮只重新执行了失败的用例
+    assert (pytester.path / "runs.txt").read_text(encoding="utf-8").split() == [
+        "2023-03-22",
+        "2023-03-24",
+        "2023-03-24",
+    ]
+    assert result_cache.get_result_cache().hits == 1
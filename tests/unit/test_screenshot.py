@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import base64
+import tracemalloc
+from typing import Any, Callable, cast
+
+import cv2
+import numpy as np
+import pytest
+
+from tests.unit.image_tools import capture_element_image
+from tests.unit.image_tools import test_element_image_match_cv as assert_image_match
+from tests.unit.screenshot import ScreenshotDecoder, crop
+from tests.unit.template_store import DEFAULT_TEMPLATE_DIR
+
+RECT = {"x": 64, "y": 64, "width": 400, "height": 400}
+
+
+def _b64(name: str) -> str:
+    return base64.b64encode((DEFAULT_TEMPLATE_DIR / f"{name}.png").read_bytes()).decode("ascii")
+
+
+def _peak(func: Callable[[], object], rounds: int = 5) -> int:
+    func()
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_base64_decodes_into_reused_buffer():
+    decoder = ScreenshotDecoder(chunk=1000)
+    for name in ("full moon", "new moon", "first quarter"):
+        raw = (DEFAULT_TEMPLATE_DIR / f"{name}.png").read_bytes()
+        assert decoder.png(_b64(name)) == raw
+    # 最大的图先解码，之后不再扩容
+    assert decoder.grows == 1
+    with pytest.raises(ValueError):
+        decoder.decode(_b64("new moon"), reduce=3)
+
+
+def test_reduced_gray_decode_and_view_crop():
+    decoder = ScreenshotDecoder()
+    full = decoder.decode(_b64("new moon"))
+    half = decoder.decode(_b64("new moon"), reduce=2)
+    assert half.ndim == 2
+    assert abs(half.shape[0] - full.shape[0] / 2) <= 1 and abs(half.shape[1] - full.shape[1] / 2) <= 1
+    view = crop(half, RECT, reduce=2)
+    assert view.shape == (200, 200) and np.shares_memory(view, half)
+    # 降采样截图与同比例参考图仍能匹配
+    assert assert_image_match(_b64("new moon"), "new moon", reduce=2).passed()
+
+
+def test_capture_element_crops_one_full_screenshot():
+    screen = _b64("full moon")
+
+    class Driver:
+        def get_screenshot_as_base64(self) -> str:
+            return screen
+
+    class Element:
+        parent = Driver()
+        rect = RECT
+
+    image = capture_element_image(cast(Any, Element()), reduce=2, gray=True)
+    assert image is not None and image.shape == (200, 200)
+
+
+@pytest.mark.parametrize("name", ["full moon", "waning gibbous"])
+def test_new_path_allocates_less_per_capture(name):
+    b64 = _b64(name)
+    decoder = ScreenshotDecoder()
+
+    def legacy() -> np.ndarray:
+        png = base64.b64decode(b64.encode("ascii"))
+        image = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR)
+        return image[64:464, 64:464].copy()
+
+    def pipeline() -> np.ndarray:
+        return crop(decoder.decode(b64, reduce=2), RECT, reduce=2)
+
+    assert _peak(pipeline) * 4 < _peak(legacy)
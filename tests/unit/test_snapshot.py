@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+from appium.webdriver.common.appiumby import AppiumBy
+
+from src.core.waits import AdaptiveWaiter
+from src.page_objects.base_page import BasePage
+from src.page_objects.locators import LocatorCache
+from src.page_objects.snapshot import PageSnapshot, UnsupportedLocator
+from tests.conftest import element_waiter
+from tests.unit.fakes import FakeDriver, FakeElement
+
+DUMP = (Path(__file__).parent / "dumps" / "settings_date_picker.xml").read_text(encoding="utf-8")
+DONE = (AppiumBy.ID, "android:id/button1")
+
+
+@pytest.fixture(scope="module")
+def snap():
+    return PageSnapshot.parse(DUMP)
+
+
+def test_parse_tree_and_window(snap):
+    assert snap.window_size == {"width": 1080, "height": 2340}
+    assert len(snap.nodes) == 10
+    done = snap.find(DONE)
+    assert done.text == "完成" and done.enabled and done.displayed
+    assert done.rect == {"x": 560, "y": 1960, "width": 460, "height": 140}
+    assert done.parent.class_name == "android.widget.FrameLayout"
+
+
+@pytest.mark.parametrize(
+    "locator,expected",
+    [
+        ((AppiumBy.ID, "button2"), ["取消"]),
+        ((AppiumBy.ACCESSIBILITY_ID, "上个月"), [""]),
+        ((AppiumBy.CLASS_NAME, "android.widget.Button"), ["完成", "取消"]),
+        ((AppiumBy.ANDROID_UIAUTOMATOR, r'new UiSelector().textMatches("(\d{4}.*?年|, 年)")'), ["2024, 年"]),
+        ((AppiumBy.ANDROID_UIAUTOMATOR, r'new UiSelector().textMatches("\d{4}年.*")'), ["2024年9月"]),
+        (
+            (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.EditText").instance(1)'),
+            ["09, 月"],
+        ),
+        ((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("完成")'), ["完成"]),
+        ((AppiumBy.XPATH, '//android.widget.EditText[contains(@text, "日")]'), ["18, 日"]),
+    ],
+)
+def test_queries(snap, locator, expected):
+    assert [n.text for n in snap.find_all(locator)] == expected
+
+
+def test_state_and_view(snap):
+    assert not snap.find((AppiumBy.ACCESSIBILITY_ID, "上个月")).enabled
+    assert not snap.find((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("隐藏")')).displayed
+    assert not snap.in_view(snap.find((AppiumBy.ID, "android:id/button2")))
+
+
+def test_unsupported_locators(snap):
+    with pytest.raises(UnsupportedLocator):
+        snap.find((AppiumBy.XPATH, "(//android.view.View[@resource-id])[1]"))
+    with pytest.raises(UnsupportedLocator):
+        snap.find((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("a").childSelector(new UiSelector())'))
+
+
+def test_page_queries_share_one_page_source():
+    driver = FakeDriver()
+    driver.page_sources = [DUMP]
+    page = BasePage(driver, timeout=2, locators=LocatorCache(stats_file=None))
+    assert page.query(DONE).text == "完成"
+    assert len(page.query_all((AppiumBy.CLASS_NAME, "android.widget.EditText"))) == 3
+    assert page.query((AppiumBy.ID, "missing")) is None
+    assert driver.count("getPageSource") == 1
+
+    node = page.tap(DONE)  # 两次快照位置一致即稳定，然后一条手势命令点击
+    assert driver.count("getPageSource") == 3
+    assert driver.commands[-1] == ("mobile: clickGesture", {"x": 790, "y": 2030})
+    assert node.text == "完成"
+    page.query(DONE)
+    assert driver.count("getPageSource") == 4  # 点击后快照失效
+
+
+def test_element_waiter_polls_snapshots_and_falls_back_for_unsupported_locators():
+    driver = FakeDriver()
+    driver.page_sources = [DUMP]
+    driver.elements[DONE] = done = FakeElement("done")
+    unsupported = (AppiumBy.XPATH, "(//android.view.View[@resource-id])[1]")
+    driver.elements[unsupported] = view = FakeElement("view")
+    waiter = AdaptiveWaiter(stats_file=None, sleep=lambda _: None)
+    wait = element_waiter(driver, waiter, LocatorCache(stats_file=None))
+
+    # 两次快照位置一致即就绪，然后只取一次元素
+    assert wait(DONE, prepare_for_click=False) is done
+    assert driver.count("getPageSource") == 2 and driver.count("findElement") == 1
+
+    driver.commands.clear()
+    assert wait(unsupported, prepare_for_click=False) is view
+    assert driver.count("getPageSource") == 1  # 第一次快照求值失败后改为逐项查询
+    driver.commands.clear()
+    assert wait(unsupported, prepare_for_click=False) is view
+    assert driver.count("getPageSource") == 0
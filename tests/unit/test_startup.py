@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from typing import List
+
+import pytest
+
+from src.core.lazy import LazyModule, is_loaded, lazy_exports, lazy_import
+from src.utils.path import project_root
+
+HEAVY = ("cv2", "numpy", "appium.webdriver.webdriver", "selenium.webdriver.remote.webdriver", "src.core.lunar_oracle")
+
+
+def _run(code: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        cwd=project_root(),
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+
+
+def test_lazy_module_loads_on_first_attribute_access():
+    proxy = LazyModule("json.decoder:JSONDecoder")
+    assert "lazy" in repr(proxy)
+    assert proxy().decode("[1]") == [1]
+    assert "loaded" in repr(proxy)
+    module = LazyModule("json")
+    # 收集阶段的内省（issubclass/__test__ 等）不触发导入
+    assert getattr(module, "__test__", True) is True and "lazy" in repr(module)
+    assert module.dumps is json.dumps and "dumps" in vars(module)
+    with pytest.raises(AttributeError):
+        module.dumps = None
+    # 已导入的模块直接返回本身，不经过代理
+    assert lazy_import("json") is json and is_loaded("json")
+    assert lazy_import("json:loads") is json.loads
+
+
+def test_lazy_exports_writes_back_into_namespace():
+    namespace = {"__name__": "demo"}
+    getter = lazy_exports(namespace, {"JSONDecoder": "json.decoder"})
+    assert getter("JSONDecoder") is json.JSONDecoder
+    assert namespace["JSONDecoder"] is json.JSONDecoder
+    with pytest.raises(AttributeError, match="demo"):
+        getter("missing")
+
+
+def test_importing_test_modules_skips_heavy_dependencies():
+    code = (
+        "import sys, json, tests.conftest, tests.e2e.test_lunar_app, tests.unit.image_tools; "
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    assert json.loads(_run(code).stdout) == []
+
+
+def _collect(marker: str) -> List[str]:
+    code = (
+        "import sys, json, pytest; "
+        f"pytest.main(['--collect-only', '-q', '-m', {marker!r}, '-p', 'no:cacheprovider', "
+        "'-o', 'addopts=', '-o', 'log_cli=false', 'tests/e2e/test_lunar_app.py']); "
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    loaded: List[str] = json.loads(_run(code).stdout.strip().splitlines()[-1])
+    return loaded
+
+
+def test_collecting_without_e2e_skips_heavy_dependencies():
+    assert _collect("not e2e") == []
+
+
+def test_lunar_oracle_runs_only_for_selected_cases():
+    # 选中月相用例时才在收集结束后核对期望值（加载 numpy）
+    assert "src.core.lunar_oracle" in _collect("e2e")
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+import shutil
+
+import pytest
+
+from tests.unit.image_tools import test_element_image_match_cv as assert_image_match
+from tests.unit.template_store import DEFAULT_TEMPLATE_DIR, TemplateStore
+
+
+def test_preload_decodes_each_reference_once():
+    store = TemplateStore()
+    assert store.preload() == 8
+    assert store.decodes == 8
+    image = store.get("new moon")
+    assert image.ndim == 2 and not image.flags.writeable
+    store.get(DEFAULT_TEMPLATE_DIR / "new moon.png")
+    assert store.decodes == 8
+
+
+def test_invalidate_by_mtime_and_hash(tmp_path):
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "new moon.png", tmp_path / "phase.png")
+    store = TemplateStore(tmp_path)
+    first = store.get("phase")
+    # 仅时间戳变化：哈希一致，不重新解码
+    stat = os.stat(tmp_path / "phase.png")
+    os.utime(tmp_path / "phase.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert store.get("phase") is first
+    assert store.decodes == 1
+    # 内容变化：重新解码
+    shutil.copy(DEFAULT_TEMPLATE_DIR / "full moon.png", tmp_path / "phase.png")
+    assert store.get("phase") is not first
+    assert store.decodes == 2
+
+
+def test_memory_cap_evicts_least_recently_used():
+    one = TemplateStore().get("new moon").nbytes
+    store = TemplateStore(max_bytes=int(one * 2.5))
+    store.preload()
+    assert len(store) == 2
+    assert store.nbytes <= store.max_bytes
+
+
+def test_scale_and_preprocess_applied_once():
+    plain = TemplateStore(scale=0.5).get("full moon")
+    store = TemplateStore(scale=0.5, preprocess=lambda img: 255 - img)
+    image = store.get("full moon")
+    assert image.shape == plain.shape == (264, 264)
+    assert (image == 255 - plain).all()
+    store.get("full moon")
+    assert store.decodes == 1
+
+
+def test_match_uses_store(template_store):
+    assert_image_match(template_store.get("new moon"), "new moon", store=template_store)
+    with pytest.raises(AssertionError):
+        assert_image_match(template_store.get("new moon"), "full moon", store=template_store)
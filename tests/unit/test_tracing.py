@@ -0,0 +1,83 @@
+import json
+
+from src.core.tracing import Tracer, percentile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += int(ms * 1e6)
+
+
+def test_nested_spans_and_chrome_trace(tmp_path):
+    clock = FakeClock()
+    tracer = Tracer(clock=clock)
+
+    @tracer.traced("image.match")
+    def match():
+        clock.advance(30)
+
+    with tracer.case("test_lunar_phase[a]"):
+        with tracer.span("date.settings-ui", locator="x"):
+            clock.advance(100)
+            with tracer.span("wait_for_element"):
+                clock.advance(50)
+        match()
+
+    assert [(s.name, s.depth) for s in tracer.spans] == [
+        ("wait_for_element", 1),
+        ("date.settings-ui", 0),
+        ("image.match", 0),
+    ]
+    trace = json.loads(tracer.write_chrome_trace(tmp_path / "trace.json").read_text(encoding="utf-8"))
+    event = trace["traceEvents"][1]
+    assert event["ph"] == "X" and event["dur"] == 150_000
+    assert event["args"] == {"locator": "x", "case": "test_lunar_phase[a]"}
+
+
+def test_step_percentiles_across_cases():
+    clock = FakeClock()
+    tracer = Tracer(clock=clock)
+    for i, ms in enumerate([100, 200, 300, 400, 1000]):
+        with tracer.case(f"case-{i}"):
+            with tracer.span("app.cold_launch"):
+                clock.advance(ms)
+            with tracer.span("wait_for_element"):
+                with tracer.span("wait_for_element"):  # 同名嵌套只计最外层
+                    clock.advance(10)
+    stats = tracer.step_stats()
+    assert len(stats["app.cold_launch"]) == 5
+    assert percentile(stats["app.cold_launch"], 50) == 0.3
+    assert abs(percentile(stats["app.cold_launch"], 95) - 0.88) < 1e-9
+    assert stats["wait_for_element"] == [0.01] * 5
+    assert tracer.summary_lines()[1].endswith("app.cold_launch")
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("x") as span:
+        assert span is None
+    assert list(tracer.spans) == []
+
+
+def test_memory_is_bounded_and_case_lookup_indexed():
+    clock = FakeClock()
+    tracer = Tracer(clock=clock, max_spans=4)
+    for i in range(5):
+        with tracer.case(f"case-{i}"):
+            with tracer.span("app.cold_launch"):
+                clock.advance(100)
+            with tracer.span("page.find"):
+                clock.advance(10)
+    # 只保留最近的区间，步骤统计仍覆盖全部用例
+    assert len(tracer.spans) == 4 and tracer.spans[0].case == "case-3"
+    assert tracer.step_stats()["app.cold_launch"] == [0.1] * 5
+    assert [s.name for s in tracer.case_spans("case-0")] == ["app.cold_launch", "page.find"]
+    # 用例结束后取出并释放其区间
+    assert len(tracer.pop_case("case-0")) == 2
+    assert tracer.case_spans("case-0") == [] and tracer.pop_case("case-0") == []
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Tuple
+
+import pytest
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.webdriver.remote.command import Command
+
+from src.core import transport
+from src.core.driver_factory import DriverFactory
+from src.core.transport import (
+    CommandRecorder,
+    InstrumentedConnection,
+    element_state,
+    get_command_recorder,
+    pipeline,
+    pipeline_width,
+)
+from tests.unit.appium_stub import AppiumStub
+
+CAPS = {"platformName": "Android", "automationName": "UiAutomator2", "deviceName": "stub"}
+LATENCY = 0.1
+
+
+class ElementStub(AppiumStub):
+    """带固定延迟的元素端点，模拟真机上每条命令的往返耗时。"""
+
+    def session_command(
+        self, method: str, session_id: str, command: str, body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        if method == "POST" and command == "element":
+            return 200, {"value": {"element-6066-11e4-a52e-4f735466cecf": "el-1"}}
+        if method == "GET" and command.startswith("element/el-1/"):
+            time.sleep(LATENCY)
+            attr = command.rsplit("/", 1)[-1]
+            if attr == "rect":
+                return 200, {"value": {"x": 10, "y": 20, "width": 100, "height": 50}}
+            return 200, {"value": attr in ("displayed", "enabled")}
+        return super().session_command(method, session_id, command, body)
+
+
+def _factory(stub: AppiumStub, width: int, recorder: CommandRecorder) -> DriverFactory:
+    # 注入独立的统计对象：建会话等命令都不写入进程内共享的 get_command_recorder()
+    factory = DriverFactory(stub.url, CAPS, instrument=True, pipeline_width=width, recorder=recorder)
+    connection = factory.create().command_executor
+    assert isinstance(connection, InstrumentedConnection) and connection.recorder is recorder
+    return factory
+
+
+@pytest.fixture(autouse=True)
+def shared_recorder_untouched():
+    before = sum(stat.count for stat in get_command_recorder().commands.values())
+    yield
+    assert sum(stat.count for stat in get_command_recorder().commands.values()) == before
+
+
+def test_commands_are_counted_per_scope_with_bytes():
+    recorder = CommandRecorder()
+    with ElementStub() as stub:
+        factory = _factory(stub, 1, recorder)
+        driver = factory.create()
+        with recorder.scope("case-a") as stat:
+            driver.get_window_size()
+            driver.find_element(AppiumBy.ID, "date")
+        assert stat.count == 2
+        assert stat.sent > 0 and stat.received > 0
+        assert recorder.commands[Command.FIND_ELEMENT].count == 1
+        assert any("case-a" in line for line in recorder.report_lines())
+        factory.quit()
+
+
+def test_wider_pipeline_shuts_down_previous_executor(monkeypatch):
+    monkeypatch.setattr(transport, "_PIPELINE_EXECUTOR", None)
+    narrow = transport._executor(2)
+    assert transport._executor(2) is narrow
+    wide = transport._executor(4)
+    assert wide is not narrow and narrow._shutdown
+    wide.shutdown()
+
+
+def test_pipeline_rejects_non_get_commands():
+    with ElementStub() as stub:
+        factory = _factory(stub, 3, CommandRecorder())
+        with pytest.raises(ValueError):
+            pipeline(factory.create(), [(Command.FIND_ELEMENT, {"using": "id", "value": "date"})])
+        factory.quit()
+
+
+@pytest.mark.parametrize("width", [1, 3])
+def test_element_state_same_result_and_pipelined_concurrency(width):
+    recorder = CommandRecorder()
+    with ElementStub() as stub:
+        factory = _factory(stub, width, recorder)
+        driver = factory.create()
+        assert pipeline_width(driver) == width
+        element = driver.find_element(AppiumBy.ID, "date")
+        with recorder.scope("state") as stat:
+            state = element_state(driver, element)
+        assert state == {"displayed": True, "enabled": True, "rect": {"x": 10, "y": 20, "width": 100, "height": 50}}
+        # 工作线程发出的命令也计入调用方作用域
+        assert stat.count == 3
+        # 按桩服务记录的同时处理请求数判断是否并发，不依赖墙钟耗时
+        if width == 1:
+            assert stub.peak == 1
+        else:
+            assert stub.peak > 1
+        factory.quit()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from src.core.waits import AdaptiveWaiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 4))
+        self.now += seconds
+
+
+def _waiter(clock, tmp_path=None):
+    stats = tmp_path / "settle.json" if tmp_path else None
+    return AdaptiveWaiter(stats_file=stats, initial=0.05, factor=2.0, max_interval=0.4, sleep=clock.sleep, clock=clock)
+
+
+def test_until_returns_immediately_when_ready():
+    clock = FakeClock()
+    assert _waiter(clock).until(lambda: "el", key="k") == "el"
+    assert clock.sleeps == []
+
+
+def test_until_backs_off_exponentially_and_times_out():
+    clock = FakeClock()
+    with pytest.raises(TimeoutException):
+        _waiter(clock).until(lambda: False, key="k", timeout=1.0)
+    assert clock.sleeps[:4] == [0.05, 0.1, 0.2, 0.4]
+    assert max(clock.sleeps) <= 0.4
+    assert abs(sum(clock.sleeps) - 1.0) < 1e-9
+    assert _waiter(clock).until(lambda: False, key="k", timeout=0.1, default=None) is None
+
+
+def test_learned_settle_time_persists_and_shapes_first_interval(tmp_path):
+    clock = FakeClock()
+    waiter = _waiter(clock, tmp_path)
+    ready_at = 0.6
+    waiter.until(lambda: clock.now >= ready_at, key="settings")
+    assert waiter.expected("settings") == pytest.approx(0.75)
+    waiter.save()
+
+    clock2 = FakeClock()
+    reloaded = _waiter(clock2, tmp_path)
+    assert reloaded.expected("settings") == pytest.approx(0.75)
+    reloaded.until(lambda: clock2.now >= ready_at, key="settings")
+    assert clock2.sleeps[0] == 0.375
+
+
+def test_settle_and_budget_accounting():
+    clock = FakeClock()
+    waiter = _waiter(clock)
+    positions = iter([(0, 0), (0, 10), (0, 20), (0, 20), (0, 20)])
+    with waiter.budget("case-1") as record:
+        clock.now += 1.0  # 操作耗时
+        assert waiter.settle(lambda: next(positions), key="moon", timeout=2) == (0, 20)
+    assert record.waits == 1
+    assert record.waited == pytest.approx(0.15)
+    assert record.acting == pytest.approx(1.0)
+    lines = waiter.report_lines()
+    assert "case-1" in lines[-1]